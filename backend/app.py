@@ -22,7 +22,11 @@ def create_app():
     # --- CONFIG API ---
     CORS(app, resources={r"/api/*": {"origins": "*"}})  # Autoriser les appels depuis React
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "jwt_dev_secret")
-    JWTManager(app)
+    jwt = JWTManager(app)
+    from services.current_user import register_user_loader
+    from services.revocation import register_blocklist
+    register_user_loader(jwt)  # current_user servi depuis un cache par worker
+    register_blocklist(jwt)    # jetons révoqués à la déconnexion
 
     # --- CONFIG Email ---
     app.config.update(
@@ -38,14 +42,33 @@ def create_app():
     app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///db.sqlite3")
     app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"pool_recycle": 300, "pool_pre_ping": True}
 
+    # --- CONFIG Pointage (écriture groupée des check-in, désactivée par défaut) ---
+    app.config["ATTENDANCE_GROUP_COMMIT"] = os.getenv("ATTENDANCE_GROUP_COMMIT", "False").lower() in ("1", "true")
+    app.config["ATTENDANCE_GROUP_COMMIT_MAX_BATCH"] = int(os.getenv("ATTENDANCE_GROUP_COMMIT_MAX_BATCH", 100))
+    app.config["ATTENDANCE_GROUP_COMMIT_MAX_DELAY_MS"] = int(os.getenv("ATTENDANCE_GROUP_COMMIT_MAX_DELAY_MS", 5))
+    app.config["ATTENDANCE_GROUP_COMMIT_DURABILITY"] = os.getenv("ATTENDANCE_GROUP_COMMIT_DURABILITY", "commit")  # commit | buffer
+
+    # --- CONFIG Pagination (exact | cached | estimate | false, surchargeable par ?count=) ---
+    app.config["PAGINATION_COUNT"] = os.getenv("PAGINATION_COUNT", "exact")
+
+    # --- CONFIG Géocodage (Nominatim via geopy, résultats gardés dans geocode_cache) ---
+    app.config["GEOCODING_ENABLED"] = os.getenv("GEOCODING_ENABLED", "True").lower() in ("1", "true")
+    app.config["GEOCODER_USER_AGENT"] = os.getenv("GEOCODER_USER_AGENT", "gestion-interventions")
+    app.config["GEOCODER_COUNTRY"] = os.getenv("GEOCODER_COUNTRY", "sn")
+    app.config["GEOCODER_TIMEOUT"] = float(os.getenv("GEOCODER_TIMEOUT", 5))
+
     # --- CONFIG Upload ---
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB
     app.config['UPLOAD_FOLDER'] = 'uploads'
+    app.config['MEDIA_FOLDER'] = os.getenv("MEDIA_FOLDER", os.path.join('uploads', 'media'))  # signatures, photos
 
     # --- Init extensions ---
     db.init_app(app)
     mail.init_app(app)
 
+    from services.group_commit import checkin_buffer
+    checkin_buffer.init_app(app)
+
     # --- Enregistrement Blueprints ---
     from auth import auth_bp
     from routes import register_blueprints
@@ -53,12 +76,45 @@ def create_app():
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     register_blueprints(app)  # tous les autres blueprints (users, roles, billing, etc.)
 
+    # --- Commandes CLI ---
+    from commands import register_commands
+    register_commands(app)
+
     # --- Initialisation DB ---
     with app.app_context():
         import models  # pour que SQLAlchemy connaisse les tables
         db.create_all()
         seed_data()
 
+        # Totaux de pagination en cache, invalidés au commit des écritures
+        from services.pagination import count_cache
+        count_cache.track(db.engine)
+
+        # Index unique attendance(user_id, date) pour les upserts de pointage
+        from services.punches import ensure_attendance_unique_index
+        ensure_attendance_unique_index()
+
+        # Colonnes et index ajoutés après coup aux tables existantes
+        from services.schema import ensure_columns, ensure_indexes
+        ensure_columns(models.Client.__table__.c.latitude, models.Client.__table__.c.longitude,
+                       models.Intervention.__table__.c.latitude, models.Intervention.__table__.c.longitude,
+                       models.InterventionMaterial.__table__.c.stock_deduit,
+                       models.Intervention.__table__.c.signature_blob,
+                       models.RevokedToken.__table__.c.revoked_at,
+                       models.WorkLocation.__table__.c.updated_at)
+        ensure_indexes(*[i for i in models.Attendance.__table__.indexes if not i.unique],
+                       *models.Intervention.__table__.indexes,
+                       *models.InterventionMaterial.__table__.indexes,
+                       *models.RevokedToken.__table__.indexes)
+
+        # Recherche plein texte des clients (FTS5 sous SQLite, FULLTEXT ngram sous MySQL)
+        from services.client_search import client_search
+        client_search.ensure_index()
+
+        # Tableau de présence du jour reconstruit au démarrage du worker
+        from services.presence import presence_board
+        presence_board.rebuild()
+
     return app
 
 
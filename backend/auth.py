@@ -1,14 +1,25 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import check_password_hash, generate_password_hash
 from flask_jwt_extended import (
     create_access_token,
+    create_refresh_token,
+    current_user,
+    decode_token,
+    get_jwt,
     jwt_required,
     get_jwt_identity
 )
-from datetime import datetime, time, timedelta
+from datetime import datetime, time
 
 from extensions import db
 from models import User, Role
+from services.presence import presence_board
+from services.current_user import user_cache
+from services.passwords import hash_password, verify_password
+from services.throttle import login_by_email, login_by_ip
+from services.revocation import revocation_store, REFRESH_TOKEN_LIFETIME
+from services.permissions import (
+    ACCESS_TOKEN_LIFETIME, permission_claims, record_permission_change, has_permission, is_admin
+)
 
 # --- Blueprint ---
 auth_bp = Blueprint("auth", __name__)
@@ -20,18 +31,29 @@ def is_valid_login_time():
     return time(1, 0) <= now <= time(23, 0)
 
 def admin_required(fn):
-    """Décorateur pour limiter une route aux administrateurs"""
+    """Décorateur pour limiter une route aux administrateurs (claims du jeton, sans requête)"""
     from functools import wraps
     @wraps(fn)
     def wrapper(*args, **kwargs):
-        user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
-        if not user or not user.role or user.role.name != "Administrateur":
+        if not is_admin():
             return jsonify({"status": "error", "msg": "Accès refusé. Administrateur uniquement."}), 403
         return fn(*args, **kwargs)
     return wrapper
 
 
+def permission_required(permission):
+    """Décorateur : droit requis, vérifié sur les claims du jeton (à placer après @jwt_required())"""
+    from functools import wraps
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not has_permission(permission):
+                return jsonify({"status": "error", "msg": "Accès refusé."}), 403
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
 # --- ROUTES AUTH ---
 @auth_bp.route("/login", methods=["POST"])
 def login():
@@ -42,24 +64,39 @@ def login():
     if not is_valid_login_time():
         return jsonify({"status": "error", "msg": "Connexion non autorisée à cette heure."}), 403
 
+    # Limitation par IP puis par email, avant toute requête ou calcul de hash
+    email_key = (email or "").strip().lower()
+    allowed, retry_after = login_by_ip.consume(request.remote_addr)
+    if allowed:
+        allowed, retry_after = login_by_email.consume(email_key)
+    if not allowed:
+        response = jsonify({"status": "error", "msg": f"Trop de tentatives de connexion. Réessayez dans {retry_after} s."})
+        response.headers["Retry-After"] = str(retry_after)
+        return response, 429
+
     user = User.query.filter_by(email=email).first()
-    if not user or not check_password_hash(user.password_hash, password):
+    if not user or not verify_password(user.password_hash, password):
         return jsonify({"status": "error", "msg": "Email ou mot de passe incorrect."}), 401
+    login_by_email.reset(email_key)
 
     if not user.is_active:
         return jsonify({"status": "error", "msg": "Compte désactivé."}), 403
 
     user.last_login = datetime.utcnow()
     db.session.commit()
+    user_cache.invalidate(user.id)
 
     access_token = create_access_token(
         identity=str(user.id),  # ⚠️ toujours string pour JWT
-        expires_delta=timedelta(minutes=30)
+        additional_claims=permission_claims(user),  # droits compilés, lus sans requête par les routes
+        expires_delta=ACCESS_TOKEN_LIFETIME
     )
+    refresh_token = create_refresh_token(identity=str(user.id), expires_delta=REFRESH_TOKEN_LIFETIME)
 
     return jsonify({
         "status": "success",
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "user": {
             "id": user.id,
             "prenom": user.prenom,
@@ -69,18 +106,57 @@ def login():
     }), 200
 
 
+@auth_bp.route("/refresh", methods=["POST"])
+@jwt_required(refresh=True)
+def refresh():
+    """
+    Nouveau jeton d'accès à partir du jeton de rafraîchissement (sans mot de passe).
+    Le jeton de rafraîchissement est à usage unique : il est révoqué et remplacé par un nouveau.
+    """
+    if not current_user.is_active:
+        return jsonify({"status": "error", "msg": "Utilisateur introuvable ou inactif."}), 401
+
+    # Un jeton déjà utilisé (requête concurrente) n'est pas renouvelé une seconde fois
+    if not revocation_store.revoke(get_jwt()):
+        db.session.rollback()
+        return jsonify({"status": "error", "msg": "Jeton de rafraîchissement déjà utilisé."}), 401
+
+    # Droits recompilés depuis la base : un changement de rôle est pris en compte ici
+    user = User.query.get(current_user.id)
+    access_token = create_access_token(
+        identity=str(user.id),
+        additional_claims=permission_claims(user),
+        expires_delta=ACCESS_TOKEN_LIFETIME
+    )
+    refresh_token = create_refresh_token(identity=str(user.id), expires_delta=REFRESH_TOKEN_LIFETIME)
+    db.session.commit()
+    return jsonify({"status": "success", "access_token": access_token, "refresh_token": refresh_token}), 200
+
+
 @auth_bp.route("/logout", methods=["POST"])
 @jwt_required()
 def logout():
-    # ⚠️ Le logout JWT est côté client (suppression du token)
-    return jsonify({"status": "success", "msg": "Déconnexion réussie. Supprimez le token côté client."}), 200
+    """Révoque le jeton d'accès courant et, s'il est fourni, le jeton de rafraîchissement."""
+    revocation_store.revoke(get_jwt())
+
+    refresh_token = (request.get_json(silent=True) or {}).get("refresh_token")
+    if refresh_token:
+        try:
+            payload = decode_token(refresh_token)
+        except Exception:
+            payload = None
+        if (payload and payload.get("type") == "refresh" and payload["sub"] == get_jwt_identity()
+                and not revocation_store.is_revoked(payload)):
+            revocation_store.revoke(payload)
+
+    db.session.commit()
+    return jsonify({"status": "success", "msg": "Déconnexion réussie."}), 200
 
 
 @auth_bp.route("/verify", methods=["GET"])
 @jwt_required()
 def verify_token():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    user = current_user
     if not user or not user.is_active:
         return jsonify({"status": "error", "msg": "Utilisateur introuvable ou inactif."}), 401
 
@@ -91,7 +167,7 @@ def verify_token():
             "email": user.email,
             "prenom": user.prenom,
             "nom": user.nom,
-            "role": user.role.name if user.role else "Inconnu",
+            "role": user.role_name or "Inconnu",
             "last_login": user.last_login.strftime("%Y-%m-%d %H:%M:%S") if user.last_login else None
         },
         "is_login_time_valid": is_valid_login_time()
@@ -128,12 +204,13 @@ def register_user():
             email=email,
             prenom=prenom,
             nom=nom,
-            password_hash=generate_password_hash(password),
+            password_hash=hash_password(password),
             role=role,
             is_active=True
         )
         db.session.add(new_user)
         db.session.commit()
+        presence_board.invalidate()
     except Exception as e:
         db.session.rollback()
         return jsonify({"status": "error", "msg": f"Erreur lors de la création : {str(e)}"}), 500
@@ -191,9 +268,13 @@ def update_user(user_id):
         if not role:
             return jsonify({"status": "error", "msg": f"Rôle '{data['role']}' introuvable."}), 400
         user.role = role
+    if "role" in data or "is_active" in data:
+        record_permission_change(user_id=user.id)
 
     try:
         db.session.commit()
+        presence_board.invalidate()
+        user_cache.invalidate(user.id)
     except Exception as e:
         db.session.rollback()
         return jsonify({"status": "error", "msg": f"Erreur lors de la mise à jour : {str(e)}"}), 500
@@ -229,7 +310,10 @@ def delete_user(user_id):
 
     try:
         db.session.delete(user)
+        record_permission_change(user_id=user.id)
         db.session.commit()
+        presence_board.invalidate()
+        user_cache.invalidate(user.id)
     except Exception as e:
         db.session.rollback()
         return jsonify({"status": "error", "msg": f"Erreur lors de la suppression : {str(e)}"}), 500
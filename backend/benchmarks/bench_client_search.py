@@ -0,0 +1,109 @@
+# benchmarks/bench_client_search.py
+"""
+Recherche de clients sur 500 000 fiches : ILIKE '%x%' sur les six colonnes (balayage complet)
+contre l'index plein texte de services/client_search.py (FTS5 sous SQLite),
+pour une page de 10 résultats avec son total, comme GET /api/clients/?q=.
+
+Usage : python benchmarks/bench_client_search.py [nb_clients]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+N_CLIENTS = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+RUNS = 5
+QUERIES = ["diop", "ndi", "sonatel dakar", "fatou thi", "77123", "zzzz"]
+
+NOMS = ["Diop", "Ndiaye", "Diallo", "Fall", "Sow", "Sarr", "Ba", "Gueye", "Faye", "Mbaye", "Cissé", "Seck",
+        "Kane", "Thiam", "Niang", "Diouf", "Camara", "Touré", "Sy", "Wade"]
+PRENOMS = ["Awa", "Moussa", "Fatou", "Ibrahima", "Aminata", "Cheikh", "Mariama", "Ousmane", "Khady", "Mamadou",
+           "Astou", "Abdoulaye", "Ndeye", "Modou", "Bineta", "Pape"]
+ENTREPRISES = ["Sonatel", "Orange", "Senelec", "Expresso", "CBAO", "Total", "Auchan", "Free", "SDE", "Ecobank",
+               None, None, None]
+VILLES = ["Dakar", "Thiès", "Saint-Louis", "Touba", "Kaolack", "Ziguinchor", "Mbour", "Rufisque", "Louga"]
+
+
+def report(label, samples):
+    print(f"{label:<34} médiane {statistics.median(samples) * 1000:9.1f} ms   min {min(samples) * 1000:9.1f} ms")
+
+
+def seed(db):
+    from sqlalchemy import insert
+    from models import Client
+
+    batch = []
+    for i in range(N_CLIENTS):
+        nom, prenom = random.choice(NOMS), random.choice(PRENOMS)
+        batch.append({"nom": f"{nom}{'' if i % 7 else ' ' + random.choice(NOMS)}", "prenom": prenom,
+                      "entreprise": random.choice(ENTREPRISES), "ville": random.choice(VILLES),
+                      "telephone": f"7{random.choice('0678')}{i:07d}",
+                      "email": f"{prenom.lower()}.{i}@mail.sn", "type_client": "prospect"})
+        if len(batch) == 50_000:
+            db.session.execute(insert(Client), batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(Client), batch)
+    db.session.commit()
+
+
+def page(query, order_by):
+    """Total et première page, comme query.paginate()."""
+    total = query.order_by(None).count()
+    items = query.order_by(*order_by).limit(10).all()
+    return total, items
+
+
+def like_search(q):
+    from sqlalchemy import and_, or_
+    from models import Client
+    from services.client_search import SEARCH_COLUMNS, client_search
+
+    columns = [getattr(Client, c) for c in SEARCH_COLUMNS]
+    query = Client.query.filter(and_(*[or_(*[col.ilike(f"%{t}%") for col in columns])
+                                       for t in client_search.tokens(q)]))
+    return page(query, [Client.created_at.desc()])
+
+
+def indexed_search(q):
+    from models import Client
+    from services.client_search import client_search
+
+    query, rank = client_search.apply(Client.query, q)
+    return page(query, [rank, Client.id])
+
+
+def measure(db, fn, q):
+    samples = []
+    for _ in range(RUNS):
+        db.session.expire_all()
+        start = time.perf_counter()
+        result = fn(q)
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    with app.app_context():
+        start = time.perf_counter()
+        seed(db)
+        print(f"{N_CLIENTS} clients insérés (index FTS5 tenu par triggers) en {time.perf_counter() - start:.1f} s")
+
+        for q in QUERIES:
+            like_samples, (like_total, _) = measure(db, like_search, q)
+            fts_samples, (fts_total, items) = measure(db, indexed_search, q)
+            print(f"\nq={q!r} : {like_total} résultats en sous-chaîne, {fts_total} en début de mot ; "
+                  f"1er : {items[0].nom + ' ' + (items[0].prenom or '') if items else '-'}")
+            report("  ILIKE '%x%' (6 colonnes)", like_samples)
+            report("  Index plein texte", fts_samples)
@@ -0,0 +1,103 @@
+# benchmarks/bench_geofence.py
+"""
+Latence du check-in avec 10 000 zones de travail.
+Compare l'ancienne boucle geodesic à l'index spatial, puis mesure
+l'endpoint /api/attendance/check_in complet sur une base SQLite temporaire.
+
+Usage : python benchmarks/bench_geofence.py [nb_zones] [nb_pointages]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+N_ZONES = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+N_PUNCHES = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+CENTER = (14.7167, -17.4677)  # Dakar
+
+
+def random_point(spread=0.5):
+    return CENTER[0] + random.uniform(-spread, spread), CENTER[1] + random.uniform(-spread, spread)
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} médiane {statistics.median(samples) * 1000:8.3f} ms   p95 {p95 * 1000:8.3f} ms")
+
+
+def bench_lookup(zones, points):
+    from geopy.distance import geodesic
+    from services.geofence import GeofenceIndex
+
+    linear = []
+    for lat, lng in points[:50]:
+        start = time.perf_counter()
+        for _, zlat, zlng, radius in zones:
+            if geodesic((lat, lng), (zlat, zlng)).meters <= radius:
+                break
+        linear.append(time.perf_counter() - start)
+
+    index = GeofenceIndex()
+    start = time.perf_counter()
+    index.build(zones)
+    print(f"Construction de l'index ({len(index)} zones) : {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    indexed = []
+    for lat, lng in points:
+        start = time.perf_counter()
+        index.match(lat, lng)
+        indexed.append(time.perf_counter() - start)
+
+    report("Boucle geodesic (ancienne)", linear)
+    report("Index spatial", indexed)
+
+
+def bench_endpoint(zones, points):
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    from app import create_app
+    from extensions import db
+    from models import User, Role, WorkLocation
+
+    app = create_app()
+    with app.app_context():
+        db.session.bulk_save_objects([
+            WorkLocation(name=f"Zone {i}", latitude=lat, longitude=lng, radius=radius, type="chantier")
+            for i, (_, lat, lng, radius) in enumerate(zones)
+        ])
+        role = Role.query.filter_by(name="Technicien").first()
+        users = [
+            User(username=f"bench{i}", email=f"bench{i}@entreprise.fr", nom="Bench", prenom=str(i),
+                 role=role, password_hash="x")
+            for i in range(len(points))
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+
+        from flask_jwt_extended import create_access_token
+        tokens = [create_access_token(identity=str(u.id)) for u in users]
+
+    client = app.test_client()
+    samples = []
+    for token, (lat, lng) in zip(tokens, points):
+        start = time.perf_counter()
+        client.post(
+            "/api/attendance/check_in",
+            json={"latitude": lat, "longitude": lng, "location_name": f"Chantier {lat:.5f},{lng:.5f}"},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        samples.append(time.perf_counter() - start)
+    report("POST /check_in (index)", samples[1:])
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    zones = [(i + 1, *random_point(), random.choice([50, 100, 150, 300])) for i in range(N_ZONES)]
+    points = [random_point() for _ in range(N_PUNCHES)]
+    bench_lookup(zones, points)
+    bench_endpoint(zones, points)
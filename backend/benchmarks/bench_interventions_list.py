@@ -0,0 +1,144 @@
+# benchmarks/bench_interventions_list.py
+"""
+Liste des interventions sur 200 000 lignes (matériels, autres intervenants, signatures).
+Compare l'ancienne liste (objets ORM complets : jointure des matériels, sous-requête des
+intervenants, colonnes texte) à la projection de GET /api/interventions/, sans puis avec
+les index (statut, date_prevue), (technicien_id, date_prevue), client_id et
+intervention_material.intervention_id (jointure des matériels chargés d'office).
+
+Usage : python benchmarks/bench_interventions_list.py [nb_interventions]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+N_INTERVENTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+N_TECHNICIENS = 40
+N_CLIENTS = 20_000
+RUNS = 5
+STATUTS = ["planifiee", "en_cours", "terminee", "annulee"]
+START = datetime(2024, 1, 1)
+
+# (libellé, filtres de la query string)
+SCENARIOS = [
+    ("statut + mois", {"statut": "planifiee", "date_min": "2025-03-01", "date_max": "2025-03-31"}),
+    ("technicien + trimestre", {"technicien_id": 7, "date_min": "2025-01-01", "date_max": "2025-03-31"}),
+    ("fiche client", {"client_id": 1234}),
+]
+
+
+def report(label, samples):
+    print(f"  {label:<30} médiane {statistics.median(samples) * 1000:9.1f} ms   min {min(samples) * 1000:9.1f} ms")
+
+
+def seed(db):
+    from sqlalchemy import insert
+    from models import Intervention, InterventionMaterial, InventoryItem, User, Role, autres_intervenants_assoc
+
+    role = Role.query.first()
+    db.session.execute(insert(User), [
+        {"username": f"tech{i}", "email": f"tech{i}@entreprise.fr", "nom": "Tech", "prenom": str(i),
+         "role_id": role.id, "password_hash": "x", "is_active": True} for i in range(N_TECHNICIENS)
+    ])
+    tech_ids = [u.id for u in User.query.with_entities(User.id)]
+    db.session.execute(insert(InventoryItem), [{"name": f"Article {i}", "quantity": 100} for i in range(200)])
+    signature = "data:image/png;base64," + "A" * 4000
+
+    for start in range(0, N_INTERVENTIONS, 20_000):
+        rows = []
+        for i in range(start, min(start + 20_000, N_INTERVENTIONS)):
+            statut = random.choice(STATUTS)
+            rows.append({
+                "description": "Installation et mise en service " * 4, "client_id": random.randint(1, N_CLIENTS),
+                "technicien_id": random.choice(tech_ids), "created_by_id": tech_ids[0],
+                "date_prevue": START + timedelta(minutes=random.randint(0, 2 * 365 * 24 * 60)),
+                "statut": statut, "priorite": random.choice(["basse", "normale", "haute"]),
+                "adresse": "Quartier, rue et repères " * 3, "notes": "Notes " * 30,
+                "observations_technicien": "Observation " * 40 if statut == "terminee" else None,
+                "signature_data": signature if statut == "terminee" else None,
+            })
+        db.session.execute(insert(Intervention), rows)
+    db.session.execute(insert(InterventionMaterial), [
+        {"intervention_id": random.randint(1, N_INTERVENTIONS), "article_id": random.randint(1, 200),
+         "quantite": random.randint(1, 5)} for _ in range(N_INTERVENTIONS)
+    ])
+    pairs = {(random.randint(1, N_INTERVENTIONS), random.choice(tech_ids)) for _ in range(N_INTERVENTIONS // 2)}
+    db.session.execute(insert(autres_intervenants_assoc),
+                       [{"intervention_id": i, "user_id": u} for i, u in pairs])
+    db.session.commit()
+
+
+def orm_list(filters):
+    """Ancienne liste : Intervention.query...all() puis sérialisation."""
+    from models import Intervention
+    query = Intervention.query
+    for key in ("statut", "technicien_id", "client_id"):
+        if key in filters:
+            query = query.filter_by(**{key: filters[key]})
+    if "date_min" in filters:
+        query = query.filter(Intervention.date_prevue >= datetime.fromisoformat(filters["date_min"]))
+    if "date_max" in filters:
+        query = query.filter(Intervention.date_prevue <= datetime.fromisoformat(filters["date_max"]))
+    return [{
+        "id": i.id, "description": i.description, "statut": i.statut, "priorite": i.priorite,
+        "client_id": i.client_id, "technicien_id": i.technicien_id,
+        "date_prevue": i.date_prevue.isoformat() if i.date_prevue else None,
+    } for i in query.all()]
+
+
+def endpoint(client, headers, filters):
+    response = client.get("/api/interventions/", query_string=filters, headers=headers)
+    return response.get_json()
+
+
+def measure(db, fn, *args):
+    samples = []
+    for _ in range(RUNS):
+        db.session.expire_all()
+        db.session.remove()
+        start = time.perf_counter()
+        result = fn(*args)
+        samples.append(time.perf_counter() - start)
+    return samples, result
+
+
+if __name__ == "__main__":
+    random.seed(3)
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    from app import create_app
+    from extensions import db
+    from models import Intervention, InterventionMaterial
+    from services.schema import ensure_indexes
+
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        seed(db)
+        headers = {"Authorization": "Bearer " + client.post(
+            "/api/auth/login", json={"email": "admin@entreprise.fr", "password": "admin123"}
+        ).get_json()["access_token"]}
+        print(f"{N_INTERVENTIONS} interventions")
+
+        indexes = [*Intervention.__table__.indexes, *InterventionMaterial.__table__.indexes]
+        for indexed in (False, True):
+            for index in indexes:
+                if indexed:
+                    ensure_indexes(index)
+                else:
+                    index.drop(bind=db.engine, checkfirst=True)
+            db.session.execute(db.text("ANALYZE"))
+            print(f"\n{'Avec' if indexed else 'Sans'} index")
+            for label, filters in SCENARIOS:
+                orm_samples, orm_rows = measure(db, orm_list, filters)
+                api_samples, api_rows = measure(db, endpoint, client, headers, filters)
+                assert sorted(r["id"] for r in orm_rows) == sorted(r["id"] for r in api_rows)
+                print(f" {label} ({len(api_rows)} lignes)")
+                report("ORM complet", orm_samples)
+                report("GET /api/interventions/", api_samples)
@@ -0,0 +1,92 @@
+# benchmarks/bench_materials_batch.py
+"""
+Clôture d'une intervention avec 15 matériels : 15 PATCH /materiels (une ligne chacun)
+contre un seul POST /materiels/batch. Compte les requêtes SQL et mesure la durée ;
+vérifie ensuite qu'aucune sortie de stock n'est perdue ni ne rend le stock négatif
+quand plusieurs threads consomment le même article.
+
+Usage : python benchmarks/bench_materials_batch.py [nb_interventions]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+N_INTERVENTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+N_LINES = 15
+N_THREADS = 8
+
+
+if __name__ == "__main__":
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    from sqlalchemy import event
+    from app import create_app
+    from extensions import db
+    from models import Intervention, InventoryItem
+
+    app = create_app()
+    client = app.test_client()
+    with app.app_context():
+        db.session.add_all([InventoryItem(name=f"Article {i}", quantity=1_000_000) for i in range(N_LINES)])
+        db.session.add_all([Intervention(description="Bench", created_by_id=1, date_prevue=datetime(2025, 6, 2))
+                            for _ in range(2 * N_INTERVENTIONS)])
+        db.session.commit()
+        statements = []
+        event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    headers = {"Authorization": "Bearer " + client.post(
+        "/api/auth/login", json={"email": "admin@entreprise.fr", "password": "admin123"}
+    ).get_json()["access_token"]}
+    lines = [{"action": "add", "article_id": i + 1, "quantite": 2} for i in range(N_LINES)]
+
+    def per_line(intervention_id):
+        for line in lines:
+            assert client.patch(f"/api/interventions/{intervention_id}/materiels", json=line,
+                                headers=headers).status_code == 200
+
+    def batch(intervention_id):
+        assert client.post(f"/api/interventions/{intervention_id}/materiels/batch", json={"lignes": lines},
+                           headers=headers).status_code == 200
+
+    print(f"{N_INTERVENTIONS} clôtures de {N_LINES} matériels")
+    for label, fn, offset in (("15 × PATCH /materiels", per_line, 0), ("POST /materiels/batch", batch, N_INTERVENTIONS)):
+        samples, queries = [], []
+        for k in range(N_INTERVENTIONS):
+            statements.clear()
+            start = time.perf_counter()
+            fn(offset + k + 1)
+            samples.append(time.perf_counter() - start)
+            queries.append(len(statements))
+        print(f"  {label:<24} médiane {statistics.median(samples) * 1000:7.1f} ms   "
+              f"{statistics.median(queries):5.0f} requêtes SQL")
+
+    # Consommation concurrente d'un article au stock limité
+    with app.app_context():
+        item = InventoryItem(name="Rare", quantity=50)
+        db.session.add(item)
+        db.session.commit()
+        rare_id = item.id
+    statuses = []
+
+    def consume(worker):
+        local = app.test_client()
+        for k in range(10):
+            response = local.post(f"/api/interventions/{worker * 10 + k + 1}/materiels/batch",
+                                  json={"lignes": [{"action": "add", "article_id": rare_id, "quantite": 1}]},
+                                  headers=headers)
+            statuses.append(response.status_code)
+
+    threads = [threading.Thread(target=consume, args=(w,)) for w in range(N_THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with app.app_context():
+        remaining = db.session.get(InventoryItem, rare_id).quantity
+    print(f"\nConcurrence : {N_THREADS} threads × 10 sorties d'un article en stock 50 → "
+          f"{statuses.count(200)} acceptées, {statuses.count(409)} en rupture, stock final {remaining}")
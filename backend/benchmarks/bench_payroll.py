@@ -0,0 +1,124 @@
+# benchmarks/bench_payroll.py
+"""
+Calcul de la paie d'un mois pour 1 000 employés (22 jours ouvrés).
+Compare une boucle sur les objets ORM au moteur vectorisé services/payroll.py,
+sur une base SQLite temporaire avec horaires par zone et par rôle et avances approuvées.
+
+Usage : python benchmarks/bench_payroll.py [nb_employes]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, time as dtime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+N_USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+MONTH = date(2026, 9, 1)
+RUNS = 5
+
+
+def report(label, samples):
+    print(f"{label:<30} médiane {statistics.median(samples) * 1000:9.1f} ms   min {min(samples) * 1000:9.1f} ms")
+
+
+def seed(db):
+    from sqlalchemy import insert
+    from models import Attendance, Role, SalaryAdvance, User, WorkLocation, WorkSchedule
+
+    sites = [WorkLocation(name=f"Site {i}", latitude=14.7 + i / 100, longitude=-17.4, radius=100,
+                          type="chantier" if i else "bureau") for i in range(10)]
+    db.session.add_all(sites)
+    db.session.flush()
+    technicien = Role.query.filter_by(name="Technicien").first()
+    db.session.add_all([
+        WorkSchedule(name="Défaut", late_cutoff=dtime(9, 15), daily_hours=8, hourly_rate=1500),
+        WorkSchedule(name="Techniciens", role_id=technicien.id, late_cutoff=dtime(8, 30), daily_hours=8,
+                     hourly_rate=1800),
+        WorkSchedule(name="Chantier 1", work_location_id=sites[1].id, late_cutoff=dtime(7, 45), daily_hours=9,
+                     hourly_rate=2000, overtime_rate=1.5),
+    ])
+    roles = Role.query.all()
+    db.session.execute(insert(User), [
+        {"username": f"pay{i}", "email": f"pay{i}@entreprise.fr", "nom": "Paie", "prenom": str(i),
+         "role_id": random.choice(roles).id, "password_hash": "x", "is_active": True}
+        for i in range(N_USERS)
+    ])
+    user_ids = [u.id for u in User.query.with_entities(User.id)]
+
+    rows, day = [], MONTH
+    while day.month == MONTH.month:
+        if day.weekday() < 5:
+            for user_id in user_ids:
+                check_in = datetime.combine(day, dtime(7, 30)) + timedelta(minutes=random.randint(0, 150))
+                rows.append({"user_id": user_id, "date": day, "check_in": check_in,
+                             "check_out": check_in + timedelta(minutes=random.randint(360, 660)),
+                             "work_location_id": random.choice(sites).id, "status": "present"})
+        day += timedelta(days=1)
+    db.session.execute(insert(Attendance), rows)
+    db.session.execute(insert(SalaryAdvance), [
+        {"user_id": user_id, "montant": 25000, "motif": "bench", "statut": "approuve",
+         "date_demande": MONTH, "approved_at": datetime.combine(MONTH, dtime(12))}
+        for user_id in random.sample(user_ids, len(user_ids) // 4)
+    ])
+    db.session.commit()
+    return len(rows)
+
+
+def orm_loop():
+    """Référence : itération sur les objets ORM, une paie par utilisateur."""
+    from models import Attendance, SalaryAdvance, User
+    from services.payroll import month_bounds
+    from services.rollups import late_minutes_for
+    from services.schedules import schedule_book
+
+    start, end = month_bounds(MONTH)
+    result = {}
+    for user in User.query.filter_by(is_active=True).all():
+        totals = {"worked_hours": 0.0, "overtime_hours": 0.0, "late_minutes": 0, "gross": 0.0}
+        for a in Attendance.query.filter(Attendance.user_id == user.id, Attendance.date >= start,
+                                         Attendance.date < end):
+            schedule = schedule_book.resolve(user.role_id, a.work_location_id)
+            hours = a.total_hours
+            overtime = max(hours - schedule.daily_hours, 0)
+            totals["worked_hours"] += hours
+            totals["overtime_hours"] += overtime
+            totals["late_minutes"] += late_minutes_for(a.check_in, schedule.late_cutoff)
+            totals["gross"] += schedule.hourly_rate * (hours - overtime + overtime * schedule.overtime_rate)
+        advances = sum(adv.montant for adv in SalaryAdvance.query.filter_by(user_id=user.id, statut="approuve"))
+        totals["net"] = totals["gross"] - advances
+        result[user.id] = totals
+    return result
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    from app import create_app
+    from extensions import db
+    from services.payroll import compute_payroll
+
+    app = create_app()
+    with app.app_context():
+        n_rows = seed(db)
+        print(f"{N_USERS} employés, {n_rows} pointages sur {MONTH:%m/%Y}")
+
+        start = time.perf_counter()
+        reference = orm_loop()
+        report("Boucle ORM (référence)", [time.perf_counter() - start])
+
+        samples = []
+        for _ in range(RUNS):
+            db.session.expire_all()
+            start = time.perf_counter()
+            result = compute_payroll(MONTH)
+            samples.append(time.perf_counter() - start)
+        report("Moteur vectorisé", samples)
+
+        diff = max(abs(result.loc[user_id, "net"] - totals["net"]) for user_id, totals in reference.items())
+        late = sum(totals["late_minutes"] for totals in reference.values())
+        print(f"Écart max. du net : {diff:.6f} Fcfa, minutes de retard : {int(result['late_minutes'].sum())} / {late}")
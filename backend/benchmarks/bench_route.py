@@ -0,0 +1,61 @@
+# benchmarks/bench_route.py
+"""
+Ordonnancement d'une tournée (services/routing.py) : matrice de distances vectorisée
+contre une double boucle geodesic, puis plus proche voisin + 2-opt contre l'ordre prévu
+(date_prevue), sur des journées tirées au hasard dans l'agglomération dakaroise.
+
+Usage : python benchmarks/bench_route.py [nb_journées]
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geopy.distance import geodesic  # noqa: E402
+
+from services.routing import distance_matrix, plan_route  # noqa: E402
+
+N_DAYS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+DAKAR = (14.60, 14.80, -17.50, -17.25)
+
+
+def random_day(n):
+    day = datetime(2025, 6, 2, 8)
+    return [{
+        "latitude": random.uniform(*DAKAR[:2]), "longitude": random.uniform(*DAKAR[2:]),
+        "date_prevue": day + timedelta(minutes=30 * random.randint(0, 18)),
+        "priorite": random.choices(["basse", "normale", "haute", "urgente"], [2, 6, 2, 1])[0],
+    } for _ in range(n)]
+
+
+if __name__ == "__main__":
+    random.seed(11)
+
+    print("Matrice de distances")
+    for n in (10, 50, 200):
+        stops = random_day(n)
+        lats = [s["latitude"] for s in stops]
+        lngs = [s["longitude"] for s in stops]
+        start = time.perf_counter()
+        [[geodesic((a, b), (c, d)).m for c, d in zip(lats, lngs)] for a, b in zip(lats, lngs)]
+        loop = time.perf_counter() - start
+        start = time.perf_counter()
+        distance_matrix(lats, lngs)
+        vectorized = time.perf_counter() - start
+        print(f"  {n:>4} arrêts : boucle geodesic {loop * 1000:8.1f} ms   numpy {vectorized * 1000:6.2f} ms")
+
+    print(f"\nTournées ({N_DAYS} journées par taille)")
+    for n in (6, 12, 25):
+        gains, durations = [], []
+        for _ in range(N_DAYS):
+            stops = random_day(n)
+            start = time.perf_counter()
+            _, _, total, planned = plan_route(stops, start=(14.69, -17.44))
+            durations.append(time.perf_counter() - start)
+            gains.append(1 - total / planned)
+        print(f"  {n:>3} arrêts : {statistics.median(durations) * 1000:6.2f} ms médiane, "
+              f"distance −{statistics.mean(gains) * 100:4.1f} % en moyenne par rapport à l'ordre prévu")
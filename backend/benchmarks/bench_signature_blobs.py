@@ -0,0 +1,104 @@
+# benchmarks/bench_signature_blobs.py
+"""
+Signatures hors de la ligne intervention : 100 000 interventions dont 30 % signées
+(PNG de 3 Ko en base64). Mesure la taille moyenne d'une ligne, la taille du fichier
+SQLite (après VACUUM), la mémoire et la durée du chargement ORM de 20 000 interventions
+terminées, avant (colonne base64 chargée comme autrefois) puis après `flask signatures-migrate`.
+
+Usage : python benchmarks/bench_signature_blobs.py [nb_interventions]
+"""
+import base64
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+N_INTERVENTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+SIGNED_RATE = 0.3
+SIGNATURE_BYTES = 3_000
+LIST_SIZE = 20_000
+
+
+def seed(db):
+    from sqlalchemy import insert
+    from models import Intervention
+    start = datetime(2024, 1, 1)
+    for offset in range(0, N_INTERVENTIONS, 10_000):
+        rows = []
+        for _ in range(min(10_000, N_INTERVENTIONS - offset)):
+            signed = random.random() < SIGNED_RATE
+            png = b"\x89PNG\r\n\x1a\n" + random.randbytes(SIGNATURE_BYTES - 8)
+            rows.append({
+                "description": "Installation et mise en service " * 4, "created_by_id": 1,
+                "date_prevue": start + timedelta(minutes=random.randint(0, 365 * 24 * 60)),
+                "statut": "terminee" if signed else random.choice(["planifiee", "en_cours"]),
+                "adresse": "Quartier, rue et repères " * 3, "notes": "Notes " * 30,
+                "signature_data": "data:image/png;base64," + base64.b64encode(png).decode() if signed else None,
+            })
+        db.session.execute(insert(Intervention), rows)
+    db.session.commit()
+
+
+def row_bytes(db):
+    """Taille moyenne des valeurs d'une ligne intervention (somme des length() de chaque colonne)."""
+    from models import Intervention
+    columns = " + ".join(f"coalesce(length({c.name}), 0)" for c in Intervention.__table__.columns)
+    return db.session.execute(db.text(f"SELECT avg({columns}) FROM intervention")).scalar()
+
+
+def file_size(db, path):
+    db.session.commit()
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql("VACUUM")
+    return os.path.getsize(path)
+
+
+def load_list(db, *options):
+    from models import Intervention
+    db.session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = Intervention.query.options(*options).filter_by(statut="terminee").limit(LIST_SIZE).all()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(rows)
+    del rows
+    db.session.expunge_all()
+    return count, elapsed, peak
+
+
+def report(label, size, path_size, loaded):
+    count, elapsed, peak = loaded
+    print(f"  {label:<36} ligne {size:8.0f} o   fichier {path_size / 1e6:7.1f} Mo   "
+          f"{count} interventions : {elapsed * 1000:7.0f} ms, pic mémoire {peak / 1e6:6.1f} Mo")
+
+
+if __name__ == "__main__":
+    random.seed(13)
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "bench.sqlite3")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    os.environ["MEDIA_FOLDER"] = os.path.join(workdir, "media")
+    from sqlalchemy.orm import undefer
+    from app import create_app
+    from extensions import db
+    from models import Intervention
+    from services.blob_store import migrate_signatures
+
+    app = create_app()
+    with app.app_context():
+        seed(db)
+        print(f"{N_INTERVENTIONS} interventions, {SIGNED_RATE:.0%} signées")
+        report("avant (base64 chargé avec la ligne)", row_bytes(db), file_size(db, path),
+               load_list(db, undefer(Intervention.signature_data)))
+
+        stats = migrate_signatures(batch_size=500)
+        print(f"  migration : {stats['migrated']} signatures en {stats['seconds']} s, "
+              f"{stats['base64_bytes'] / 1e6:.1f} Mo de base64 → {stats['file_bytes'] / 1e6:.1f} Mo de fichiers")
+        report("après (empreinte SHA-256)", row_bytes(db), file_size(db, path), load_list(db))
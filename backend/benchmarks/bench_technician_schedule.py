@@ -0,0 +1,103 @@
+# benchmarks/bench_technician_schedule.py
+"""
+Planning des techniciens (services/technician_schedule.py) sur 200 000 interventions.
+Mesure le chargement du planning, la détection de conflits d'un créneau et la recherche
+des créneaux libres de tous les techniciens sur une semaine, comparées aux mêmes calculs
+faits par requête SQL (chevauchement filtré en base, fusion des créneaux en Python).
+
+Usage : python benchmarks/bench_technician_schedule.py [nb_interventions]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bench_interventions_list  # noqa: E402
+
+N_INTERVENTIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+N_CHECKS = 2_000
+WEEK = (datetime(2025, 3, 3), datetime(2025, 3, 10))
+
+
+def report(label, samples, unit="ms"):
+    scale = 1000 if unit == "ms" else 1_000_000
+    print(f"  {label:<42} médiane {statistics.median(samples) * scale:9.1f} {unit}   "
+          f"max {max(samples) * scale:9.1f} {unit}")
+
+
+def sql_conflicts(db, technicien_id, start, end):
+    """Chevauchements calculés en base (technicien principal seul, sans les autres intervenants)."""
+    from models import Intervention
+    rows = db.session.execute(
+        db.select(Intervention.id, Intervention.date_prevue, Intervention.duree_estimee)
+        .where(Intervention.technicien_id == technicien_id, Intervention.statut != "annulee",
+               Intervention.date_prevue < end, Intervention.date_prevue > start - timedelta(hours=8))
+    ).all()
+    return [r for r in rows if r.date_prevue + timedelta(minutes=r.duree_estimee or 60) > start]
+
+
+def sql_free(db, technicien_id, start, end):
+    busy = sorted((r.date_prevue, r.date_prevue + timedelta(minutes=r.duree_estimee or 60))
+                  for r in sql_conflicts(db, technicien_id, start, end))
+    free, cursor = [], start
+    for a, b in busy:
+        if a > cursor:
+            free.append((cursor, a))
+        cursor = max(cursor, b)
+    if cursor < end:
+        free.append((cursor, end))
+    return free
+
+
+if __name__ == "__main__":
+    random.seed(5)
+    bench_interventions_list.N_INTERVENTIONS = N_INTERVENTIONS
+    workdir = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.sqlite3')}"
+    from app import create_app
+    from extensions import db
+    from models import Intervention, User
+    from services.technician_schedule import technician_calendar
+
+    app = create_app()
+    with app.app_context():
+        bench_interventions_list.seed(db)
+        db.session.execute(db.update(Intervention).values(duree_estimee=(db.func.abs(db.func.random()) % 4 + 1) * 30))
+        db.session.commit()
+        tech_ids = [u.id for u in User.query.filter(User.username.like("tech%")).with_entities(User.id)]
+        print(f"{N_INTERVENTIONS} interventions, {len(tech_ids)} techniciens")
+
+        start = time.perf_counter()
+        technician_calendar.ensure_fresh()
+        print(f"Chargement du planning : {time.perf_counter() - start:.2f} s")
+
+        checks = []
+        for _ in range(N_CHECKS):
+            begin = bench_interventions_list.START + timedelta(minutes=random.randint(0, 2 * 365 * 24 * 60))
+            checks.append((random.choice(tech_ids), begin, begin + timedelta(minutes=90)))
+
+        print(f"\nConflits d'un créneau ({N_CHECKS} vérifications)")
+        for label, fn in (("SQL (index technicien, date)", lambda t, a, b: sql_conflicts(db, t, a, b)),
+                          ("planning en mémoire", lambda t, a, b: technician_calendar.conflicts([t], a, b))):
+            samples = []
+            for tech, a, b in checks:
+                t0 = time.perf_counter()
+                fn(tech, a, b)
+                samples.append(time.perf_counter() - t0)
+            report(label, samples, unit="µs")
+
+        print(f"\nCréneaux libres de {len(tech_ids)} techniciens sur une semaine")
+        for label, fn in (("SQL (index technicien, date)", lambda t: sql_free(db, t, *WEEK)),
+                          ("planning en mémoire", lambda t: technician_calendar.free_slots(t, *WEEK))):
+            samples = []
+            for _ in range(20):
+                t0 = time.perf_counter()
+                for tech in tech_ids:
+                    fn(tech)
+                samples.append(time.perf_counter() - t0)
+            report(label, samples)
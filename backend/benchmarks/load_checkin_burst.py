@@ -0,0 +1,80 @@
+# benchmarks/load_checkin_burst.py
+"""
+Test de charge du pic de pointage du matin : N utilisateurs pointent en même temps.
+Compare le débit de /api/attendance/check_in avec et sans écriture groupée
+(ATTENDANCE_GROUP_COMMIT). Chaque mode tourne dans un processus séparé, sur une
+base SQLite temporaire par défaut ou sur BENCH_DATABASE_URL (ex. MySQL de recette).
+
+Usage : python benchmarks/load_checkin_burst.py [nb_utilisateurs] [concurrence]
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+N_USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+
+def run_burst():
+    """Exécuté dans le processus enfant : prépare la base puis lance le pic."""
+    from app import create_app
+    from extensions import db
+    from models import User, Role, WorkLocation
+    from flask_jwt_extended import create_access_token
+
+    app = create_app()
+    with app.app_context():
+        db.session.add(WorkLocation(name="Siège", latitude=14.7167, longitude=-17.4677, radius=200, type="bureau"))
+        role = Role.query.filter_by(name="Technicien").first()
+        db.session.add_all([
+            User(username=f"load{i}", email=f"load{i}@entreprise.fr", nom="Load", prenom=str(i),
+                 role=role, password_hash="x")
+            for i in range(N_USERS)
+        ])
+        db.session.commit()
+        tokens = [create_access_token(identity=str(u.id)) for u in User.query.filter(User.username.like("load%"))]
+
+    def punch(token):
+        client = app.test_client()
+        response = client.post(
+            "/api/attendance/check_in",
+            json={"latitude": 14.7168, "longitude": -17.4676},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        return response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        statuses = list(pool.map(punch, tokens))
+    elapsed = time.perf_counter() - start
+
+    ok = statuses.count(201)
+    mode = "groupé (" + app.config["ATTENDANCE_GROUP_COMMIT_DURABILITY"] + ")" \
+        if app.config["ATTENDANCE_GROUP_COMMIT"] else "direct"
+    print(f"{mode:<18} {ok}/{len(tokens)} pointages en {elapsed:6.2f} s  →  {len(tokens) / elapsed:8.1f} req/s")
+
+
+def spawn(group_commit, durability="commit"):
+    env = dict(os.environ)
+    workdir = tempfile.mkdtemp()
+    env["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'load.sqlite3')}")
+    env["ATTENDANCE_GROUP_COMMIT"] = "1" if group_commit else "0"
+    env["ATTENDANCE_GROUP_COMMIT_DURABILITY"] = durability
+    subprocess.run([sys.executable, "-W", "ignore", __file__, str(N_USERS), str(CONCURRENCY), "--child"],
+                   env=env, cwd=BACKEND_DIR, check=True)
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        run_burst()
+    else:
+        print(f"{N_USERS} utilisateurs, {CONCURRENCY} requêtes simultanées")
+        spawn(False)
+        spawn(True, "commit")
+        spawn(True, "buffer")
@@ -0,0 +1,49 @@
+# benchmarks/query_counts.py
+"""
+Nombre de requêtes SQL par appel sur les principaux endpoints authentifiés,
+mesuré sur une base SQLite temporaire, caches chauds (second passage).
+
+Usage : python benchmarks/query_counts.py
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CASES = [
+    ("GET", "/api/auth/verify", None),
+    ("GET", "/api/auth/users", None),
+    ("GET", "/api/users/", None),
+    ("PATCH", "/api/users/1/password", {"new_password": "admin123"}),
+    ("GET", "/api/attendance/", None),
+    ("GET", "/api/attendance/stats/today", None),
+    ("GET", "/api/attendance/timesheet", None),
+    ("GET", "/api/salary_advances", None),
+    ("GET", "/api/clients/", None),
+]
+
+
+if __name__ == "__main__":
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}"
+    from sqlalchemy import event
+    from app import create_app
+    from extensions import db
+
+    app = create_app()
+    client = app.test_client()
+    token = client.post("/api/auth/login", json={"email": "admin@entreprise.fr", "password": "admin123"})
+    headers = {"Authorization": f"Bearer {token.get_json()['access_token']}"}
+
+    count = [0]
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *args: count.__setitem__(0, count[0] + 1))
+
+    for _ in range(2):  # premier passage : caches froids
+        rows = []
+        for method, url, body in CASES:
+            count[0] = 0
+            response = client.open(url, method=method, json=body, headers=headers)
+            rows.append((method, url, response.status_code, count[0]))
+    for method, url, status, queries in rows:
+        print(f"{method:<6} {url:<32} {status}  {queries} requêtes")
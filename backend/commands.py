@@ -0,0 +1,91 @@
+# commands.py
+# Commandes CLI Flask (flask --app app:create_app <commande>)
+import click
+from flask import Flask
+
+
+def register_commands(app: Flask):
+    """Enregistre les commandes CLI du projet"""
+
+    @app.cli.command("rollups-backfill")
+    @click.option("--chunk-size", default=200, show_default=True, help="Nombre d'utilisateurs par transaction.")
+    def rollups_backfill(chunk_size):
+        """Reconstruit les cumuls de présence jour/mois depuis la table attendance."""
+        from services.rollups import rebuild_rollups
+        total = rebuild_rollups(chunk_size=chunk_size, log=click.echo)
+        click.echo(f"✅ {total} jours de présence cumulés")
+
+    @app.cli.command("zones-merge")
+    @click.option("--eps", default=100.0, show_default=True, help="Distance de regroupement, en mètres.")
+    @click.option("--min-samples", default=2, show_default=True, help="Voisins minimum d'une zone « cœur » (DBSCAN).")
+    @click.option("--apply", "apply_", is_flag=True, help="Applique les fusions (sinon simple aperçu).")
+    def zones_merge(eps, min_samples, apply_):
+        """Regroupe les zones de travail proches et fusionne les doublons créés au pointage."""
+        from services.zone_clustering import propose_merges, apply_merges
+        proposals, rejected = propose_merges(eps=eps, min_samples=min_samples)
+        for p in proposals:
+            merged = ", ".join(f"{z['name']} (#{z['id']}, {z['distance']} m)" for z in p["merge"])
+            click.echo(f"{p['keep']['name']} (#{p['keep']['id']}) ← {merged}")
+        for r in rejected:
+            alone = ", ".join(f"{z['name']} (#{z['id']})" for z in r["unmerged"]) or "aucune"
+            click.echo(f"⚠️ Groupe de {len(r['zones'])} zones étendu sur {r['spread']} m, découpé ; "
+                       f"zones laissées telles quelles : {alone}")
+        zones = sum(len(p["merge"]) for p in proposals)
+        if not apply_:
+            click.echo(f"Aperçu : {zones} zones à fusionner dans {len(proposals)} zones (--apply pour appliquer)")
+            return
+        result = apply_merges(proposals)
+        click.echo(f"✅ {result['zones_removed']} zones fusionnées, {result['attendances_remapped']} pointages remappés")
+
+    @app.cli.command("users-import")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--dry-run", is_flag=True, help="Valide le fichier sans créer les comptes.")
+    def users_import(path, dry_run):
+        """Crée en masse les utilisateurs d'un fichier CSV ou JSON."""
+        from services.provisioning import provision_users, read_rows
+        with open(path, "rb") as f:
+            rows = read_rows(f.read(), path)
+        result = provision_users(rows, dry_run=dry_run)
+        for error in result["errors"]:
+            click.echo(f"Ligne {error['row']} : {error['msg']}")
+        if dry_run:
+            click.echo(f"Aperçu : {result['valid']} comptes valides, {len(result['errors'])} lignes rejetées")
+            return
+        click.echo(f"✅ {len(result['created'])} utilisateurs créés, {len(result['errors'])} lignes rejetées")
+
+    @app.cli.command("clients-import")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--batch-size", default=1000, show_default=True, help="Clients insérés par transaction.")
+    @click.option("--user-id", type=int, default=None, help="Utilisateur à l'origine de l'import (historique).")
+    def clients_import(path, batch_size, user_id):
+        """Importe un fichier CSV ou XLSX de clients (doublons de téléphone rejetés)."""
+        import os
+        from services.client_import import ClientImporter, iter_rows
+        importer = ClientImporter(os.path.basename(path), imported_by_id=user_id, batch_size=batch_size)
+        with open(path, "rb") as f:
+            for stats in importer.steps(iter_rows(f, path)):
+                click.echo(f"{stats['rows']} lignes lues, {stats['inserted']} insérées, "
+                           f"{stats['rejected']} rejetées ({stats['rows_per_second']} lignes/s)")
+        for reject in importer.stats["rejects"]:
+            click.echo(f"Ligne {reject['line']} : {reject['msg']}")
+        click.echo(f"✅ Import #{importer.stats['import_id']} : {importer.stats['inserted']} clients importés "
+                   f"en {importer.stats['seconds']} s")
+
+    @app.cli.command("clients-dedupe")
+    @click.option("--full", is_flag=True, help="Réexamine toute la base (sinon seulement les nouveaux clients).")
+    @click.option("--min-score", default=0.8, show_default=True, help="Score minimal d'une suggestion.")
+    def clients_dedupe(full, min_score):
+        """Détecte les doublons probables de clients et enregistre les suggestions de fusion."""
+        from services.client_dedupe import find_duplicates
+        stats = find_duplicates(full=full, min_score=min_score, log=click.echo)
+        click.echo(f"✅ {stats['suggestions']} suggestions en {stats['seconds']} s")
+
+    @app.cli.command("signatures-migrate")
+    @click.option("--batch-size", default=500, show_default=True, help="Signatures déplacées par transaction.")
+    def signatures_migrate(batch_size):
+        """Déplace les signatures base64 des interventions vers le magasin de fichiers (MEDIA_FOLDER)."""
+        from services.blob_store import migrate_signatures
+        stats = migrate_signatures(batch_size=batch_size, log=click.echo)
+        click.echo(f"✅ {stats['migrated']} signatures migrées ({stats['deduplicated']} déjà présentes, "
+                   f"{stats['invalid']} illisibles) : {stats['base64_bytes'] / 1e6:.1f} Mo retirés de la table, "
+                   f"{stats['file_bytes'] / 1e6:.1f} Mo écrits en {stats['seconds']} s")
@@ -13,12 +13,19 @@ class WorkLocation(db.Model):
     radius = db.Column(db.Integer, default=100)  # meters
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # cf. geofence_index
 
     def __repr__(self):
         return f'<WorkLocation {self.name}>'
 
 class Attendance(db.Model):
     __tablename__ = 'attendance'
+    # Un seul pointage par utilisateur et par jour (sert aussi aux upserts, cf. services/punches.py)
+    # ix_attendance_date_geo : index couvrant de l'agrégation carte (cf. services/checkin_map.py)
+    __table_args__ = (
+        db.Index('uq_attendance_user_date', 'user_id', 'date', unique=True),
+        db.Index('ix_attendance_date_geo', 'date', 'check_in_lat', 'check_in_lng'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     date = db.Column(db.Date, default=date.today)
@@ -45,3 +52,53 @@ class Attendance(db.Model):
     def __repr__(self):
         # user relationship is available via backref from User model
         return f'<Attendance {self.user_id} - {self.date}>'
+
+
+# Cumuls alimentés au pointage de sortie (voir services/rollups.py)
+class AttendanceDaily(db.Model):
+    __tablename__ = 'attendance_daily'
+    __table_args__ = (db.UniqueConstraint('user_id', 'date', name='uq_attendance_daily_user_date'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    worked_hours = db.Column(db.Float, default=0)
+    is_late = db.Column(db.Boolean, default=False)
+    late_minutes = db.Column(db.Integer, default=0)
+
+    def __repr__(self):
+        return f'<AttendanceDaily {self.user_id} - {self.date}>'
+
+class AttendanceMonthly(db.Model):
+    __tablename__ = 'attendance_monthly'
+    __table_args__ = (db.UniqueConstraint('user_id', 'month', name='uq_attendance_monthly_user_month'),)
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    month = db.Column(db.Date, nullable=False)  # premier jour du mois
+    worked_hours = db.Column(db.Float, default=0)
+    days_worked = db.Column(db.Integer, default=0)
+    late_days = db.Column(db.Integer, default=0)
+    late_minutes = db.Column(db.Integer, default=0)
+
+    def __repr__(self):
+        return f'<AttendanceMonthly {self.user_id} - {self.month:%Y-%m}>'
+
+# Horaires de travail configurables (voir services/schedules.py)
+# Priorité : horaire de la zone de pointage, puis du rôle, puis horaire par défaut (ni zone ni rôle)
+class WorkSchedule(db.Model):
+    __tablename__ = 'work_schedule'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    work_location_id = db.Column(db.Integer, db.ForeignKey('work_location.id'), nullable=True)
+    role_id = db.Column(db.Integer, db.ForeignKey('role.id'), nullable=True)
+    late_cutoff = db.Column(db.Time, nullable=False)          # au-delà, l'entrée est comptée en retard
+    daily_hours = db.Column(db.Float, default=8)              # au-delà, heures supplémentaires
+    hourly_rate = db.Column(db.Float, default=0)              # taux horaire (Fcfa)
+    overtime_rate = db.Column(db.Float, default=1.25)         # majoration des heures supplémentaires
+    is_active = db.Column(db.Boolean, default=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    work_location = db.relationship('WorkLocation')
+    role = db.relationship('Role')
+
+    def __repr__(self):
+        return f'<WorkSchedule {self.name}>'
@@ -21,6 +21,8 @@ class Client(db.Model):
     adresse = db.Column(db.Text)
     ville = db.Column(db.String(100))
     code_postal = db.Column(db.String(10))
+    latitude = db.Column(db.Float)      # géocodage de adresse/ville (services/geocoding.py)
+    longitude = db.Column(db.Float)
     type_client = db.Column(db.String(20), default='prospect')  # prospect, client
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     assigned_to = db.Column(db.Integer, db.ForeignKey('user.id'))  # commercial assigné
@@ -41,3 +43,34 @@ class Client(db.Model):
 
     def __repr__(self):
         return f'<Client {self.nom} {self.prenom or ""}>'
+
+# Doublons probables proposés par services/client_dedupe.py (client_id < duplicate_id).
+# Identifiants sans clé étrangère : la suppression d'un client n'est pas bloquée,
+# les suggestions orphelines sont ignorées à la lecture.
+class ClientDuplicate(db.Model):
+    __tablename__ = 'client_duplicate'
+    __table_args__ = (db.UniqueConstraint('client_id', 'duplicate_id', name='uq_client_duplicate_pair'),)
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, nullable=False, index=True)
+    duplicate_id = db.Column(db.Integer, nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+    reasons = db.Column(db.String(255))
+    status = db.Column(db.String(20), default='pending', index=True)  # pending, merged, ignored
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    resolved_at = db.Column(db.DateTime)
+    resolved_by_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+
+    def __repr__(self):
+        return f'<ClientDuplicate {self.client_id}~{self.duplicate_id} {self.score:.2f}>'
+
+# Passes de détection : last_client_id sert de point de reprise aux passes incrémentales
+class ClientDedupeRun(db.Model):
+    __tablename__ = 'client_dedupe_run'
+    id = db.Column(db.Integer, primary_key=True)
+    last_client_id = db.Column(db.Integer, nullable=False)
+    full = db.Column(db.Boolean, default=False)
+    clients = db.Column(db.Integer, default=0)
+    pairs_compared = db.Column(db.Integer, default=0)
+    suggestions = db.Column(db.Integer, default=0)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
@@ -11,6 +11,14 @@ autres_intervenants_assoc = db.Table(
 
 class Intervention(db.Model):
     __tablename__ = 'intervention'
+    __table_args__ = (
+        # Filtres de la liste (statut / technicien sur une période, fiche client)
+        db.Index('ix_intervention_statut_date', 'statut', 'date_prevue'),
+        db.Index('ix_intervention_technicien_date', 'technicien_id', 'date_prevue'),
+        db.Index('ix_intervention_client', 'client_id'),
+        # Relecture des modifications par le planning des techniciens
+        db.Index('ix_intervention_updated', 'updated_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.Text)
     client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=True)
@@ -24,6 +32,8 @@ class Intervention(db.Model):
     statut = db.Column(db.String(20), default='planifiee')  # planifiee, en_cours, terminee, annulee
     priorite = db.Column(db.String(20), default='normale')  # basse, normale, haute, urgente
     adresse = db.Column(db.Text)
+    latitude = db.Column(db.Float)      # lieu d'intervention, sinon celui du client
+    longitude = db.Column(db.Float)
     notes = db.Column(db.Text)
     created_by_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -50,8 +60,11 @@ class Intervention(db.Model):
     id_dvr_nvr = db.Column(db.String(100))
     mdp_dvr_nvr = db.Column(db.String(100))
     qr_code_path = db.Column(db.String(255))
-    signature_data = db.Column(db.Text)
+    # Ancienne signature en base64 : non chargée avec la ligne, migrée vers le magasin de fichiers
+    signature_data = db.deferred(db.Column(db.Text))
+    signature_blob = db.Column(db.String(64))   # SHA-256 du fichier de signature (services/blob_store.py)
     materiels = db.relationship('InterventionMaterial', backref='intervention', lazy='joined')
+    technicien = db.relationship('User', foreign_keys=[technicien_id])
 
     def __repr__(self):
         return f'<Intervention {self.id}>'
@@ -59,7 +72,8 @@ class Intervention(db.Model):
 class InterventionMaterial(db.Model):
     __tablename__ = 'intervention_material'
     id = db.Column(db.Integer, primary_key=True)
-    intervention_id = db.Column(db.Integer, db.ForeignKey('intervention.id'))
+    intervention_id = db.Column(db.Integer, db.ForeignKey('intervention.id'), index=True)
     article_id = db.Column(db.Integer, db.ForeignKey('inventory_item.id'))
     quantite = db.Column(db.Integer, nullable=False)
+    stock_deduit = db.Column(db.Boolean, default=False)   # quantité sortie du stock (lignes récentes)
     article = db.relationship('InventoryItem')
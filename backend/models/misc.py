@@ -33,6 +33,7 @@ class QuoteRequest(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     details = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user = db.relationship('User')
 
 class Devis(db.Model):
     __tablename__ = 'devis'
@@ -56,3 +57,20 @@ class Reminder(db.Model):
     remind_at = db.Column(db.DateTime, nullable=True)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    user = db.relationship('User')
+
+class GeocodeCache(db.Model):
+    """Adresses déjà géocodées (clé normalisée adresse + ville), trouvées ou non."""
+    __tablename__ = 'geocode_cache'
+    id = db.Column(db.Integer, primary_key=True)
+    address_key = db.Column(db.String(255), unique=True, nullable=False)
+    adresse = db.Column(db.Text)        # texte envoyé au fournisseur
+    latitude = db.Column(db.Float)      # None : adresse introuvable chez le fournisseur
+    longitude = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class GeocoderThrottle(db.Model):
+    """Dernier appel à un fournisseur de géocodage, partagé par tous les workers."""
+    __tablename__ = 'geocoder_throttle'
+    provider = db.Column(db.String(50), primary_key=True)
+    called_at = db.Column(db.Float, nullable=False, default=0)   # horodatage Unix
@@ -1,7 +1,7 @@
 # models/user.py
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from extensions import db
+from services.passwords import hash_password, verify_password
 
 class Role(db.Model):
     __tablename__ = 'role'
@@ -33,12 +33,12 @@ class User(db.Model):
     role = db.relationship('Role', backref='users')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         if not self.password_hash:
             return False
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     def has_permission(self, permission):
         """Vérifie permission d'abord au niveau user, puis role."""
@@ -58,3 +58,27 @@ class User(db.Model):
 
     def __repr__(self):
         return f'<User {self.username}>'
+
+# Journal des changements de droits : un jeton émis avant un changement qui concerne
+# son utilisateur (ou son rôle) n'est plus cru sur ses claims (voir services/permissions.py)
+class PermissionChange(db.Model):
+    __tablename__ = 'permission_change'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=True, index=True)   # None : tous les utilisateurs du rôle
+    role_id = db.Column(db.Integer, nullable=True)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<PermissionChange user={self.user_id} role={self.role_id}>'
+
+# Jetons révoqués (déconnexion) ; purgés une fois expirés (voir services/revocation.py)
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_token'
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # lu par les autres workers (fenêtre)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
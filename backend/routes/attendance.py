@@ -1,11 +1,21 @@
 # routes/attendance.py
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from datetime import datetime, date, time
-from geopy.distance import geodesic
+from datetime import datetime, date
 
 from extensions import db
-from models import Attendance, WorkLocation, User
+from models import Attendance, WorkLocation, User, Role, AttendanceDaily, AttendanceMonthly, WorkSchedule
+from services.geofence import geofence_index, DEFAULT_RADIUS
+from services.presence import presence_board
+from services.rollups import record_attendance
+from services.attendance_sync import apply_punches, MAX_BATCH
+from services.punches import upsert_ready, upsert_check_in, close_check_out
+from services.group_commit import checkin_buffer, DURABILITY_BUFFER
+from services.checkin_map import checkin_map, MAX_ZOOM, MAX_TILES, MAX_DAYS
+from services.schedules import schedule_book
+from services.payroll import compute_payroll, payroll_rows
+from services.permissions import has_permission, is_admin
+from services.pagination import paginate
 
 attendance_bp = Blueprint("attendance_bp", __name__)
 
@@ -19,10 +29,9 @@ def get_attendance():
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 10, type=int)
 
-    pagination = (
-        Attendance.query.filter_by(user_id=user_id)
-        .order_by(Attendance.date.desc())
-        .paginate(page=page, per_page=per_page, error_out=False)
+    pagination = paginate(
+        Attendance.query.filter_by(user_id=user_id).order_by(Attendance.date.desc()),
+        page, per_page, filters={"user_id": user_id}
     )
     attendances = pagination.items
 
@@ -43,7 +52,9 @@ def get_attendance():
         "data": data,
         "page": pagination.page,
         "pages": pagination.pages,
-        "total": pagination.total
+        "total": pagination.total,
+        "has_next": pagination.has_next,
+        "total_estimated": pagination.estimated
     }), 200
 
 # -------------------------
@@ -61,15 +72,8 @@ def check_in():
     if latitude is None or longitude is None:
         return jsonify({"success": False, "message": "Coordonnées manquantes"}), 400
 
-    RAYON = 100
-    work_locations = WorkLocation.query.filter_by(is_active=True).all()
-    found_location = None
-
-    for loc in work_locations:
-        distance = geodesic((latitude, longitude), (loc.latitude, loc.longitude)).meters
-        if distance <= RAYON:
-            found_location = loc
-            break
+    # Recherche de la zone via l'index spatial (rayon propre à chaque zone)
+    found_location = geofence_index.find_location(latitude, longitude)
 
     if not found_location:
         if not location_name or not location_name.strip():
@@ -80,12 +84,57 @@ def check_in():
             name=location_name.strip(),
             latitude=latitude,
             longitude=longitude,
-            radius=RAYON,
+            radius=DEFAULT_RADIUS,
             is_active=True,
             type="chantier"
         )
         db.session.add(found_location)
         db.session.commit()
+        geofence_index.add(found_location)
+
+    # Écriture groupée (pic du matin) : le pointage part dans le prochain lot du worker
+    if upsert_ready() and checkin_buffer.enabled():
+        check_in_time = datetime.utcnow()
+        zone_id, zone_name = found_location.id, found_location.name
+        if checkin_buffer.durability == DURABILITY_BUFFER:
+            if presence_board.has_checked_in(user_id):
+                return jsonify({"success": False, "message": "Déjà pointé aujourd'hui"}), 400
+            presence_board.record_check_in(user_id, check_in_time, zone_id, date.today())
+        # Libère la transaction de lecture (et sa connexion) avant d'attendre le lot
+        db.session.rollback()
+        pending = checkin_buffer.submit({
+            "user_id": int(user_id),
+            "date": date.today(),
+            "check_in": check_in_time,
+            "check_in_location": zone_name,
+            "check_in_lat": latitude,
+            "check_in_lng": longitude,
+            "work_location_id": zone_id
+        })
+        if checkin_buffer.durability != DURABILITY_BUFFER:
+            recorded = pending.wait()
+            if recorded is None:
+                return jsonify({"success": False, "message": "Erreur lors de l'enregistrement du pointage"}), 500
+            if not recorded:
+                return jsonify({"success": False, "message": "Déjà pointé aujourd'hui"}), 400
+        return jsonify({"success": True, "message": f"Pointage enregistré à {zone_name}."}), 201
+
+    # Chemin rapide : une seule écriture grâce à l'index unique (user_id, date)
+    if upsert_ready():
+        check_in_time = datetime.utcnow()
+        recorded = upsert_check_in(
+            user_id, date.today(), check_in_time,
+            check_in_location=found_location.name,
+            check_in_lat=latitude,
+            check_in_lng=longitude,
+            work_location_id=found_location.id
+        )
+        if not recorded:
+            db.session.rollback()
+            return jsonify({"success": False, "message": "Déjà pointé aujourd'hui"}), 400
+        db.session.commit()
+        presence_board.record_check_in(user_id, check_in_time, found_location.id, date.today())
+        return jsonify({"success": True, "message": f"Pointage enregistré à {found_location.name}."}), 201
 
     today_attendance = Attendance.query.filter_by(user_id=user_id, date=date.today()).first()
 
@@ -109,7 +158,9 @@ def check_in():
         )
         db.session.add(today_attendance)
 
+    check_in_time = today_attendance.check_in
     db.session.commit()
+    presence_board.record_check_in(user_id, check_in_time, found_location.id, date.today())
     return jsonify({"success": True, "message": f"Pointage enregistré à {found_location.name}."}), 201
 
 # -------------------------
@@ -124,6 +175,21 @@ def check_out():
     longitude = data.get("longitude")
     location_name = data.get("location", "Position inconnue")
 
+    # Chemin rapide : UPDATE conditionnel unique, atomique entre workers
+    if upsert_ready():
+        error, closed = close_check_out(
+            user_id, date.today(), location_name, datetime.utcnow(),
+            check_out_lat=latitude,
+            check_out_lng=longitude
+        )
+        if error:
+            db.session.rollback()
+            return jsonify({"success": False, "message": error}), 400
+        record_attendance(closed)
+        db.session.commit()
+        presence_board.record_check_out(user_id, date.today())
+        return jsonify({"success": True, "message": "Pointage de sortie enregistré avec succès"}), 200
+
     today_attendance = Attendance.query.filter_by(user_id=user_id, date=date.today()).first()
 
     if not today_attendance or not today_attendance.check_in:
@@ -137,41 +203,118 @@ def check_out():
     today_attendance.check_out_location = location_name
     today_attendance.check_out_lat = latitude
     today_attendance.check_out_lng = longitude
+    record_attendance(today_attendance)
 
     db.session.commit()
+    presence_board.record_check_out(user_id, date.today())
     return jsonify({"success": True, "message": "Pointage de sortie enregistré avec succès"}), 200
 
+# -------------------------
+# Synchronisation des pointages hors-ligne (lot ordonné)
+# -------------------------
+@attendance_bp.route("/sync", methods=["POST"])
+@jwt_required()
+def sync_punches():
+    user_id = get_jwt_identity()
+    data = request.get_json() or {}
+    punches = data.get("punches")
+
+    if not isinstance(punches, list) or not punches:
+        return jsonify({"success": False, "message": "Aucun pointage à synchroniser"}), 400
+    if len(punches) > MAX_BATCH:
+        return jsonify({"success": False, "message": f"Maximum {MAX_BATCH} pointages par lot"}), 400
+
+    try:
+        results, applied, created_zones = apply_punches(user_id, punches)
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Synchronisation des pointages de l'utilisateur %s impossible", user_id)
+        return jsonify({"success": False, "message": "Erreur lors de la synchronisation"}), 500
+
+    for zone in created_zones:
+        geofence_index.add(zone)
+    today = date.today()
+    for kind, ts, day, location_id in applied:
+        if day != today:
+            continue
+        if kind == "check_in":
+            presence_board.record_check_in(user_id, ts, location_id, today)
+        else:
+            presence_board.record_check_out(user_id, today)
+
+    return jsonify({
+        "success": True,
+        "applied": len(applied),
+        "rejected": len(results) - len(applied),
+        "results": results
+    }), 200
+
 # -------------------------
 # Statistiques du jour
 # -------------------------
 @attendance_bp.route("/stats/today", methods=["GET"])
 @jwt_required()
 def today_stats():
-    today = date.today()
-    heure_limite = time(9, 15)
+    # Compteurs tenus à jour en mémoire par check_in / check_out
+    stats = presence_board.stats()
+    return jsonify({"success": True, **stats}), 200
 
-    users = User.query.filter_by(is_active=True).all()
-    attendances_today = {a.user_id: a for a in Attendance.query.filter_by(date=today).all()}
+# -------------------------
+# Qui est sur site en ce moment (par zone)
+# -------------------------
+@attendance_bp.route("/on_site/<int:location_id>", methods=["GET"])
+@jwt_required()
+def on_site(location_id):
+    location = WorkLocation.query.get(location_id)
+    if not location:
+        return jsonify({"success": False, "message": "Zone de travail introuvable"}), 404
 
-    presents, absents, retards = [], [], []
+    users = presence_board.on_site(location_id)
+    return jsonify({
+        "success": True,
+        "location": {"id": location.id, "name": location.name},
+        "users": users,
+        "count": len(users)
+    }), 200
 
-    for user in users:
-        attendance = attendances_today.get(user.id)
-        user_name = f"{user.nom} {user.prenom}"
-        if attendance and attendance.check_in:
-            presents.append({"id": user.id, "name": user_name})
-            if attendance.check_in.time() > heure_limite:
-                retards.append({"id": user.id, "name": user_name})
-        else:
-            absents.append({"id": user.id, "name": user_name})
+# -------------------------
+# Carte des pointages : comptes par cellule (admin)
+# -------------------------
+@attendance_bp.route("/map", methods=["GET"])
+@jwt_required()
+def checkin_heatmap():
+    if not is_admin():
+        return jsonify({"success": False, "message": "Accès refusé"}), 403
 
+    try:
+        zoom = int(request.args.get("zoom", 12))
+        # bbox au format min_lng,min_lat,max_lng,max_lat
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in request.args["bbox"].split(","))
+    except (KeyError, ValueError):
+        return jsonify({"success": False, "message": "Paramètres zoom et bbox (min_lng,min_lat,max_lng,max_lat) requis."}), 400
+    if not 0 <= zoom <= MAX_ZOOM or min_lng > max_lng or min_lat > max_lat:
+        return jsonify({"success": False, "message": "Zoom ou emprise invalide."}), 400
+
+    try:
+        start = datetime.strptime(request.args["start"], "%Y-%m-%d").date() if request.args.get("start") else date.today()
+        end = datetime.strptime(request.args["end"], "%Y-%m-%d").date() if request.args.get("end") else start
+    except ValueError:
+        return jsonify({"success": False, "message": "Format de date invalide (YYYY-MM-DD)."}), 400
+    if end < start or (end - start).days >= MAX_DAYS:
+        return jsonify({"success": False, "message": f"Période invalide (au plus {MAX_DAYS} jours)."}), 400
+
+    bbox = (min_lat, min_lng, max_lat, max_lng)
+    if checkin_map.tile_count(zoom, bbox) > MAX_TILES:
+        return jsonify({"success": False, "message": "Emprise trop grande pour ce zoom."}), 400
+
+    cells = checkin_map.aggregate(zoom, bbox, start, end)
     return jsonify({
         "success": True,
-        "date": today.isoformat(),
-        "presents": presents,
-        "absents": absents,
-        "retards": retards,
-        "count": {"presents": len(presents), "absents": len(absents), "retards": len(retards), "total": len(users)}
+        "zoom": zoom,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "cells": cells,
+        "total": sum(c["count"] for c in cells)
     }), 200
 
 # -------------------------
@@ -180,19 +323,15 @@ def today_stats():
 @attendance_bp.route("/<int:user_id>", methods=["GET"])
 @jwt_required()
 def get_user_attendance(user_id):
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-
-    if not current_user or current_user.role.name.lower() != "administrateur":
+    if not is_admin():
         return jsonify({"success": False, "message": "Accès refusé"}), 403
 
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 10, type=int)
 
-    pagination = (
-        Attendance.query.filter_by(user_id=user_id)
-        .order_by(Attendance.date.desc())
-        .paginate(page=page, per_page=per_page, error_out=False)
+    pagination = paginate(
+        Attendance.query.filter_by(user_id=user_id).order_by(Attendance.date.desc()),
+        page, per_page, filters={"user_id": user_id}
     )
     attendances = pagination.items
 
@@ -214,7 +353,9 @@ def get_user_attendance(user_id):
         "attendances": data,
         "page": pagination.page,
         "pages": pagination.pages,
-        "total": pagination.total
+        "total": pagination.total,
+        "has_next": pagination.has_next,
+        "total_estimated": pagination.estimated
     }), 200
 
 # -------------------------
@@ -223,10 +364,7 @@ def get_user_attendance(user_id):
 @attendance_bp.route("/all", methods=["GET"])
 @jwt_required()
 def get_all_attendance():
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-
-    if not current_user or current_user.role.name.lower() != "administrateur":
+    if not is_admin():
         return jsonify({"success": False, "message": "Accès refusé"}), 403
 
     page = request.args.get("page", 1, type=int)
@@ -241,7 +379,7 @@ def get_all_attendance():
         except ValueError:
             return jsonify({"success": False, "message": "Format de date invalide (YYYY-MM-DD)."}), 400
 
-    pagination = query.order_by(Attendance.date.desc()).paginate(page=page, per_page=per_page, error_out=False)
+    pagination = paginate(query.order_by(Attendance.date.desc()), page, per_page)
     attendances = pagination.items
 
     data = [
@@ -263,5 +401,209 @@ def get_all_attendance():
         "attendances": data,
         "page": pagination.page,
         "pages": pagination.pages,
-        "total": pagination.total
+        "total": pagination.total,
+        "has_next": pagination.has_next,
+        "total_estimated": pagination.estimated
     }), 200
+
+# -------------------------
+# Feuille de temps (lecture des cumuls jour / mois)
+# -------------------------
+@attendance_bp.route("/timesheet", methods=["GET"])
+@jwt_required()
+def timesheet():
+    current_user_id = int(get_jwt_identity())
+
+    user_id = request.args.get("user_id", type=int)
+    if not is_admin():
+        if user_id and user_id != current_user_id:
+            return jsonify({"success": False, "message": "Accès refusé"}), 403
+        user_id = current_user_id
+
+    granularity = request.args.get("granularity", "day")
+    if granularity not in ("day", "month"):
+        return jsonify({"success": False, "message": "Granularité invalide (day ou month)."}), 400
+
+    try:
+        start = datetime.strptime(request.args["start"], "%Y-%m-%d").date() if request.args.get("start") else None
+        end = datetime.strptime(request.args["end"], "%Y-%m-%d").date() if request.args.get("end") else None
+    except ValueError:
+        return jsonify({"success": False, "message": "Format de date invalide (YYYY-MM-DD)."}), 400
+
+    if granularity == "day":
+        model, period = AttendanceDaily, AttendanceDaily.date
+    else:
+        model, period = AttendanceMonthly, AttendanceMonthly.month
+        start = start.replace(day=1) if start else None
+
+    query = model.query
+    if user_id:
+        query = query.filter(model.user_id == user_id)
+    if start:
+        query = query.filter(period >= start)
+    if end:
+        query = query.filter(period <= end)
+    rows = query.order_by(model.user_id, period).all()
+
+    data = []
+    totals = {"worked_hours": 0.0, "days_worked": 0, "late_days": 0, "late_minutes": 0}
+    for r in rows:
+        if granularity == "day":
+            item = {"user_id": r.user_id, "date": r.date.isoformat(), "worked_hours": round(r.worked_hours, 2),
+                    "is_late": r.is_late, "late_minutes": r.late_minutes}
+            totals["days_worked"] += 1
+            totals["late_days"] += 1 if r.is_late else 0
+        else:
+            item = {"user_id": r.user_id, "month": r.month.strftime("%Y-%m"), "worked_hours": round(r.worked_hours, 2),
+                    "days_worked": r.days_worked, "late_days": r.late_days, "late_minutes": r.late_minutes}
+            totals["days_worked"] += r.days_worked
+            totals["late_days"] += r.late_days
+        totals["worked_hours"] += r.worked_hours
+        totals["late_minutes"] += r.late_minutes
+        data.append(item)
+    totals["worked_hours"] = round(totals["worked_hours"], 2)
+
+    return jsonify({
+        "success": True,
+        "granularity": granularity,
+        "user_id": user_id,
+        "start": start.isoformat() if start else None,
+        "end": end.isoformat() if end else None,
+        "rows": data,
+        "totals": totals
+    }), 200
+
+# -------------------------
+# Paie du mois : heures, retards, heures sup., avances déduites (admin)
+# -------------------------
+@attendance_bp.route("/payroll", methods=["GET"])
+@jwt_required()
+def payroll():
+    if not has_permission("salary_advances"):
+        return jsonify({"success": False, "message": "Accès refusé"}), 403
+
+    try:
+        month = datetime.strptime(request.args.get("month", date.today().strftime("%Y-%m")), "%Y-%m").date()
+    except ValueError:
+        return jsonify({"success": False, "message": "Format de mois invalide (YYYY-MM)."}), 400
+
+    rows = payroll_rows(compute_payroll(month))
+    totals = {key: round(sum(r[key] for r in rows), 2)
+              for key in ("worked_hours", "overtime_hours", "late_minutes", "gross", "advances", "net")}
+    return jsonify({
+        "success": True,
+        "month": month.strftime("%Y-%m"),
+        "rows": rows,
+        "totals": totals
+    }), 200
+
+# -------------------------
+# Horaires de travail (par zone, par rôle ou par défaut) (admin)
+# -------------------------
+def serialize_schedule(s):
+    return {
+        "id": s.id,
+        "name": s.name,
+        "work_location_id": s.work_location_id,
+        "role_id": s.role_id,
+        "late_cutoff": s.late_cutoff.strftime("%H:%M"),
+        "daily_hours": s.daily_hours,
+        "hourly_rate": s.hourly_rate,
+        "overtime_rate": s.overtime_rate,
+        "is_active": s.is_active,
+    }
+
+
+class ScheduleReferenceError(ValueError):
+    """Zone ou rôle d'un horaire inexistant."""
+
+
+def _apply_schedule_fields(schedule, data):
+    for field, model, message in (("work_location_id", WorkLocation, "Zone introuvable"),
+                                  ("role_id", Role, "Rôle introuvable")):
+        value = data.get(field)
+        if value is None:
+            continue
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise TypeError(field)
+        if db.session.get(model, value) is None:
+            raise ScheduleReferenceError(message)
+    if "late_cutoff" in data:
+        schedule.late_cutoff = datetime.strptime(data["late_cutoff"], "%H:%M").time()
+    for field in ("name", "work_location_id", "role_id", "is_active"):
+        if field in data:
+            setattr(schedule, field, data[field])
+    for field in ("daily_hours", "hourly_rate", "overtime_rate"):
+        if field in data:
+            setattr(schedule, field, float(data[field]))
+
+
+def _schedules_changed():
+    schedule_book.invalidate()
+    presence_board.invalidate()
+
+
+@attendance_bp.route("/schedules", methods=["GET"])
+@jwt_required()
+def list_schedules():
+    if not is_admin():
+        return jsonify({"success": False, "message": "Accès refusé"}), 403
+    schedules = WorkSchedule.query.order_by(WorkSchedule.id).all()
+    return jsonify({"success": True, "schedules": [serialize_schedule(s) for s in schedules]}), 200
+
+
+@attendance_bp.route("/schedules", methods=["POST"])
+@jwt_required()
+def create_schedule():
+    if not is_admin():
+        return jsonify({"success": False, "message": "Accès refusé"}), 403
+    data = request.get_json() or {}
+    if not data.get("name") or not data.get("late_cutoff"):
+        return jsonify({"success": False, "message": "Nom et heure limite (HH:MM) obligatoires"}), 400
+
+    schedule = WorkSchedule()
+    try:
+        _apply_schedule_fields(schedule, data)
+    except ScheduleReferenceError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Valeurs d'horaire invalides"}), 400
+    db.session.add(schedule)
+    db.session.commit()
+    _schedules_changed()
+    return jsonify({"success": True, "schedule": serialize_schedule(schedule)}), 201
+
+
+@attendance_bp.route("/schedules/<int:schedule_id>", methods=["PUT"])
+@jwt_required()
+def update_schedule(schedule_id):
+    if not is_admin():
+        return jsonify({"success": False, "message": "Accès refusé"}), 403
+    schedule = WorkSchedule.query.get(schedule_id)
+    if not schedule:
+        return jsonify({"success": False, "message": "Horaire introuvable"}), 404
+
+    try:
+        _apply_schedule_fields(schedule, request.get_json() or {})
+    except ScheduleReferenceError as e:
+        return jsonify({"success": False, "message": str(e)}), 400
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Valeurs d'horaire invalides"}), 400
+    db.session.commit()
+    _schedules_changed()
+    return jsonify({"success": True, "schedule": serialize_schedule(schedule)}), 200
+
+
+@attendance_bp.route("/schedules/<int:schedule_id>", methods=["DELETE"])
+@jwt_required()
+def delete_schedule(schedule_id):
+    if not is_admin():
+        return jsonify({"success": False, "message": "Accès refusé"}), 403
+    schedule = WorkSchedule.query.get(schedule_id)
+    if not schedule:
+        return jsonify({"success": False, "message": "Horaire introuvable"}), 404
+
+    db.session.delete(schedule)
+    db.session.commit()
+    _schedules_changed()
+    return jsonify({"success": True, "message": "Horaire supprimé"}), 200
@@ -1,8 +1,20 @@
 # routes/client.py
-from flask import Blueprint, request, jsonify
+import json
+import tempfile
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import func, select
+from sqlalchemy.orm import aliased, joinedload, lazyload, selectinload
 from extensions import db
-from models.client import Client
+from auth import admin_required
+from models.client import Client, ClientDuplicate
+from models import Intervention, QuoteRequest, Reminder
+from services.client_search import client_search
+from services.client_import import ClientImporter, import_clients, iter_rows
+from services.client_dedupe import find_duplicates, merge_duplicate
+from services.pagination import paginate
+from services.fieldsets import Fieldset, FieldsetError
 from datetime import datetime
 
 client_bp = Blueprint("client", __name__, url_prefix="/api/clients")
@@ -19,6 +31,8 @@ def serialize_client(client: Client):
         "adresse": client.adresse,
         "ville": client.ville,
         "code_postal": client.code_postal,
+        "latitude": client.latitude,
+        "longitude": client.longitude,
         "type_client": client.type_client,
         "assigned_to": client.assigned_to,
         "is_blacklisted": client.is_blacklisted,
@@ -27,6 +41,13 @@ def serialize_client(client: Client):
     }
 
 
+# Champs sélectionnables par ?fields= sur la liste
+CLIENT_FIELDS = Fieldset(Client, (
+    "nom", "prenom", "entreprise", "email", "telephone", "adresse", "ville", "code_postal",
+    "latitude", "longitude", "type_client", "assigned_to", "is_blacklisted", "note_conversion", "created_at",
+))
+
+
 # ➤ Créer un client
 @client_bp.route("/", methods=["POST"])
 @jwt_required()
@@ -48,6 +69,8 @@ def create_client():
             adresse=data.get("adresse"),
             ville=data.get("ville"),
             code_postal=data.get("code_postal"),
+            latitude=data.get("latitude"),
+            longitude=data.get("longitude"),
             type_client=data.get("type_client", "prospect"),
             assigned_to=data.get("assigned_to")
         )
@@ -59,12 +82,63 @@ def create_client():
         return jsonify({"msg": "Erreur lors de la création du client", "error": str(e)}), 500
 
 
+# ➤ Importer un fichier de clients (CSV ou XLSX, champ "file")
+# ?stream=true : progression renvoyée au fil de l'import (une ligne JSON par lot)
+@client_bp.route("/import", methods=["POST"])
+@jwt_required()
+def import_clients_file():
+    upload = request.files.get("file")
+    if not upload or not upload.filename:
+        return jsonify({"msg": "Aucun fichier fourni."}), 400
+    if not upload.filename.lower().endswith((".csv", ".xlsx", ".xlsm")):
+        return jsonify({"msg": "Format non pris en charge (CSV ou XLSX)."}), 400
+    user_id = int(get_jwt_identity())
+
+    if request.args.get("stream", "false").lower() == "true":
+        # Copie de l'upload : la réponse est produite après la fin de la vue
+        source = tempfile.TemporaryFile()
+        upload.save(source)
+        source.seek(0)
+        filename = upload.filename
+
+        def events():
+            importer = ClientImporter(filename, imported_by_id=user_id)
+            try:
+                for stats in importer.steps(iter_rows(source, filename)):
+                    yield json.dumps({"status": "progress", **{k: v for k, v in stats.items() if k != "rejects"}}) + "\n"
+            except Exception as e:
+                db.session.rollback()
+                yield json.dumps({"status": "error", "msg": "Erreur lors de l'import", "error": str(e)}) + "\n"
+                return
+            finally:
+                source.close()
+            yield json.dumps({"status": "success", **importer.stats}) + "\n"
+        return Response(stream_with_context(events()), mimetype="application/x-ndjson")
+
+    try:
+        stats = import_clients(upload.stream, upload.filename, imported_by_id=user_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "Erreur lors de l'import", "error": str(e)}), 500
+    return jsonify({"msg": f"{stats['inserted']} clients importés, {stats['rejected']} lignes rejetées",
+                    **stats}), 201
+
+
 # ➤ Récupérer tous les clients avec filtres + pagination + tri
 @client_bp.route("/", methods=["GET"])
 @jwt_required()
 def get_clients():
     try:
-        query = Client.query
+        fields = CLIENT_FIELDS.requested()
+    except FieldsetError as e:
+        return jsonify({"msg": str(e)}), 400
+    try:
+        query = CLIENT_FIELDS.apply(Client.query, fields)
+
+        # --- Recherche (nom, prénom, entreprise, téléphone, email, ville ; préfixes acceptés) ---
+        rank = None
+        if q := request.args.get("q"):
+            query, rank = client_search.apply(query, q)
 
         # --- Filtres ---
         if nom := request.args.get("nom"):
@@ -76,24 +150,29 @@ def get_clients():
         if assigned_to := request.args.get("assigned_to"):
             query = query.filter(Client.assigned_to == assigned_to)
 
-        # --- Tri ---
+        # --- Tri (par pertinence pour une recherche, sauf tri explicite) ---
         sort_by = request.args.get("sort_by", "created_at")
         order = request.args.get("order", "desc")
-        if hasattr(Client, sort_by):
+        if rank is not None and "sort_by" not in request.args:
+            query = query.order_by(rank, Client.id)
+        elif hasattr(Client, sort_by):
             sort_attr = getattr(Client, sort_by)
             query = query.order_by(sort_attr.asc() if order == "asc" else sort_attr.desc())
 
         # --- Pagination ---
         page = int(request.args.get("page", 1))
         per_page = int(request.args.get("per_page", 10))
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        pagination = paginate(query, page, per_page)
 
         return jsonify({
             "total": pagination.total,
             "page": pagination.page,
             "per_page": pagination.per_page,
             "pages": pagination.pages,
-            "clients": [serialize_client(c) for c in pagination.items]
+            "has_next": pagination.has_next,
+            "total_estimated": pagination.estimated,
+            "clients": [serialize_client(c) if fields is None else CLIENT_FIELDS.serialize(c, fields)
+                        for c in pagination.items]
         }), 200
     except Exception as e:
         return jsonify({"msg": "Erreur lors de la récupération des clients", "error": str(e)}), 500
@@ -112,6 +191,104 @@ def get_client(client_id):
         return jsonify({"msg": "Erreur lors de la récupération du client", "error": str(e)}), 500
 
 
+def _user_name(user):
+    return f"{user.prenom} {user.nom}" if user else None
+
+
+def _sub_page(query, name, default_per_page=10):
+    """Page d'une sous-liste (?<name>_page, ?<name>_per_page) ; une ligne de plus pour has_next."""
+    page = max(request.args.get(f"{name}_page", 1, type=int), 1)
+    per_page = min(max(request.args.get(f"{name}_per_page", default_per_page, type=int), 1), 100)
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    return rows[:per_page], {"page": page, "per_page": per_page, "has_next": len(rows) > per_page}
+
+
+# ➤ Vue 360 d'un client : fiche, interventions, rappels à venir, demandes de devis
+# Nombre de requêtes fixe quel que soit l'historique (une par liste + une par relation chargée)
+@client_bp.route("/<int:client_id>/overview", methods=["GET"])
+@jwt_required()
+def get_client_overview(client_id):
+    try:
+        client = Client.query.options(joinedload(Client.converted_by)).get(client_id)
+        if not client:
+            return jsonify({"msg": "Client non trouvé"}), 404
+        now = datetime.utcnow()
+
+        interventions, interventions_page = _sub_page(
+            Intervention.query.filter_by(client_id=client_id)
+            .options(lazyload(Intervention.materiels), lazyload(Intervention.autres_intervenants),
+                     selectinload(Intervention.technicien))
+            .order_by(Intervention.date_prevue.desc(), Intervention.id.desc()),
+            "interventions")
+        reminders, reminders_page = _sub_page(
+            Reminder.query.filter(Reminder.client_id == client_id, Reminder.remind_at >= now)
+            .options(selectinload(Reminder.user))
+            .order_by(Reminder.remind_at, Reminder.id),
+            "reminders")
+        quotes, quotes_page = _sub_page(
+            QuoteRequest.query.filter_by(client_id=client_id)
+            .options(selectinload(QuoteRequest.user))
+            .order_by(QuoteRequest.created_at.desc(), QuoteRequest.id.desc()),
+            "quotes")
+
+        # Totaux des trois listes en une requête
+        totals = db.session.execute(select(
+            select(func.count(Intervention.id)).where(Intervention.client_id == client_id).scalar_subquery(),
+            select(func.count(Reminder.id)).where(Reminder.client_id == client_id, Reminder.remind_at >= now)
+            .scalar_subquery(),
+            select(func.count(QuoteRequest.id)).where(QuoteRequest.client_id == client_id).scalar_subquery(),
+        )).one()
+        interventions_page["total"], reminders_page["total"], quotes_page["total"] = totals
+
+        return jsonify({
+            "client": serialize_client(client),
+            "conversion": {
+                "type_client": client.type_client,
+                "converted_by_id": client.converted_by_id,
+                "converted_by": _user_name(client.converted_by),
+                "note_conversion": client.note_conversion,
+                "is_blacklisted": client.is_blacklisted,
+                "date_blacklisted": client.date_blacklisted.isoformat() if client.date_blacklisted else None,
+            },
+            "interventions": {
+                **interventions_page,
+                "items": [{
+                    "id": i.id,
+                    "description": i.description,
+                    "statut": i.statut,
+                    "priorite": i.priorite,
+                    "type_intervention": i.type_intervention,
+                    "date_prevue": i.date_prevue.isoformat() if i.date_prevue else None,
+                    "date_realisation": i.date_realisation.isoformat() if i.date_realisation else None,
+                    "technicien_id": i.technicien_id,
+                    "technicien": _user_name(i.technicien),
+                } for i in interventions]
+            },
+            "reminders": {
+                **reminders_page,
+                "items": [{
+                    "id": r.id,
+                    "remind_at": r.remind_at.isoformat() if r.remind_at else None,
+                    "notes": r.notes,
+                    "user_id": r.user_id,
+                    "user": _user_name(r.user),
+                } for r in reminders]
+            },
+            "quote_requests": {
+                **quotes_page,
+                "items": [{
+                    "id": q.id,
+                    "details": q.details,
+                    "created_at": q.created_at.isoformat() if q.created_at else None,
+                    "user_id": q.user_id,
+                    "user": _user_name(q.user),
+                } for q in quotes]
+            },
+        }), 200
+    except Exception as e:
+        return jsonify({"msg": "Erreur lors de la récupération du client", "error": str(e)}), 500
+
+
 # ➤ Modifier un client
 @client_bp.route("/<int:client_id>", methods=["PUT"])
 @jwt_required()
@@ -122,8 +299,10 @@ def update_client(client_id):
             return jsonify({"msg": "Client non trouvé"}), 404
 
         data = request.get_json()
+        if ("adresse" in data or "ville" in data) and "latitude" not in data:
+            client.latitude = client.longitude = None   # regéocodée à la prochaine tournée
         for field in ["nom", "prenom", "entreprise", "email", "telephone",
-                      "adresse", "ville", "code_postal", "type_client", "assigned_to"]:
+                      "adresse", "ville", "code_postal", "latitude", "longitude", "type_client", "assigned_to"]:
             if field in data:
                 setattr(client, field, data[field])
 
@@ -194,3 +373,87 @@ def blacklist_client(client_id):
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "Erreur lors de la mise en blacklist", "error": str(e)}), 500
+
+
+# ➤ Doublons probables (suggestions de fusion), les plus sûrs d'abord
+@client_bp.route("/duplicates", methods=["GET"])
+@jwt_required()
+def list_duplicates():
+    keeper, duplicate = aliased(Client), aliased(Client)
+    query = (
+        db.session.query(ClientDuplicate, keeper, duplicate)
+        .join(keeper, keeper.id == ClientDuplicate.client_id)
+        .join(duplicate, duplicate.id == ClientDuplicate.duplicate_id)
+        .filter(ClientDuplicate.status == request.args.get("status", "pending"))
+        .order_by(ClientDuplicate.score.desc(), ClientDuplicate.id)
+    )
+    page = int(request.args.get("page", 1))
+    per_page = int(request.args.get("per_page", 20))
+    total = query.order_by(None).count()
+    rows = query.limit(per_page).offset((page - 1) * per_page).all()
+    return jsonify({
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "duplicates": [
+            {
+                "id": d.id,
+                "score": d.score,
+                "reasons": d.reasons,
+                "status": d.status,
+                "client": serialize_client(k),
+                "duplicate": serialize_client(c),
+            } for d, k, c in rows
+        ]
+    }), 200
+
+
+# ➤ Lancer une détection (incrémentale par défaut, {"full": true} pour toute la base)
+@client_bp.route("/duplicates/scan", methods=["POST"])
+@jwt_required()
+@admin_required
+def scan_duplicates():
+    data = request.get_json(silent=True) or {}
+    try:
+        stats = find_duplicates(full=bool(data.get("full", False)))
+        return jsonify({"msg": f"{stats['suggestions']} doublons probables trouvés", **stats}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "Erreur lors de la détection des doublons", "error": str(e)}), 500
+
+
+# ➤ Fusionner un doublon dans le client conservé
+@client_bp.route("/duplicates/<int:duplicate_id>/merge", methods=["POST"])
+@jwt_required()
+def merge_client_duplicate(duplicate_id):
+    suggestion = ClientDuplicate.query.get(duplicate_id)
+    if not suggestion:
+        return jsonify({"msg": "Suggestion non trouvée"}), 404
+    if suggestion.status != "pending":
+        return jsonify({"msg": "Cette suggestion a déjà été traitée."}), 400
+    try:
+        client = merge_duplicate(suggestion, user_id=int(get_jwt_identity()))
+        db.session.commit()
+        return jsonify({"msg": "Clients fusionnés avec succès", "client": serialize_client(client)}), 200
+    except LookupError:
+        db.session.rollback()
+        return jsonify({"msg": "Client non trouvé"}), 404
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "Erreur lors de la fusion", "error": str(e)}), 500
+
+
+# ➤ Écarter une suggestion (clients distincts)
+@client_bp.route("/duplicates/<int:duplicate_id>/ignore", methods=["POST"])
+@jwt_required()
+def ignore_client_duplicate(duplicate_id):
+    suggestion = ClientDuplicate.query.get(duplicate_id)
+    if not suggestion:
+        return jsonify({"msg": "Suggestion non trouvée"}), 404
+    if suggestion.status != "pending":
+        return jsonify({"msg": "Cette suggestion a déjà été traitée."}), 400
+    suggestion.status = "ignored"
+    suggestion.resolved_at = datetime.utcnow()
+    suggestion.resolved_by_id = int(get_jwt_identity())
+    db.session.commit()
+    return jsonify({"msg": "Suggestion écartée"}), 200
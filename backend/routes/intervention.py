@@ -1,11 +1,27 @@
-from datetime import datetime
-from flask import Blueprint, request, jsonify
+import os
+from datetime import datetime, time, timedelta, timezone
+from flask import Blueprint, current_app, request, jsonify, send_file
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload, lazyload
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from extensions import db
-from models import Intervention, Client, User, InterventionMaterial, InventoryItem
+from models import Intervention, Client, User, Role, InterventionMaterial, InventoryItem, autres_intervenants_assoc
+from services.blob_store import BlobError, blob_store, decode_data_url, image_type
+from services.fieldsets import Fieldset, FieldsetError
+from services.geocoding import geocoder
+from services.materials import apply_material_lines
+from services.routing import plan_route
+from services.technician_schedule import FREE_STATUTS, intervention_span, technician_calendar
 
 intervention_bp = Blueprint("interventions", __name__, url_prefix="/api/interventions")
 
+# Champs sélectionnables par ?fields= sur la liste (LIST_FIELDS par défaut)
+LIST_FIELDS = ("id", "description", "statut", "priorite", "client_id", "technicien_id", "date_prevue")
+INTERVENTION_FIELDS = Fieldset(Intervention, (
+    "description", "statut", "priorite", "client_id", "technicien_id", "date_prevue",
+    "date_realisation", "type_intervention", "client_libre_nom", "adresse",
+))
+
 
 # -------------------------------
 # Validation
@@ -18,9 +34,33 @@ def is_valid_intervention_data(data, is_update=False):
         return False
     if "priorite" in data and data["priorite"] not in ["basse", "normale", "haute", "urgente"]:
         return False
+    duree = data.get("duree_estimee")
+    if duree is not None and (not isinstance(duree, int) or isinstance(duree, bool) or duree <= 0):
+        return False
     return True
 
 
+def parse_datetime(value):
+    """ISO 8601 -> datetime UTC naïf, comme les dates stockées (un suffixe Z ou un décalage est converti)."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def schedule_conflicts(intervention_id, technician_ids, date_prevue, duree_estimee, statut):
+    """Interventions des techniciens qui chevauchent le créneau (avertissement, pas de refus)."""
+    if statut in FREE_STATUTS or not date_prevue:
+        return []
+    start, end = intervention_span(date_prevue, duree_estimee)
+    return technician_calendar.conflicts(technician_ids, start, end, exclude_id=intervention_id)
+
+
+def strict_schedule():
+    """?strict=true : un conflit de planning refuse l'enregistrement (409)."""
+    return request.args.get("strict", "").lower() in ("1", "true", "yes")
+
+
 # -------------------------------
 # Créer une intervention
 # -------------------------------
@@ -39,19 +79,28 @@ def create_intervention():
         client_libre_nom=data.get("client_libre_nom"),
         client_libre_telephone=data.get("client_libre_telephone"),
         technicien_id=data.get("technicien_id"),
-        date_prevue=datetime.fromisoformat(data["date_prevue"]),
+        date_prevue=parse_datetime(data["date_prevue"]),
+        duree_estimee=data.get("duree_estimee"),
         created_by_id=data["created_by_id"],
         adresse=data.get("adresse"),
+        latitude=data.get("latitude"),
+        longitude=data.get("longitude"),
         notes=data.get("notes"),
         type_intervention=data.get("type_intervention"),
         societe=data.get("societe"),
         representant=data.get("representant"),
         telephone=data.get("telephone")
     )
+    conflits = schedule_conflicts(None, [intervention.technicien_id], intervention.date_prevue,
+                                  intervention.duree_estimee, intervention.statut)
+    if conflits and strict_schedule():
+        return jsonify({"msg": "Conflit de planning", "conflits": conflits}), 409
+
     db.session.add(intervention)
     db.session.commit()
+    technician_calendar.refresh(intervention.id)
 
-    return jsonify({"msg": "Intervention créée", "id": intervention.id}), 201
+    return jsonify({"msg": "Intervention créée", "id": intervention.id, "conflits": conflits}), 201
 
 
 # -------------------------------
@@ -60,7 +109,10 @@ def create_intervention():
 @intervention_bp.route("/", methods=["GET"])
 @jwt_required()
 def list_interventions():
-    query = Intervention.query
+    try:
+        fields = INTERVENTION_FIELDS.requested() or LIST_FIELDS
+    except FieldsetError as e:
+        return jsonify({"msg": str(e)}), 400
 
     statut = request.args.get("statut")
     priorite = request.args.get("priorite")
@@ -68,30 +120,173 @@ def list_interventions():
     client_id = request.args.get("client_id", type=int)
     date_min = request.args.get("date_min")
     date_max = request.args.get("date_max")
+    limit = request.args.get("limit", type=int)
+    offset = request.args.get("offset", 0, type=int)
 
+    # Projection des seules colonnes listées : ni objets ORM, ni relations, ni gros champs texte
+    stmt = select(*INTERVENTION_FIELDS.columns(fields))
     if statut:
-        query = query.filter_by(statut=statut)
+        stmt = stmt.where(Intervention.statut == statut)
     if priorite:
-        query = query.filter_by(priorite=priorite)
+        stmt = stmt.where(Intervention.priorite == priorite)
     if technicien_id:
-        query = query.filter_by(technicien_id=technicien_id)
+        stmt = stmt.where(Intervention.technicien_id == technicien_id)
     if client_id:
-        query = query.filter_by(client_id=client_id)
+        stmt = stmt.where(Intervention.client_id == client_id)
     if date_min:
-        query = query.filter(Intervention.date_prevue >= datetime.fromisoformat(date_min))
+        stmt = stmt.where(Intervention.date_prevue >= datetime.fromisoformat(date_min))
     if date_max:
-        query = query.filter(Intervention.date_prevue <= datetime.fromisoformat(date_max))
+        stmt = stmt.where(Intervention.date_prevue <= datetime.fromisoformat(date_max))
+
+    stmt = stmt.order_by(Intervention.date_prevue.desc(), Intervention.id.desc())
+    if limit:
+        stmt = stmt.limit(limit).offset(offset)
 
-    interventions = query.all()
-    return jsonify([{
-        "id": i.id,
-        "description": i.description,
-        "statut": i.statut,
-        "priorite": i.priorite,
-        "client_id": i.client_id,
-        "technicien_id": i.technicien_id,
-        "date_prevue": i.date_prevue.isoformat() if i.date_prevue else None
-    } for i in interventions]), 200
+    rows = db.session.execute(stmt)
+    return jsonify([INTERVENTION_FIELDS.serialize_row(row, fields) for row in rows]), 200
+
+
+# -------------------------------
+# Créneaux libres des techniciens
+# -------------------------------
+WORKDAY = (time(8, 0), time(18, 0))
+MAX_AVAILABILITY_DAYS = 31
+
+
+@intervention_bp.route("/availability", methods=["GET"])
+@jwt_required()
+def availability():
+    """
+    Créneaux libres sur [start, end) pour ?technicien_ids=1,2 (par défaut les techniciens actifs),
+    d'au moins ?min_duration minutes, limités aux heures ouvrées (?day_start, ?day_end ; ?workday=false pour 24h/24).
+    """
+    try:
+        start = parse_datetime(request.args["start"]) if request.args.get("start") else datetime.utcnow()
+        end = parse_datetime(request.args["end"]) if request.args.get("end") else start + timedelta(days=7)
+        day_start = time.fromisoformat(request.args.get("day_start") or WORKDAY[0].isoformat())
+        day_end = time.fromisoformat(request.args.get("day_end") or WORKDAY[1].isoformat())
+        ids = [int(i) for i in request.args.get("technicien_ids", "").split(",") if i.strip()]
+    except ValueError:
+        return jsonify({"msg": "Paramètres invalides (dates ISO, heures HH:MM, identifiants entiers)"}), 400
+    if end <= start or end - start > timedelta(days=MAX_AVAILABILITY_DAYS):
+        return jsonify({"msg": f"Période invalide (au plus {MAX_AVAILABILITY_DAYS} jours)"}), 400
+    min_duration = timedelta(minutes=max(request.args.get("min_duration", 30, type=int), 0))
+    if request.args.get("workday", "").lower() in ("0", "false", "no"):
+        day_start = day_end = None
+
+    if ids:
+        users = User.query.filter(User.id.in_(ids)).with_entities(User.id, User.nom, User.prenom).all()
+        if len(users) != len(set(ids)):
+            return jsonify({"msg": "Technicien introuvable"}), 404
+    else:
+        users = (User.query.join(User.role).filter(Role.name == "Technicien", User.is_active.is_(True))
+                 .with_entities(User.id, User.nom, User.prenom).order_by(User.nom, User.prenom).all())
+
+    return jsonify({
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "techniciens": [{
+            "technicien_id": user_id,
+            "nom": f"{prenom} {nom}",
+            "creneaux": [{"debut": a.isoformat(), "fin": b.isoformat(), "minutes": int((b - a).total_seconds() // 60)}
+                         for a, b in technician_calendar.free_slots(user_id, start, end, min_duration,
+                                                                     day_start, day_end)],
+        } for user_id, nom, prenom in users],
+    }), 200
+
+
+# -------------------------------
+# Tournée du jour d'un technicien
+# -------------------------------
+ROUTE_STATUTS = ("planifiee", "en_cours")
+
+
+@intervention_bp.route("/route", methods=["GET"])
+@jwt_required()
+def day_route():
+    """
+    Ordre de passage des interventions du jour d'un technicien (?technicien_id, par défaut
+    l'utilisateur connecté ; ?date=AAAA-MM-JJ, par défaut aujourd'hui ; départ facultatif
+    ?start_lat=&start_lng=). Les lieux sans coordonnées sont géocodés une fois puis gardés.
+    """
+    try:
+        technicien_id = int(request.args.get("technicien_id") or get_jwt_identity())
+        day = datetime.fromisoformat(request.args["date"]).date() if request.args.get("date") else datetime.utcnow().date()
+        start = None
+        if request.args.get("start_lat") and request.args.get("start_lng"):
+            start = (float(request.args["start_lat"]), float(request.args["start_lng"]))
+    except ValueError:
+        return jsonify({"msg": "Paramètres invalides (date AAAA-MM-JJ, coordonnées décimales)"}), 400
+
+    participant = select(autres_intervenants_assoc.c.intervention_id).where(
+        autres_intervenants_assoc.c.user_id == technicien_id)
+    interventions = (
+        Intervention.query
+        .options(lazyload("*"), joinedload(Intervention.client))
+        .filter(
+            (Intervention.technicien_id == technicien_id) | Intervention.id.in_(participant),
+            Intervention.statut.in_(ROUTE_STATUTS),
+            Intervention.date_prevue >= datetime.combine(day, time.min),
+            Intervention.date_prevue < datetime.combine(day + timedelta(days=1), time.min),
+        )
+        .order_by(Intervention.date_prevue, Intervention.id)
+        .all()
+    )
+
+    # Lieu : coordonnées de l'intervention, sinon adresse de l'intervention, sinon fiche client
+    def place(i):
+        if i.latitude is not None or i.adresse or not i.client:
+            return i, (i.adresse, i.client.ville if i.client else None)
+        return i.client, (i.client.adresse, i.client.ville)
+
+    pending = {}
+    for i in interventions:
+        owner, address = place(i)
+        if owner.latitude is None and any(address):
+            pending.setdefault(address, []).append(owner)
+    if pending:
+        for address, coords in geocoder.resolve_many(list(pending)).items():
+            for owner in pending[address] if coords else []:
+                owner.latitude, owner.longitude = coords
+        db.session.commit()
+
+    stops, missing = [], []
+    for i in interventions:
+        owner, _ = place(i)
+        if owner.latitude is None:
+            missing.append(i)
+        else:
+            stops.append({"intervention": i, "latitude": owner.latitude, "longitude": owner.longitude,
+                          "date_prevue": i.date_prevue, "priorite": i.priorite})
+
+    order, legs, total, planned = plan_route(stops, start)
+    if start is None:
+        legs = [0.0] + legs
+
+    def stop_json(i, **extra):
+        return {
+            "id": i.id,
+            "description": i.description,
+            "statut": i.statut,
+            "priorite": i.priorite,
+            "date_prevue": i.date_prevue.isoformat(),
+            "adresse": i.adresse or (i.client.adresse if i.client else None),
+            "client_id": i.client_id,
+            "client_nom": f"{i.client.prenom or ''} {i.client.nom}".strip() if i.client else i.client_libre_nom,
+            **extra,
+        }
+
+    return jsonify({
+        "technicien_id": technicien_id,
+        "date": day.isoformat(),
+        "distance_km": round(total / 1000, 2),
+        "distance_ordre_prevu_km": round(planned / 1000, 2),
+        "arrets": [stop_json(stops[k]["intervention"], ordre=rank + 1,
+                             latitude=stops[k]["latitude"], longitude=stops[k]["longitude"],
+                             distance_precedent_km=round(legs[rank] / 1000, 2))
+                   for rank, k in enumerate(order)],
+        "sans_coordonnees": [stop_json(i) for i in missing],
+    }), 200
 
 
 # -------------------------------
@@ -116,12 +311,15 @@ def get_intervention(id):
         "date_prevue": intervention.date_prevue.isoformat() if intervention.date_prevue else None,
         "date_realisation": intervention.date_realisation.isoformat() if intervention.date_realisation else None,
         "adresse": intervention.adresse,
+        "latitude": intervention.latitude,
+        "longitude": intervention.longitude,
         "notes": intervention.notes,
         "type_intervention": intervention.type_intervention,
         "societe": intervention.societe,
         "representant": intervention.representant,
         "telephone": intervention.telephone,
         "created_by_id": intervention.created_by_id,
+        "signature_url": signature_url(intervention.id, intervention.signature_blob),
         "autres_intervenants": [{"id": u.id, "username": u.username} for u in intervention.autres_intervenants],
         "materiels": [{
             "id": m.id,
@@ -146,21 +344,33 @@ def update_intervention(id):
     if not is_valid_intervention_data(data, is_update=True):
         return jsonify({"msg": "Données invalides"}), 400
 
+    if "adresse" in data and "latitude" not in data:
+        intervention.latitude = intervention.longitude = None   # regéocodée à la prochaine tournée
     for field in [
-        "description", "statut", "priorite", "technicien_id", "adresse", "notes",
-        "type_intervention", "societe", "representant", "telephone",
+        "description", "statut", "priorite", "technicien_id", "duree_estimee", "adresse",
+        "latitude", "longitude", "notes", "type_intervention", "societe", "representant", "telephone",
         "client_libre_nom", "client_libre_telephone"
     ]:
         if field in data:
             setattr(intervention, field, data[field])
 
     if "date_prevue" in data:
-        intervention.date_prevue = datetime.fromisoformat(data["date_prevue"])
+        intervention.date_prevue = parse_datetime(data["date_prevue"])
     if "date_realisation" in data:
-        intervention.date_realisation = datetime.fromisoformat(data["date_realisation"])
+        intervention.date_realisation = parse_datetime(data["date_realisation"])
+
+    conflits = []
+    if {"technicien_id", "date_prevue", "duree_estimee", "statut"} & set(data):
+        conflits = schedule_conflicts(
+            intervention.id, [intervention.technicien_id] + [u.id for u in intervention.autres_intervenants],
+            intervention.date_prevue, intervention.duree_estimee, intervention.statut)
+    if conflits and strict_schedule():
+        db.session.rollback()
+        return jsonify({"msg": "Conflit de planning", "conflits": conflits}), 409
 
     db.session.commit()
-    return jsonify({"msg": "Intervention mise à jour"}), 200
+    technician_calendar.refresh(intervention.id)
+    return jsonify({"msg": "Intervention mise à jour", "conflits": conflits}), 200
 
 
 # -------------------------------
@@ -175,6 +385,7 @@ def delete_intervention(id):
 
     db.session.delete(intervention)
     db.session.commit()
+    technician_calendar.discard(id)
     return jsonify({"msg": "Intervention supprimée"}), 200
 
 
@@ -189,12 +400,108 @@ def complete_intervention(id):
         return jsonify({"msg": "Intervention non trouvée"}), 404
 
     data = request.get_json() or {}
+    if data.get("signature_data"):
+        try:
+            store_signature(intervention, decode_data_url(data["signature_data"]))
+        except BlobError as e:
+            return jsonify({"msg": str(e)}), 400
     intervention.statut = "terminee"
     intervention.notes = data.get("rapport", intervention.notes)
     intervention.date_realisation = datetime.utcnow()
 
     db.session.commit()
-    return jsonify({"msg": "Intervention terminée"}), 200
+    return jsonify({"msg": "Intervention terminée",
+                    "signature_url": signature_url(intervention.id, intervention.signature_blob)}), 200
+
+
+# -------------------------------
+# Signature (fichier adressé par son contenu, hors de la ligne)
+# -------------------------------
+SIGNATURE_MAX_BYTES = 2 * 1024 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def signature_url(intervention_id, digest):
+    """URL versionnée par l'empreinte : une nouvelle signature change l'URL, l'ancienne reste en cache."""
+    return f"/api/interventions/{intervention_id}/signature?v={digest}" if digest else None
+
+
+def store_signature(intervention, data):
+    """Écrit l'image dans le magasin et y fait pointer l'intervention (commit par l'appelant)."""
+    if len(data) > SIGNATURE_MAX_BYTES:
+        raise BlobError(f"Signature trop volumineuse (max {SIGNATURE_MAX_BYTES // 1024} Ko)")
+    if not image_type(data):
+        raise BlobError("Format de signature non reconnu (PNG, JPEG, GIF ou WebP attendu)")
+    intervention.signature_blob, _ = blob_store.put(data)
+    intervention.signature_data = None
+
+
+@intervention_bp.route("/<int:id>/signature", methods=["PUT"])
+@jwt_required()
+def upload_signature(id):
+    """Signature en fichier (multipart, champ file) ou en base64 (JSON signature_data)."""
+    intervention = Intervention.query.get(id)
+    if not intervention:
+        return jsonify({"msg": "Intervention non trouvée"}), 404
+
+    try:
+        if "file" in request.files:
+            data = request.files["file"].read(SIGNATURE_MAX_BYTES + 1)
+        elif (request.get_json(silent=True) or {}).get("signature_data"):
+            data = decode_data_url(request.get_json()["signature_data"])
+        else:
+            return jsonify({"msg": "Aucune signature fournie"}), 400
+        store_signature(intervention, data)
+    except BlobError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    db.session.commit()
+    return jsonify({"msg": "Signature enregistrée",
+                    "signature_url": signature_url(intervention.id, intervention.signature_blob)}), 200
+
+
+@intervention_bp.route("/<int:id>/signature", methods=["GET"])
+@jwt_required()
+def get_signature(id):
+    """
+    Sert le fichier de signature en flux (ETag = empreinte, 304 si inchangé). Avec ?v=<empreinte>,
+    la réponse est immuable et gardée un an par le navigateur. Une signature pas encore migrée
+    est décodée depuis la base.
+    """
+    row = db.session.query(Intervention.signature_blob).filter_by(id=id).first()
+    if not row:
+        return jsonify({"msg": "Intervention non trouvée"}), 404
+
+    digest = row.signature_blob
+    if not digest:
+        legacy = db.session.query(Intervention.signature_data).filter_by(id=id).scalar()
+        if not legacy:
+            return jsonify({"msg": "Aucune signature"}), 404
+        try:
+            data = decode_data_url(legacy)
+        except BlobError as e:
+            return jsonify({"msg": str(e)}), 500
+        response = current_app.response_class(data, mimetype=image_type(data) or "application/octet-stream")
+        response.cache_control.no_store = True
+        return response
+
+    path = blob_store.path(digest)
+    if not os.path.exists(path):
+        return jsonify({"msg": "Fichier de signature introuvable"}), 404
+    with open(path, "rb") as f:
+        mimetype = image_type(f.read(16)) or "application/octet-stream"
+
+    immutable = request.args.get("v") == digest
+    response = send_file(path, mimetype=mimetype, etag=digest, conditional=True,
+                         max_age=IMMUTABLE_MAX_AGE if immutable else 0)
+    response.cache_control.public = False      # send_file marque public dès qu'un max_age est donné
+    response.cache_control.private = True
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    return response
 
 
 # -------------------------------
@@ -215,20 +522,39 @@ def manage_intervenants(id):
     if not user:
         return jsonify({"msg": "Utilisateur introuvable"}), 404
 
+    conflits = []
     if action == "add":
+        conflits = schedule_conflicts(intervention.id, [user.id], intervention.date_prevue,
+                                      intervention.duree_estimee, intervention.statut)
+        if conflits and strict_schedule():
+            return jsonify({"msg": "Conflit de planning", "conflits": conflits}), 409
         intervention.autres_intervenants.append(user)
     elif action == "remove":
         intervention.autres_intervenants.remove(user)
     else:
         return jsonify({"msg": "Action invalide"}), 400
 
+    # La table d'association ne touche pas la ligne : updated_at signale le changement aux autres workers
+    intervention.updated_at = datetime.utcnow()
     db.session.commit()
-    return jsonify({"msg": f"Intervenant {action}"}), 200
+    technician_calendar.refresh(intervention.id)
+    return jsonify({"msg": f"Intervenant {action}", "conflits": conflits}), 200
 
 
 # -------------------------------
 # Gestion des matériels
 # -------------------------------
+def material_result_response(result):
+    """Réponse d'erreur d'apply_material_lines (transaction annulée), None si tout est appliqué."""
+    if result["errors"]:
+        db.session.rollback()
+        return jsonify({"msg": "Lignes invalides", "erreurs": result["errors"]}), 400
+    if result["shortages"]:
+        db.session.rollback()
+        return jsonify({"msg": "Stock insuffisant", "ruptures": result["shortages"]}), 409
+    return None
+
+
 @intervention_bp.route("/<int:id>/materiels", methods=["PATCH"])
 @jwt_required()
 def manage_materiels(id):
@@ -244,21 +570,51 @@ def manage_materiels(id):
     article = InventoryItem.query.get(article_id)
     if not article:
         return jsonify({"msg": "Article introuvable"}), 404
-
-    if action == "add":
-        mat = InterventionMaterial(intervention_id=id, article_id=article_id, quantite=quantite)
-        db.session.add(mat)
-    elif action == "update":
-        mat = InterventionMaterial.query.filter_by(intervention_id=id, article_id=article_id).first()
-        if not mat:
-            return jsonify({"msg": "Matériel non trouvé dans l'intervention"}), 404
-        mat.quantite = quantite
-    elif action == "remove":
-        mat = InterventionMaterial.query.filter_by(intervention_id=id, article_id=article_id).first()
-        if mat:
-            db.session.delete(mat)
-    else:
+    if action not in ("add", "update", "remove"):
         return jsonify({"msg": "Action invalide"}), 400
+    if action == "update" and not InterventionMaterial.query.filter_by(intervention_id=id, article_id=article_id).first():
+        return jsonify({"msg": "Matériel non trouvé dans l'intervention"}), 404
+
+    result = apply_material_lines(id, [{"action": action, "article_id": article_id, "quantite": quantite}])
+    error = material_result_response(result)
+    if error:
+        return error
+    db.session.commit()
+    return jsonify({"msg": f"Matériel {action}"}), 200
+
+
+@intervention_bp.route("/<int:id>/materiels/batch", methods=["POST"])
+@jwt_required()
+def batch_materiels(id):
+    """
+    Applique en une transaction une liste de lignes {"action": add|update|remove, "article_id",
+    "quantite"} et sort du stock la consommation correspondante. Tout ou rien : une ligne invalide
+    (400) ou un article en rupture (409, détail par ligne) annule l'ensemble.
+    """
+    if not db.session.query(Intervention.id).filter_by(id=id).first():
+        return jsonify({"msg": "Intervention non trouvée"}), 404
 
+    data = request.get_json() or {}
+    result = apply_material_lines(id, data.get("lignes"))
+    error = material_result_response(result)
+    if error:
+        return error
     db.session.commit()
-    return jsonify({"msg": f"Matériel {action}"}), 200
\ No newline at end of file
+
+    materiels = (
+        db.session.query(InterventionMaterial.id, InterventionMaterial.article_id, InventoryItem.name,
+                         InterventionMaterial.quantite)
+        .outerjoin(InventoryItem, InventoryItem.id == InterventionMaterial.article_id)
+        .filter(InterventionMaterial.intervention_id == id)
+        .order_by(InterventionMaterial.id)
+        .all()
+    )
+    stock = (InventoryItem.query.filter(InventoryItem.id.in_(result["stock"]))
+             .with_entities(InventoryItem.id, InventoryItem.quantity).all()) if result["stock"] else []
+    return jsonify({
+        "msg": "Matériels mis à jour",
+        "materiels": [{"id": m_id, "article_id": article_id, "article_nom": name, "quantite": quantite}
+                      for m_id, article_id, name, quantite in materiels],
+        "stock": [{"article_id": item_id, "quantity": quantity, "variation": result["stock"][item_id]}
+                  for item_id, quantity in stock],
+    }), 200
\ No newline at end of file
@@ -4,15 +4,32 @@ from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from extensions import db
 from models import InventoryItem, InventoryCategory
+from services.fieldsets import Fieldset, FieldsetError
 
 inventory_bp = Blueprint("inventory", __name__)
 
+# Champs sélectionnables par ?fields= sur la liste
+ITEM_FIELDS = Fieldset(InventoryItem, (
+    "name", "description", "reference", "category_id", "quantity", "unit", "prix_achat", "prix_vente",
+    "seuil_alerte", "fournisseur", "emplacement", "image_path",
+))
+
 # 📌 Récupérer tous les items + catégories
 @inventory_bp.route("/", methods=["GET"])
 def get_inventory():
-    items = InventoryItem.query.order_by(InventoryItem.name).all()
+    try:
+        fields = ITEM_FIELDS.requested()
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+    items = ITEM_FIELDS.apply(InventoryItem.query, fields).order_by(InventoryItem.name).all()
     categories = InventoryCategory.query.order_by(InventoryCategory.name).all()
 
+    if fields is not None:
+        return jsonify({
+            "items": [ITEM_FIELDS.serialize(i, fields) for i in items],
+            "categories": [{"id": c.id, "name": c.name} for c in categories]
+        })
+
     return jsonify({
         "items": [
             {
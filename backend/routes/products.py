@@ -4,13 +4,26 @@ from flask import Blueprint, request, jsonify, current_app
 from werkzeug.utils import secure_filename
 from extensions import db
 from models import Product
+from services.fieldsets import Fieldset, FieldsetError
 
 products_bp = Blueprint("products", __name__)
 
+# Champs sélectionnables par ?fields= sur la liste
+PRODUCT_FIELDS = Fieldset(Product, (
+    "name", "description", "quantity", "alert_quantity", "unit_price", "supplier", "image_path",
+    "created_at", "updated_at",
+))
+
 # Récupérer tous les produits
 @products_bp.route("/", methods=["GET"])
 def get_products():
-    products = Product.query.order_by(Product.description).all()
+    try:
+        fields = PRODUCT_FIELDS.requested()
+    except FieldsetError as e:
+        return jsonify({"error": str(e)}), 400
+    products = PRODUCT_FIELDS.apply(Product.query, fields).order_by(Product.description).all()
+    if fields is not None:
+        return jsonify([PRODUCT_FIELDS.serialize(p, fields) for p in products])
     return jsonify([{
         "id": p.id,
         "name": p.name,
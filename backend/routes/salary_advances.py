@@ -5,6 +5,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime, date
 from extensions import db
 from models import SalaryAdvance, User
+from services.permissions import has_permission, is_admin
 
 salary_advances_bp = Blueprint("salary_advances_bp", __name__, url_prefix="/api/salary_advances")
 
@@ -46,10 +47,9 @@ def create_salary_advance():
 @jwt_required()
 def list_salary_advances():
     user_id = get_jwt_identity()
-    current_user = User.query.get(user_id)
 
     # Si admin → voir tout, sinon → voir uniquement ses demandes
-    if current_user.role.name == "admin":
+    if is_admin():
         advances = SalaryAdvance.query.order_by(SalaryAdvance.created_at.desc()).all()
     else:
         advances = SalaryAdvance.query.filter_by(user_id=user_id).order_by(SalaryAdvance.created_at.desc()).all()
@@ -81,16 +81,14 @@ def list_salary_advances():
 @salary_advances_bp.route('/<int:advance_id>/approve', methods=['POST'])
 @jwt_required()
 def approve_salary_advance(advance_id):
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-
-    if not current_user or not current_user.has_permission("salary_advances"):
+    current_user_id = int(get_jwt_identity())
+    if not has_permission("salary_advances"):
         return jsonify({"error": "Accès refusé"}), 403
 
     advance = SalaryAdvance.query.get_or_404(advance_id)
     advance.statut = 'approuve'
     advance.approved_at = datetime.utcnow()
-    advance.approved_by_id = current_user.id
+    advance.approved_by_id = current_user_id
     advance.notes_admin = request.json.get('notes_admin', '')
 
     db.session.commit()
@@ -106,16 +104,14 @@ def approve_salary_advance(advance_id):
 @salary_advances_bp.route('/<int:advance_id>/refuse', methods=['POST'])
 @jwt_required()
 def refuse_salary_advance(advance_id):
-    current_user_id = get_jwt_identity()
-    current_user = User.query.get(current_user_id)
-
-    if not current_user or not current_user.has_permission("salary_advances"):
+    current_user_id = int(get_jwt_identity())
+    if not has_permission("salary_advances"):
         return jsonify({"error": "Accès refusé"}), 403
 
     advance = SalaryAdvance.query.get_or_404(advance_id)
     advance.statut = 'refuse'
     advance.approved_at = datetime.utcnow()
-    advance.approved_by_id = current_user.id
+    advance.approved_by_id = current_user_id
     advance.notes_admin = request.json.get('notes_admin', '')
 
     db.session.commit()
@@ -4,6 +4,11 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from werkzeug.security import generate_password_hash
 from models import User, Role
 from extensions import db
+from auth import permission_required
+from services.presence import presence_board
+from services.permissions import has_permission, record_permission_change
+from services.current_user import user_cache
+from services.provisioning import provision_users, read_rows
 
 # Blueprint avec url_prefix clair
 users_bp = Blueprint("users_bp", __name__, url_prefix="/api/users")
@@ -13,11 +18,8 @@ users_bp = Blueprint("users_bp", __name__, url_prefix="/api/users")
 # -------------------------
 @users_bp.route("/", methods=["GET"])
 @jwt_required()
+@permission_required("all")
 def list_users():
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or not current_user.has_permission("all"):
-        return jsonify({"msg": "Accès refusé"}), 403
-
     users = User.query.all()
     return jsonify([
         {
@@ -37,11 +39,8 @@ def list_users():
 # -------------------------
 @users_bp.route("/", methods=["POST"])
 @jwt_required()
+@permission_required("all")
 def add_user():
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or not current_user.has_permission("all"):
-        return jsonify({"msg": "Accès refusé"}), 403
-
     data = request.get_json()
     if not data:
         return jsonify({"msg": "Aucune donnée fournie"}), 400
@@ -68,19 +67,45 @@ def add_user():
     new_user.set_password(data["password"])
     db.session.add(new_user)
     db.session.commit()
+    presence_board.invalidate()
 
     return jsonify({"msg": "Utilisateur créé avec succès", "id": new_user.id}), 201
 
+# -------------------------
+# POST : Création en masse (admin only)
+# JSON (liste ou {"users": [...]}) ou fichier CSV/JSON en multipart (champ "file") ;
+# ?dry_run=true pour valider sans créer
+# -------------------------
+@users_bp.route("/bulk", methods=["POST"])
+@jwt_required()
+@permission_required("all")
+def bulk_add_users():
+    try:
+        upload = request.files.get("file")
+        if upload:
+            rows = read_rows(upload.read(), upload.filename or "")
+        else:
+            data = request.get_json(silent=True)
+            rows = data.get("users") if isinstance(data, dict) else data
+        if not isinstance(rows, list) or not rows:
+            return jsonify({"msg": "Aucune donnée fournie"}), 400
+        result = provision_users(rows, dry_run=request.args.get("dry_run", "false").lower() == "true")
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"msg": f"Fichier invalide : {e}"}), 400
+
+    created = len(result["created"])
+    return jsonify({
+        "msg": f"{created} utilisateur(s) créé(s), {len(result['errors'])} ligne(s) rejetée(s)",
+        **result,
+    }), 201 if created else 200
+
 # -------------------------
 # PUT : Mettre à jour un utilisateur (admin only)
 # -------------------------
 @users_bp.route("/<int:user_id>", methods=["PUT"])
 @jwt_required()
+@permission_required("all")
 def update_user(user_id):
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or not current_user.has_permission("all"):
-        return jsonify({"msg": "Accès refusé"}), 403
-
     user = User.query.get_or_404(user_id)
     data = request.get_json()
     if not data:
@@ -108,8 +133,12 @@ def update_user(user_id):
         user.permissions = role.permissions
     if "password" in data and data["password"]:
         user.set_password(data["password"])
+    if "role_id" in data or "is_active" in data:
+        record_permission_change(user_id=user.id)
 
     db.session.commit()
+    presence_board.invalidate()
+    user_cache.invalidate(user.id)
     return jsonify({"msg": "Utilisateur mis à jour avec succès"}), 200
 
 # -------------------------
@@ -117,14 +146,14 @@ def update_user(user_id):
 # -------------------------
 @users_bp.route("/<int:user_id>", methods=["DELETE"])
 @jwt_required()
+@permission_required("all")
 def delete_user(user_id):
-    current_user = User.query.get(get_jwt_identity())
-    if not current_user or not current_user.has_permission("all"):
-        return jsonify({"msg": "Accès refusé"}), 403
-
     user = User.query.get_or_404(user_id)
     db.session.delete(user)
+    record_permission_change(user_id=user.id)
     db.session.commit()
+    presence_board.invalidate()
+    user_cache.invalidate(user.id)
     return jsonify({"msg": "Utilisateur supprimé avec succès"}), 200
 
 
@@ -142,7 +171,7 @@ def change_password(user_id):
         "new_password": "nouveau_mdp"
     }
     """
-    current_user = User.query.get(get_jwt_identity())
+    current_user_id = int(get_jwt_identity())
     target_user = User.query.get_or_404(user_id)
     data = request.get_json()
 
@@ -152,18 +181,19 @@ def change_password(user_id):
     new_password = data["new_password"]
 
     # Vérification si l'utilisateur est admin
-    if current_user.has_permission("all"):
+    if has_permission("all"):
         # Admin peut changer le mot de passe de n'importe qui sans l'ancien
+        username = target_user.username
         target_user.set_password(new_password)
         db.session.commit()
-        return jsonify({"msg": f"Mot de passe de l'utilisateur {target_user.username} mis à jour par l'admin"}), 200
+        return jsonify({"msg": f"Mot de passe de l'utilisateur {username} mis à jour par l'admin"}), 200
     else:
         # Vérification de l'ancien mot de passe
-        if current_user.id != target_user.id:
+        if current_user_id != target_user.id:
             return jsonify({"msg": "Accès refusé"}), 403
         current_password = data.get("current_password", "")
-        if not current_user.check_password(current_password):
+        if not target_user.check_password(current_password):
             return jsonify({"msg": "Mot de passe actuel incorrect"}), 403
-        current_user.set_password(new_password)
+        target_user.set_password(new_password)
         db.session.commit()
         return jsonify({"msg": "Mot de passe mis à jour avec succès"}), 200
\ No newline at end of file
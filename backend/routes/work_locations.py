@@ -1,7 +1,14 @@
+from datetime import datetime
+
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
 from extensions import db
-from models import WorkLocation, User
+from models import WorkLocation, WorkSchedule, User
+from auth import admin_required
+from services.geofence import geofence_index, DEFAULT_RADIUS
+from services.presence import presence_board
+from services.schedules import schedule_book
+from services.zone_clustering import propose_merges, apply_merges
 work_locations_bp = Blueprint("work_locations_bp", __name__)
 
 # 🔹 Récupérer toutes les zones de travail
@@ -38,6 +45,7 @@ def add_work_location():
     )
     db.session.add(location)
     db.session.commit()
+    geofence_index.invalidate()
     return jsonify({"message": "Zone de travail ajoutée avec succès"}), 201
 
 
@@ -49,6 +57,50 @@ def delete_work_location(location_id):
     if not location:
         return jsonify({"error": "Zone de travail introuvable"}), 404
 
+    # Horaires propres à la zone : détachés et désactivés (sans zone ni rôle, ils deviendraient l'horaire par défaut)
+    schedules = WorkSchedule.query.filter_by(work_location_id=location_id).update(
+        {"work_location_id": None, "is_active": False, "updated_at": datetime.utcnow()}, synchronize_session=False
+    )
     db.session.delete(location)
     db.session.commit()
+    geofence_index.invalidate()
+    if schedules:
+        schedule_book.invalidate()
+        presence_board.invalidate()
     return jsonify({"message": "Zone de travail supprimée avec succès"}), 200
+
+
+# 🔹 Regrouper les zones proches (aperçu par défaut, "dry_run": false pour appliquer)
+@work_locations_bp.route("/merge", methods=["POST"])
+@jwt_required()
+@admin_required
+def merge_work_locations():
+    data = request.get_json(silent=True) or {}
+    try:
+        eps = float(data.get("eps", DEFAULT_RADIUS))
+        min_samples = int(data.get("min_samples", 2))
+    except (TypeError, ValueError):
+        return jsonify({"error": "eps et min_samples doivent être numériques"}), 400
+    if eps <= 0 or min_samples < 1:
+        return jsonify({"error": "eps doit être positif et min_samples au moins 1"}), 400
+
+    dry_run = data.get("dry_run", True)
+    if isinstance(dry_run, str):
+        dry_run = dry_run.strip().lower()
+    if dry_run in (True, 1, "true", "1"):
+        dry_run = True
+    elif dry_run in (False, 0, "false", "0"):
+        dry_run = False
+    else:
+        return jsonify({"error": "dry_run doit être un booléen"}), 400
+
+    proposals, rejected = propose_merges(eps=eps, min_samples=min_samples)
+    response = {
+        "dry_run": dry_run,
+        "proposals": proposals,
+        "rejected": rejected,
+        "zones_to_merge": sum(len(p["merge"]) for p in proposals),
+    }
+    if not response["dry_run"]:
+        response.update(apply_merges(proposals))
+    return jsonify(response), 200
@@ -0,0 +1,2 @@
+# services/__init__.py
+# Logique métier partagée entre les routes (index en mémoire, calculs, etc.)
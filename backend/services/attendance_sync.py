@@ -0,0 +1,181 @@
+# services/attendance_sync.py
+import math
+from datetime import datetime, timedelta, timezone
+
+from geopy.distance import geodesic
+from sqlalchemy import insert
+
+from extensions import db
+from models import Attendance, WorkLocation
+from services.geofence import geofence_index, DEFAULT_RADIUS
+from services.rollups import record_attendances
+
+MAX_BATCH = 500
+CLOCK_SKEW = timedelta(minutes=5)
+NEW_DAY_COLUMNS = (
+    "user_id", "date", "status", "check_in", "check_out", "check_in_location", "check_out_location",
+    "check_in_lat", "check_in_lng", "check_out_lat", "check_out_lng", "work_location_id",
+)
+
+
+def _parse_timestamp(value):
+    """ISO 8601 -> datetime UTC naïf (comme datetime.utcnow())."""
+    ts = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def _parse_coordinate(value):
+    """Latitude ou longitude -> float fini ; None si absente, ValueError si non numérique."""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        raise ValueError(value)
+    value = float(value)
+    if not math.isfinite(value):
+        raise ValueError(value)
+    return value
+
+
+def apply_punches(user_id, punches):
+    """
+    Rejoue un lot ordonné de pointages hors-ligne pour un utilisateur.
+    Les zones sont résolues pour tout le lot, les pointages du lot sont chargés en une
+    requête, et tout est appliqué dans une seule transaction. Retourne
+    (résultats par pointage, [(type, horodatage, jour, zone)] appliqués, zones créées) ;
+    le commit est fait ici.
+    """
+    user_id = int(user_id)
+    now = datetime.utcnow()
+    results, parsed = [], []
+
+    # 1. Validation
+    for i, punch in enumerate(punches):
+        if not isinstance(punch, dict):
+            results.append({"index": i, "success": False, "message": "Pointage invalide"})
+            continue
+        kind = punch.get("type")
+        if kind not in ("check_in", "check_out"):
+            results.append({"index": i, "success": False, "message": "Type de pointage invalide"})
+            continue
+        try:
+            ts = _parse_timestamp(punch.get("timestamp"))
+        except (TypeError, ValueError):
+            results.append({"index": i, "success": False, "message": "Horodatage invalide"})
+            continue
+        if ts > now + CLOCK_SKEW:
+            results.append({"index": i, "success": False, "message": "Horodatage invalide"})
+            continue
+        try:
+            lat, lng = _parse_coordinate(punch.get("latitude")), _parse_coordinate(punch.get("longitude"))
+        except ValueError:
+            results.append({"index": i, "success": False, "message": "Coordonnées invalides"})
+            continue
+        if kind == "check_in" and (lat is None or lng is None):
+            results.append({"index": i, "success": False, "message": "Coordonnées manquantes"})
+            continue
+        if not all(isinstance(punch.get(field) or "", str) for field in ("location_name", "location")):
+            results.append({"index": i, "success": False, "message": "Nom de zone invalide"})
+            continue
+        punch = {**punch, "latitude": lat, "longitude": lng}
+        results.append(None)
+        parsed.append((i, kind, ts, punch))
+
+    # 2. Résolution des zones pour tout le lot
+    geofence_index.ensure_fresh()
+    zone_ids = {}
+    for i, kind, ts, punch in parsed:
+        if kind == "check_in":
+            zone_ids[i] = geofence_index.match(punch["latitude"], punch["longitude"])
+
+    names = {(punch.get("location_name") or "").strip() for i, kind, ts, punch in parsed
+             if kind == "check_in" and zone_ids[i] is None}
+    names.discard("")
+    taken = {row.name for row in WorkLocation.query.filter(WorkLocation.name.in_(names))
+             .with_entities(WorkLocation.name)} if names else set()
+
+    locations = {loc.id: loc for loc in WorkLocation.query.filter(
+        WorkLocation.id.in_({z for z in zone_ids.values() if z is not None}))} if zone_ids else {}
+
+    # 3. Pointages existants des jours concernés, en une requête
+    days = {ts.date() for i, kind, ts, punch in parsed}
+    existing = {}
+    if days:
+        for a in Attendance.query.filter(Attendance.user_id == user_id, Attendance.date.in_(days)):
+            existing.setdefault(a.date, a)
+
+    # 4. Application dans l'ordre du lot (en mémoire ; les nouveaux jours restent hors session)
+    created_zones, applied, new_days, zone_of = [], [], [], {}
+    for i, kind, ts, punch in parsed:
+        day = ts.date()
+        attendance = existing.get(day)
+
+        if kind == "check_in":
+            lat, lng = punch["latitude"], punch["longitude"]
+            location = locations.get(zone_ids[i])
+            if location is None:
+                location = next((z for z in created_zones
+                                 if geodesic((lat, lng), (z.latitude, z.longitude)).meters <= z.radius), None)
+            if location is None:
+                name = (punch.get("location_name") or "").strip()
+                if not name:
+                    results[i] = {"index": i, "success": False, "need_zone_name": True,
+                                  "message": "Aucune zone trouvée, veuillez saisir un nom."}
+                    continue
+                if name in taken:
+                    results[i] = {"index": i, "success": False, "message": "Ce nom existe déjà."}
+                    continue
+                location = WorkLocation(name=name, latitude=lat, longitude=lng, radius=DEFAULT_RADIUS,
+                                        is_active=True, type="chantier")
+                db.session.add(location)
+                created_zones.append(location)
+                taken.add(name)
+
+            if attendance and attendance.check_in:
+                results[i] = {"index": i, "success": False, "message": "Déjà pointé aujourd'hui"}
+                continue
+            if not attendance:
+                attendance = Attendance(user_id=user_id, date=day, status="present")
+                existing[day] = attendance
+                new_days.append(attendance)
+            attendance.check_in = ts
+            attendance.check_in_location = location.name
+            attendance.check_in_lat = lat
+            attendance.check_in_lng = lng
+            zone_of[day] = location
+            results[i] = {"index": i, "success": True, "message": f"Pointage enregistré à {location.name}."}
+        else:
+            location_name = punch.get("location", "Position inconnue")
+            if not attendance or not attendance.check_in:
+                results[i] = {"index": i, "success": False, "message": "Vous devez d'abord pointer votre entrée"}
+                continue
+            if attendance.check_out:
+                results[i] = {"index": i, "success": False, "message": "Déjà pointé la sortie aujourd'hui"}
+                continue
+            if location_name != attendance.check_in_location:
+                results[i] = {"index": i, "success": False, "message": "Zone de sortie différente de l'entrée."}
+                continue
+            if ts < attendance.check_in:
+                results[i] = {"index": i, "success": False, "message": "Horodatage invalide"}
+                continue
+            attendance.check_out = ts
+            attendance.check_out_location = location_name
+            attendance.check_out_lat = punch.get("latitude")
+            attendance.check_out_lng = punch.get("longitude")
+            results[i] = {"index": i, "success": True, "message": "Pointage de sortie enregistré avec succès"}
+        applied.append((kind, ts, attendance))
+
+    # 5. Écriture : zones créées, jours existants modifiés, nouveaux jours en un INSERT multi-lignes
+    if created_zones:
+        db.session.flush()
+    for day, location in zone_of.items():
+        existing[day].work_location_id = location.id
+    if new_days:
+        db.session.execute(insert(Attendance), [
+            {column: getattr(a, column) for column in NEW_DAY_COLUMNS} for a in new_days
+        ])
+    record_attendances([attendance for kind, ts, attendance in applied if kind == "check_out"])
+    summary = [(kind, ts, attendance.date, attendance.work_location_id) for kind, ts, attendance in applied]
+    db.session.commit()
+    return results, summary, created_zones
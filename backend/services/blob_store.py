@@ -0,0 +1,146 @@
+# services/blob_store.py
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+import time
+
+from flask import current_app
+from sqlalchemy import bindparam, select, update
+
+from extensions import db
+from models import Intervention
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+DATA_URL_RE = re.compile(r"^data:([\w/+.-]+)?(;base64)?,", re.IGNORECASE)
+IMAGE_TYPES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class BlobError(ValueError):
+    """Contenu refusé (base64 illisible, format non reconnu, taille)."""
+
+
+def image_type(data):
+    """Type MIME d'une image d'après ses premiers octets, None si non reconnu."""
+    for magic, content_type in IMAGE_TYPES:
+        if data.startswith(magic):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def decode_data_url(value):
+    """Octets d'une image en base64, avec ou sans préfixe data:image/...;base64,."""
+    match = DATA_URL_RE.match(value)
+    payload = re.sub(r"\s+", "", value[match.end():] if match else value)
+    try:
+        return base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError) as e:
+        raise BlobError(f"Base64 illisible : {e}") from e
+
+
+class BlobStore:
+    """
+    Fichiers adressés par leur contenu (SHA-256), rangés dans MEDIA_FOLDER/ab/cd/<sha256>.
+    Un même contenu n'est écrit qu'une fois ; l'écriture passe par un fichier temporaire
+    renommé, si bien qu'un lecteur ne voit jamais de fichier partiel. Les fichiers ne sont
+    jamais modifiés, ce qui permet de les servir avec un cache long.
+    """
+
+    def __init__(self, root=None):
+        self._root = root
+
+    @property
+    def root(self):
+        return os.path.abspath(self._root or current_app.config["MEDIA_FOLDER"])
+
+    def path(self, digest):
+        if not DIGEST_RE.match(digest or ""):
+            raise BlobError("Empreinte invalide")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def put(self, data):
+        """Enregistre des octets ; retourne (empreinte, créé) — créé est False si le contenu existait."""
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.path(digest)
+        if os.path.exists(target):
+            return digest, False
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest, True
+
+
+# Magasin partagé par toutes les requêtes du worker (racine lue dans la config de l'application)
+blob_store = BlobStore()
+
+
+def migrate_signatures(batch_size=500, log=None):
+    """
+    Déplace les signatures base64 de la table intervention vers le magasin de fichiers,
+    par lots d'identifiants croissants (un commit par lot, reprise possible à tout moment).
+    Les lignes illisibles sont laissées en place et comptées. updated_at n'est pas modifié.
+    """
+    table = Intervention.__table__
+    stats = {"rows": 0, "migrated": 0, "deduplicated": 0, "invalid": 0,
+             "base64_bytes": 0, "file_bytes": 0, "seconds": 0.0}
+    started = time.perf_counter()
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.signature_data)
+            .where(table.c.id > last_id, table.c.signature_data.isnot(None), table.c.signature_blob.is_(None))
+            .order_by(table.c.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        moved = []
+        for intervention_id, value in rows:
+            last_id = intervention_id
+            stats["rows"] += 1
+            try:
+                data = decode_data_url(value)
+                if not data:
+                    raise BlobError("Signature vide")
+            except BlobError as e:
+                stats["invalid"] += 1
+                if log:
+                    log(f"Intervention {intervention_id} : {e}")
+                continue
+            digest, created = blob_store.put(data)
+            stats["migrated"] += 1
+            stats["deduplicated"] += not created
+            stats["base64_bytes"] += len(value)
+            stats["file_bytes"] += len(data) if created else 0
+            moved.append({"row_id": intervention_id, "digest": digest})
+        if moved:
+            db.session.execute(
+                # Une signature envoyée entre-temps (PUT /signature) n'est pas écrasée par l'ancienne
+                update(table).where(table.c.id == bindparam("row_id"), table.c.signature_blob.is_(None))
+                .values(signature_blob=bindparam("digest"), signature_data=None, updated_at=table.c.updated_at),
+                moved,
+            )
+        db.session.commit()
+        if log:
+            log(f"{stats['rows']} signatures lues, {stats['migrated']} migrées (jusqu'à l'intervention {last_id})")
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
@@ -0,0 +1,174 @@
+# services/checkin_map.py
+import math
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+import numpy as np
+from sqlalchemy import func
+
+from models import Attendance
+
+MAX_ZOOM = 20
+CELL_BITS = 3              # chaque tuile est découpée en 2^3 × 2^3 cellules
+MAX_TILES = 1024           # tuiles par requête (limite la taille de la réponse)
+MAX_DAYS = 366
+MAX_ENTRIES = 200_000      # entrées (jour, tuile) gardées en cache par worker
+MERCATOR_MAX_LAT = 85.05112878
+
+
+def tile_coords(lats, lngs, zoom):
+    """Coordonnées Web Mercator flottantes (x, y) à un niveau de zoom, vectorisées."""
+    n = 2 ** zoom
+    lat_rad = np.radians(np.clip(lats, -MERCATOR_MAX_LAT, MERCATOR_MAX_LAT))
+    x = (np.asarray(lngs, dtype=np.float64) + 180.0) / 360.0 * n
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / math.pi) / 2.0 * n
+    return np.clip(x, 0, n - 1e-9), np.clip(y, 0, n - 1e-9)
+
+
+def tile_bounds(zoom, tx, ty):
+    """(min_lat, min_lng, max_lat, max_lng) d'une tuile."""
+    n = 2 ** zoom
+
+    def lat(y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+
+    return lat(ty + 1), tx / n * 360.0 - 180.0, lat(ty), (tx + 1) / n * 360.0 - 180.0
+
+
+class CheckInMap:
+    """
+    Agrégats des coordonnées de pointage d'entrée pour la carte RH.
+    Chaque (jour, tuile) est calculé une fois en NumPy (comptes et barycentres par
+    cellule) puis gardé en cache LRU ; un jour est recalculé si son nombre de
+    pointages géolocalisés a changé (pointage du jour, synchronisation hors-ligne).
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # (jour, zoom, tx, ty) -> {(cx, cy): [count, sum_lat, sum_lng]}
+        self._day_keys = {}             # jour -> clés en cache pour ce jour
+        self._day_signature = {}        # jour -> nombre de pointages géolocalisés
+
+    @staticmethod
+    def tile_range(zoom, bbox):
+        """(x0, x1, y0, y1) des tuiles couvrant bbox = (min_lat, min_lng, max_lat, max_lng)."""
+        min_lat, min_lng, max_lat, max_lng = bbox
+        xs, ys = tile_coords(np.array([max_lat, min_lat]), np.array([min_lng, max_lng]), zoom)
+        return int(xs[0]), int(xs[1]), int(ys[0]), int(ys[1])
+
+    @classmethod
+    def tile_count(cls, zoom, bbox):
+        x0, x1, y0, y1 = cls.tile_range(zoom, bbox)
+        return (x1 - x0 + 1) * (y1 - y0 + 1)
+
+    @classmethod
+    def tiles_for(cls, zoom, bbox):
+        x0, x1, y0, y1 = cls.tile_range(zoom, bbox)
+        return [(tx, ty) for tx in range(x0, x1 + 1) for ty in range(y0, y1 + 1)]
+
+    def _signatures(self, start, end):
+        rows = (
+            Attendance.query.filter(
+                Attendance.date >= start, Attendance.date <= end, Attendance.check_in_lat.isnot(None)
+            )
+            .with_entities(Attendance.date, func.count(Attendance.check_in_lat))
+            .group_by(Attendance.date)
+            .all()
+        )
+        return dict(rows)
+
+    def _load(self, days, zoom, tiles):
+        """Calcule les (jour, tuile) manquants en une requête sur l'emprise des tuiles."""
+        bounds = [tile_bounds(zoom, tx, ty) for tx, ty in tiles]
+        rows = (
+            Attendance.query.filter(
+                Attendance.date.in_(days),
+                Attendance.check_in_lat.between(min(b[0] for b in bounds), max(b[2] for b in bounds)),
+                Attendance.check_in_lng.between(min(b[1] for b in bounds), max(b[3] for b in bounds)),
+            )
+            .with_entities(Attendance.date, Attendance.check_in_lat, Attendance.check_in_lng)
+            .all()
+        )
+        loaded = {(day, zoom, tx, ty): {} for day in days for tx, ty in tiles}
+        if not rows:
+            return loaded
+
+        day_of = sorted(days)
+        day_index = np.searchsorted(np.array([d.toordinal() for d in day_of]),
+                                    np.array([r[0].toordinal() for r in rows]))
+        lats = np.array([r[1] for r in rows], dtype=np.float64)
+        lngs = np.array([r[2] for r in rows], dtype=np.float64)
+        x, y = tile_coords(lats, lngs, zoom + CELL_BITS)
+        gx, gy = x.astype(np.int64), y.astype(np.int64)
+
+        keys = np.stack([day_index, gx, gy], axis=1)
+        cells, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+        inverse = inverse.ravel()
+        sum_lat = np.bincount(inverse, weights=lats, minlength=len(cells))
+        sum_lng = np.bincount(inverse, weights=lngs, minlength=len(cells))
+        for (d, cx, cy), count, s_lat, s_lng in zip(cells.tolist(), counts.tolist(), sum_lat.tolist(), sum_lng.tolist()):
+            key = (day_of[d], zoom, cx >> CELL_BITS, cy >> CELL_BITS)
+            if key in loaded:
+                loaded[key][(cx, cy)] = [count, s_lat, s_lng]
+        return loaded
+
+    def aggregate(self, zoom, bbox, start, end):
+        """
+        Comptes de pointages par cellule sur bbox entre start et end (inclus).
+        Retourne une liste de {"lat", "lng", "count", "cell"} (barycentre de la cellule).
+        """
+        tiles = self.tiles_for(zoom, bbox)
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        signatures = self._signatures(start, end)
+
+        with self._lock:
+            for day in days:
+                if self._day_signature.get(day) != signatures.get(day, 0):
+                    self._drop_day(day)
+                    self._day_signature[day] = signatures.get(day, 0)
+            # Jours sans pointage géolocalisé : rien à charger
+            wanted = [day for day in days if signatures.get(day)]
+            missing_days = sorted({day for day in wanted for tx, ty in tiles
+                                   if (day, zoom, tx, ty) not in self._entries})
+            missing_tiles = sorted({(tx, ty) for day in missing_days for tx, ty in tiles
+                                    if (day, zoom, tx, ty) not in self._entries})
+
+        loaded = self._load(missing_days, zoom, missing_tiles) if missing_days else {}
+
+        merged = {}
+        with self._lock:
+            for key, cells in loaded.items():
+                self._entries[key] = cells
+                self._day_keys.setdefault(key[0], set()).add(key)
+            for day in wanted:
+                for tx, ty in tiles:
+                    key = (day, zoom, tx, ty)
+                    cells = self._entries.get(key)
+                    if cells is None:
+                        cells = loaded.get(key, {})
+                    else:
+                        self._entries.move_to_end(key)
+                    for cell, (count, s_lat, s_lng) in cells.items():
+                        total = merged.setdefault(cell, [0, 0.0, 0.0])
+                        total[0] += count
+                        total[1] += s_lat
+                        total[2] += s_lng
+            while len(self._entries) > self.max_entries:
+                key, _ = self._entries.popitem(last=False)
+                self._day_keys[key[0]].discard(key)
+
+        cell_zoom = zoom + CELL_BITS
+        return [
+            {"lat": s_lat / count, "lng": s_lng / count, "count": count, "cell": f"{cell_zoom}/{cx}/{cy}"}
+            for (cx, cy), (count, s_lat, s_lng) in sorted(merged.items(), key=lambda item: -item[1][0])
+        ]
+
+    def _drop_day(self, day):
+        for key in self._day_keys.pop(day, ()):
+            self._entries.pop(key, None)
+
+
+# Cache partagé par toutes les requêtes du worker
+checkin_map = CheckInMap()
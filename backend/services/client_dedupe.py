@@ -0,0 +1,247 @@
+# services/client_dedupe.py
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import insert, or_, select, update
+
+from extensions import db
+from models import Client, ClientDedupeRun, ClientDuplicate, Intervention, QuoteRequest, Reminder
+
+COUNTRY_CODE = "221"        # Sénégal : numéros nationaux à 9 chiffres
+NATIONAL_LENGTH = 9
+MIN_SCORE = 0.8             # seuil de suggestion
+MAX_BLOCK = 100             # au-delà, un bloc est parcouru en fenêtre glissante (pas de comparaison n²)
+WINDOW = 10
+# Score avec un contact commun (téléphone ou email) : CONTACT_BASE + CONTACT_NAME × similarité du nom
+CONTACT_BASE, CONTACT_NAME = 0.6, 0.4
+# Sans contact commun (homonymes fréquents) : le nom ne suffit pas, il faut aussi l'entreprise
+NAME_WEIGHTS = {"name": 0.65, "entreprise": 0.25, "ville": 0.1}
+# Champs repris du doublon quand ils manquent sur le client conservé
+FILL_FIELDS = ("prenom", "entreprise", "email", "adresse", "ville", "code_postal")
+
+_NON_DIGIT = re.compile(r"\D")
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+_SOUNDEX = {c: str(d) for d, letters in enumerate(("", "bfpv", "cgjkqsxz", "dt", "l", "mn", "r")) for c in letters}
+
+
+def normalize_phone(raw):
+    """Chiffres seuls, préfixe international (+221 / 00221) retiré : "+221 77 123 45 67" -> "771234567"."""
+    digits = _NON_DIGIT.sub("", raw or "")
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if digits.startswith(COUNTRY_CODE) and len(digits) == len(COUNTRY_CODE) + NATIONAL_LENGTH:
+        digits = digits[len(COUNTRY_CODE):]
+    return digits or None
+
+
+def normalize_text(value):
+    """Minuscules sans accents ni ponctuation, espaces réduits."""
+    value = unicodedata.normalize("NFKD", value or "").encode("ascii", "ignore").decode().lower()
+    return " ".join(_NON_ALNUM.sub(" ", value).split())
+
+
+def soundex(word):
+    """Clé phonétique Soundex (4 caractères) du premier mot : Diop/Diope, Ndiaye/Ndiay partagent leur clé."""
+    word = word.split(" ", 1)[0] if word else ""
+    if not word:
+        return ""
+    key, last = word[0], _SOUNDEX.get(word[0], "")
+    for c in word[1:]:
+        code = _SOUNDEX.get(c, "")
+        if code and code != last:
+            key += code
+            if len(key) == 4:
+                break
+        if c not in "hw":
+            last = code
+    return key.ljust(4, "0")
+
+
+def jaro_winkler(a, b):
+    """Similarité de Jaro-Winkler entre deux chaînes (1.0 : identiques)."""
+    if a == b:
+        return 1.0 if a else 0.0
+    len_a, len_b = len(a), len(b)
+    if not len_a or not len_b:
+        return 0.0
+    reach = max(max(len_a, len_b) // 2 - 1, 0)
+    matched_b = [False] * len_b
+    matches_a = []
+    for i, c in enumerate(a):
+        for j in range(max(0, i - reach), min(i + reach + 1, len_b)):
+            if not matched_b[j] and b[j] == c:
+                matched_b[j] = True
+                matches_a.append(c)
+                break
+    m = len(matches_a)
+    if not m:
+        return 0.0
+    matches_b = [b[j] for j in range(len_b) if matched_b[j]]
+    transpositions = sum(x != y for x, y in zip(matches_a, matches_b)) / 2
+    jaro = (m / len_a + m / len_b + (m - transpositions) / m) / 3
+    prefix = 0
+    for x, y in zip(a[:4], b[:4]):
+        if x != y:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
+
+
+class _Record:
+    __slots__ = ("id", "name", "phone", "email", "entreprise", "ville")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.name = normalize_text(f"{row.nom or ''} {row.prenom or ''}")
+        self.phone = normalize_phone(row.telephone)
+        self.email = (row.email or "").strip().lower() or None
+        self.entreprise = normalize_text(row.entreprise) or None
+        self.ville = normalize_text(row.ville) or None
+
+
+def blocking_keys(row, record):
+    """Clés de blocage : seuls les clients partageant une clé sont comparés."""
+    nom, prenom = normalize_text(row.nom), normalize_text(row.prenom)
+    keys = [("nom", soundex(nom), soundex(prenom))]
+    if record.phone:
+        keys.append(("tel", record.phone))
+    if record.email:
+        keys.append(("email", record.email))
+    if record.ville:
+        keys.append(("ville", soundex(nom), record.ville))
+    return keys
+
+
+def company_similarity(a, b):
+    """Similarité de deux raisons sociales ; des numéros différents (agences, succursales) les distinguent."""
+    if _NON_DIGIT.sub("", a) != _NON_DIGIT.sub("", b):
+        return 0.0
+    return jaro_winkler(a, b)
+
+
+def score_pair(a, b):
+    """Score [0, 1] d'un couple et motifs retenus (None si le couple ne peut pas atteindre le seuil)."""
+    phone = bool(a.phone and a.phone == b.phone)
+    email = bool(a.email and a.email == b.email)
+    if not (phone or email or (a.entreprise and b.entreprise)):
+        return None, None       # ni contact ni entreprise communs : score plafonné sous le seuil
+    name = jaro_winkler(a.name, b.name)
+    reasons = [f"nom {name:.2f}"]
+    if phone or email:
+        score = CONTACT_BASE + CONTACT_NAME * name
+        reasons += ["téléphone"] * phone + ["email"] * email
+    else:
+        entreprise = company_similarity(a.entreprise, b.entreprise)
+        same_ville = bool(a.ville and a.ville == b.ville)
+        score = (NAME_WEIGHTS["name"] * name + NAME_WEIGHTS["entreprise"] * entreprise
+                 + NAME_WEIGHTS["ville"] * same_ville)
+        reasons += [f"entreprise {entreprise:.2f}"] + ["ville"] * same_ville
+    return score, ", ".join(reasons)
+
+
+def _candidate_pairs(blocks, records, is_new):
+    """
+    Couples à comparer (indices, i < j), dont au moins un client nouveau, produits bloc par bloc
+    (un couple présent dans plusieurs blocs peut revenir). Petits blocs : toutes les paires ;
+    grands blocs : fenêtre glissante sur le nom trié.
+    """
+    for members in blocks.values():
+        if len(members) < 2 or not any(is_new[i] for i in members):
+            continue
+        if len(members) > MAX_BLOCK:
+            members = sorted(members, key=lambda i: records[i].name)
+            width = WINDOW
+        else:
+            width = len(members)
+        for x, i in enumerate(members):
+            for j in members[x + 1:x + 1 + width]:
+                if is_new[i] or is_new[j]:
+                    yield (i, j) if i < j else (j, i)
+
+
+def find_duplicates(full=False, min_score=MIN_SCORE, log=None):
+    """
+    Détecte les doublons probables et enregistre les nouvelles suggestions.
+    Incrémental par défaut : seuls les couples impliquant un client créé depuis la
+    dernière passe sont comparés (avec toute la base). Retourne les statistiques de la passe.
+    """
+    started = time.perf_counter()
+    last_run = ClientDedupeRun.query.order_by(ClientDedupeRun.id.desc()).first()
+    since = 0 if full or not last_run else last_run.last_client_id
+
+    rows = db.session.execute(
+        select(Client.id, Client.nom, Client.prenom, Client.telephone, Client.email, Client.entreprise, Client.ville)
+        .order_by(Client.id)
+    ).all()
+    records, is_new = [], []
+    blocks = defaultdict(list)
+    for index, row in enumerate(rows):
+        record = _Record(row)
+        records.append(record)
+        is_new.append(row.id > since)
+        for key in blocking_keys(row, record):
+            blocks[key].append(index)
+    if log:
+        log(f"{len(records)} clients chargés, {sum(is_new)} à examiner, {len(blocks)} blocs")
+
+    known = set(db.session.execute(select(ClientDuplicate.client_id, ClientDuplicate.duplicate_id)).all())
+    found = {}
+    compared = 0
+    for i, j in _candidate_pairs(blocks, records, is_new):
+        compared += 1
+        a, b = records[i], records[j]
+        if (a.id, b.id) in known or (a.id, b.id) in found:
+            continue
+        score, reasons = score_pair(a, b)
+        if score is not None and score >= min_score:
+            found[(a.id, b.id)] = {"client_id": a.id, "duplicate_id": b.id, "score": round(score, 4),
+                                   "reasons": reasons, "status": "pending"}
+    del blocks
+    suggestions = list(found.values())
+    if log:
+        log(f"{compared} couples comparés, {len(suggestions)} doublons probables")
+
+    for start in range(0, len(suggestions), 1000):
+        db.session.execute(insert(ClientDuplicate), suggestions[start:start + 1000])
+    run = ClientDedupeRun(last_client_id=rows[-1].id if rows else since, full=full, clients=sum(is_new),
+                          pairs_compared=compared, suggestions=len(suggestions), finished_at=datetime.utcnow())
+    db.session.add(run)
+    db.session.commit()
+    return {"clients": len(records), "examined": sum(is_new), "pairs_compared": compared,
+            "suggestions": len(suggestions), "seconds": round(time.perf_counter() - started, 3)}
+
+
+def merge_duplicate(suggestion, user_id=None):
+    """
+    Fusionne le doublon dans le client conservé (le plus ancien) : interventions, rappels
+    et demandes de devis sont rattachés au client conservé, ses champs vides complétés,
+    puis le doublon est supprimé. Le commit reste à la charge de l'appelant.
+    """
+    keeper = db.session.get(Client, suggestion.client_id)
+    duplicate = db.session.get(Client, suggestion.duplicate_id)
+    if keeper is None or duplicate is None:
+        raise LookupError("Client introuvable")
+
+    for model in (Intervention, Reminder, QuoteRequest):
+        db.session.execute(update(model).where(model.client_id == duplicate.id).values(client_id=keeper.id))
+    for field in FILL_FIELDS:
+        if not getattr(keeper, field) and getattr(duplicate, field):
+            setattr(keeper, field, getattr(duplicate, field))
+    if duplicate.type_client == "client":
+        keeper.type_client = "client"
+
+    now = datetime.utcnow()
+    suggestion.status, suggestion.resolved_at, suggestion.resolved_by_id = "merged", now, user_id
+    # Les autres suggestions visant le doublon sont closes (une passe complète réévalue le client conservé)
+    others = ClientDuplicate.query.filter(
+        ClientDuplicate.id != suggestion.id,
+        ClientDuplicate.status == "pending",
+        or_(ClientDuplicate.client_id == duplicate.id, ClientDuplicate.duplicate_id == duplicate.id),
+    )
+    for other in others:
+        other.status, other.resolved_at, other.resolved_by_id = "merged", now, user_id
+    db.session.delete(duplicate)
+    return keeper
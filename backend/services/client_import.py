@@ -0,0 +1,176 @@
+# services/client_import.py
+import csv
+import io
+import time
+import unicodedata
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Client, ClientImportHistory
+
+BATCH_SIZE = 1000
+MAX_REJECTS = 1000          # lignes rejetées détaillées dans le rapport (le compte reste exact)
+TYPES_CLIENT = ("prospect", "client")
+
+# En-têtes acceptés (sans accents, en minuscules) -> colonne Client
+HEADER_ALIASES = {
+    "nom": "nom", "name": "nom",
+    "prenom": "prenom", "first_name": "prenom",
+    "entreprise": "entreprise", "societe": "entreprise", "company": "entreprise",
+    "email": "email", "e-mail": "email", "mail": "email",
+    "telephone": "telephone", "tel": "telephone", "phone": "telephone", "portable": "telephone",
+    "adresse": "adresse", "address": "adresse",
+    "ville": "ville", "city": "ville",
+    "code_postal": "code_postal", "code postal": "code_postal", "cp": "code_postal",
+    "type_client": "type_client", "type": "type_client",
+}
+COLUMNS = sorted(set(HEADER_ALIASES.values()))
+LIMITS = {c.name: c.type.length for c in Client.__table__.columns if getattr(c.type, "length", None)}
+
+
+def _header(name):
+    name = unicodedata.normalize("NFKD", str(name or "")).encode("ascii", "ignore").decode().strip().lower()
+    return HEADER_ALIASES.get(name)
+
+
+def _cell(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)      # numéros saisis comme nombres dans Excel
+    value = str(value).strip()
+    return value or None
+
+
+def iter_rows(stream, filename):
+    """
+    Lignes (numéro de ligne du fichier, dict) d'un CSV ou d'un XLSX, lues au fil de l'eau :
+    XLSX en mode read_only d'openpyxl, CSV ligne à ligne (séparateur , ou ;).
+    La ligne 1 est l'en-tête ; les colonnes inconnues sont ignorées.
+    """
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            headers = [_header(h) for h in next(rows, ())]
+            for line, values in enumerate(rows, start=2):
+                row = {h: _cell(v) for h, v in zip(headers, values) if h}
+                if any(row.values()):
+                    yield line, row
+        finally:
+            workbook.close()
+        return
+
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    first_line = text.readline()
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    headers = [_header(h) for h in next(csv.reader([first_line], delimiter=delimiter), [])]
+    for line, values in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+        row = {h: _cell(v) for h, v in zip(headers, values) if h}
+        if any(row.values()):
+            yield line, row
+
+
+def _validate(row):
+    if not row.get("nom") or not row.get("telephone"):
+        return "Nom et téléphone sont obligatoires."
+    for field, limit in LIMITS.items():
+        if row.get(field) and len(row[field]) > limit:
+            return f"{field} dépasse {limit} caractères."
+    if row.get("type_client") and row["type_client"].lower() not in TYPES_CLIENT:
+        return f"type_client invalide : {row['type_client']}"
+    return None
+
+
+class ClientImporter:
+    """
+    Import d'un fichier de clients en flux : validation ligne à ligne, doublons de téléphone
+    détectés dans un ensemble préchargé, insertions groupées (un commit par lot) rattachées
+    à un ClientImportHistory. steps() rend la main après chaque lot (progression).
+    """
+
+    def __init__(self, filename, imported_by_id=None, batch_size=BATCH_SIZE):
+        self.filename = filename
+        self.imported_by_id = imported_by_id
+        self.batch_size = batch_size
+        self.stats = {"import_id": None, "filename": filename, "rows": 0, "inserted": 0, "rejected": 0,
+                      "rejects": [], "seconds": 0.0, "rows_per_second": 0.0}
+        self._started = None
+
+    def _reject(self, line, reason):
+        self.stats["rejected"] += 1
+        if len(self.stats["rejects"]) < MAX_REJECTS:
+            self.stats["rejects"].append({"line": line, "msg": reason})
+
+    def _tick(self):
+        elapsed = time.perf_counter() - self._started
+        self.stats["seconds"] = round(elapsed, 3)
+        self.stats["rows_per_second"] = round(self.stats["rows"] / elapsed, 1) if elapsed else 0.0
+        return self.stats
+
+    def _flush(self, batch):
+        """Insère un lot ; en cas de conflit (import concurrent), écarte les téléphones pris et réessaie."""
+        if not batch:
+            return
+        try:
+            db.session.execute(insert(Client), [row for _, row in batch])
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            taken = set(db.session.scalars(
+                select(Client.telephone).where(Client.telephone.in_([row["telephone"] for _, row in batch]))
+            ))
+            kept = []
+            for line, row in batch:
+                if row["telephone"] in taken:
+                    self._reject(line, "Un client avec ce numéro existe déjà.")
+                else:
+                    kept.append((line, row))
+            if len(kept) == len(batch):
+                raise
+            return self._flush(kept)
+        self.stats["inserted"] += len(batch)
+
+    def steps(self, rows):
+        """Importe les lignes (numéro, dict) ; produit les statistiques cumulées après chaque lot."""
+        self._started = time.perf_counter()
+        history = ClientImportHistory(filename=self.filename, imported_by_id=self.imported_by_id)
+        db.session.add(history)
+        db.session.flush()
+        self.stats["import_id"] = history_id = history.id
+        db.session.commit()
+
+        telephones = set(db.session.scalars(select(Client.telephone).where(Client.telephone.isnot(None))))
+        batch = []
+        for line, row in rows:
+            self.stats["rows"] += 1
+            error = _validate(row)
+            if not error and row["telephone"] in telephones:
+                error = "Un client avec ce numéro existe déjà."
+            if error:
+                self._reject(line, error)
+                continue
+            telephones.add(row["telephone"])
+            record = {c: row.get(c) for c in COLUMNS}
+            record["type_client"] = (record["type_client"] or "prospect").lower()
+            record["import_history_id"] = history_id
+            batch.append((line, record))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+                yield self._tick()
+        self._flush(batch)
+        yield self._tick()
+
+    def run(self, rows):
+        for _ in self.steps(rows):
+            pass
+        return self.stats
+
+
+def import_clients(stream, filename, imported_by_id=None, batch_size=BATCH_SIZE):
+    """Importe un fichier CSV/XLSX de clients ; retourne les statistiques de l'import."""
+    return ClientImporter(filename, imported_by_id, batch_size).run(iter_rows(stream, filename))
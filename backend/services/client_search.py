@@ -0,0 +1,129 @@
+# services/client_search.py
+import logging
+import re
+
+from sqlalchemy import Float, Integer, and_, or_, text
+
+from extensions import db
+from models import Client
+
+SEARCH_COLUMNS = ("nom", "prenom", "entreprise", "telephone", "email", "ville")
+# Poids bm25 (SQLite) dans l'ordre de SEARCH_COLUMNS : le nom et l'entreprise d'abord
+SEARCH_WEIGHTS = (10.0, 5.0, 8.0, 3.0, 2.0, 1.0)
+FTS_TABLE = "client_fts"
+MYSQL_INDEX = "ft_client_search"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_OLD = ", ".join(f"old.{c}" for c in SEARCH_COLUMNS)
+_NEW = ", ".join(f"new.{c}" for c in SEARCH_COLUMNS)
+_COLS = ", ".join(SEARCH_COLUMNS)
+# Table FTS5 « à contenu externe » : le texte reste dans client, seul l'index est stocké
+_SQLITE_DDL = f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+    {_COLS},
+    content='client', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)"""
+# Synchronisation par triggers : toute écriture (ORM, insert groupé, import) met l'index à jour
+_SQLITE_TRIGGERS = [
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON client BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_COLS}) VALUES (new.id, {_NEW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON client BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLS}) VALUES ('delete', old.id, {_OLD});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_COLS} ON client BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_COLS}) VALUES ('delete', old.id, {_OLD});
+        INSERT INTO {FTS_TABLE}(rowid, {_COLS}) VALUES (new.id, {_NEW});
+    END""",
+]
+
+
+class ClientSearch:
+    """
+    Recherche plein texte des clients, classée par pertinence, avec préfixes (autocomplétion).
+    SQLite : table FTS5 tenue à jour par triggers ; MySQL : index FULLTEXT (parseur ngram),
+    mis à jour par le moteur. Sans index disponible, repli sur des ILIKE (non classés).
+    """
+
+    def __init__(self):
+        self.backend = None     # "fts5" | "mysql" | "like"
+
+    def ensure_index(self):
+        """Crée l'index de recherche s'il manque (au démarrage du worker)."""
+        dialect = db.engine.dialect.name
+        try:
+            if dialect == "sqlite":
+                self._ensure_sqlite()
+                self.backend = "fts5"
+            elif dialect in ("mysql", "mariadb"):
+                self._ensure_mysql()
+                self.backend = "mysql"
+            else:
+                self.backend = "like"
+        except Exception as e:
+            logging.warning("⚠️ Index de recherche client non créé : %s", e)
+            self.backend = "like"
+        return self.backend
+
+    def _ensure_sqlite(self):
+        with db.engine.begin() as conn:
+            exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                  {"name": FTS_TABLE}).first()
+            if not exists:
+                conn.execute(text(_SQLITE_DDL))
+            for ddl in _SQLITE_TRIGGERS:
+                conn.execute(text(ddl))
+            if not exists:
+                # Indexation des clients déjà présents
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+    def _ensure_mysql(self):
+        with db.engine.begin() as conn:
+            exists = conn.execute(text(
+                "SELECT 1 FROM information_schema.statistics "
+                "WHERE table_schema = DATABASE() AND table_name = 'client' AND index_name = :name LIMIT 1"
+            ), {"name": MYSQL_INDEX}).first()
+            if not exists:
+                conn.execute(text(f"ALTER TABLE client ADD FULLTEXT INDEX {MYSQL_INDEX} "
+                                  f"({_COLS}) WITH PARSER ngram"))
+
+    @staticmethod
+    def tokens(q):
+        return _TOKEN.findall(q or "")
+
+    def apply(self, query, q):
+        """
+        Restreint une requête Client aux résultats de la recherche q.
+        Retourne (requête, expression de tri par pertinence ou None).
+        """
+        tokens = self.tokens(q)
+        if not tokens:
+            return query, None
+
+        if self.backend == "fts5":
+            # Tous les mots doivent apparaître, chacun pouvant être un début de mot (autocomplétion)
+            match = " ".join(f'"{t}"*' for t in tokens)
+            weights = ", ".join(str(w) for w in SEARCH_WEIGHTS)
+            hits = (
+                text(f"SELECT rowid AS id, bm25({FTS_TABLE}, {weights}) AS rank "
+                     f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match")
+                .bindparams(match=match)
+                .columns(id=Integer, rank=Float)
+                .subquery("client_hits")
+            )
+            return query.join(hits, hits.c.id == Client.id), hits.c.rank.asc()
+
+        if self.backend == "mysql":
+            from sqlalchemy.dialects.mysql import match as mysql_match
+            # Parseur ngram : un mot est cherché comme suite de n-grammes, ce qui couvre les préfixes
+            score = mysql_match(*[getattr(Client, c) for c in SEARCH_COLUMNS],
+                                against=" ".join(f'+"{t}"' for t in tokens)).in_boolean_mode()
+            return query.filter(score), score.desc()
+
+        columns = [getattr(Client, c) for c in SEARCH_COLUMNS]
+        return query.filter(and_(*[or_(*[col.ilike(f"%{t}%") for col in columns]) for t in tokens])), None
+
+
+# Moteur de recherche du worker (choisi au démarrage selon la base)
+client_search = ClientSearch()
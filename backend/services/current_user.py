@@ -0,0 +1,91 @@
+# services/current_user.py
+import threading
+import time
+from collections import OrderedDict
+
+from flask import jsonify
+from sqlalchemy import select
+
+from extensions import db
+from models import Role, User
+
+TTL_SECONDS = 30.0      # durée de vie d'un instantané (modifications faites par un autre worker)
+MAX_USERS = 2048
+
+
+class UserSnapshot:
+    """Copie légère (non liée à la session) d'un utilisateur et du nom de son rôle."""
+
+    __slots__ = ("id", "username", "email", "nom", "prenom", "telephone", "role_id", "role_name",
+                 "is_active", "last_login", "site")
+
+    def __init__(self, row):
+        for field in self.__slots__:
+            setattr(self, field, getattr(row, field))
+
+    def __repr__(self):
+        return f'<UserSnapshot {self.username}>'
+
+
+class UserCache:
+    """
+    Cache LRU à durée de vie des utilisateurs connectés, partagé par les requêtes du worker.
+    Alimente current_user (user_lookup_loader) ; flask-jwt-extended le mémorise ensuite sur g
+    pour la durée de la requête. Les routes qui modifient un utilisateur l'invalident.
+    """
+
+    def __init__(self, max_size=MAX_USERS, ttl=TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # user_id -> (UserSnapshot, chargé à)
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and now - entry[1] < self.ttl:
+                self._entries.move_to_end(user_id)
+                return entry[0]
+
+        row = db.session.execute(
+            select(User.id, User.username, User.email, User.nom, User.prenom, User.telephone, User.role_id,
+                   Role.name.label("role_name"), User.is_active, User.last_login, User.site)
+            .outerjoin(Role, Role.id == User.role_id)
+            .where(User.id == user_id)
+        ).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        snapshot = UserSnapshot(row)
+        with self._lock:
+            self._entries[user_id] = (snapshot, now)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id=None):
+        """Oublie un utilisateur (ou tous si user_id est None)."""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(int(user_id), None)
+
+
+# Cache partagé par toutes les requêtes du worker
+user_cache = UserCache()
+
+
+def register_user_loader(jwt):
+    """Branche le cache sur current_user de flask-jwt-extended."""
+
+    @jwt.user_lookup_loader
+    def load_current_user(_jwt_header, jwt_data):
+        return user_cache.get(int(jwt_data["sub"]))
+
+    @jwt.user_lookup_error_loader
+    def current_user_missing(_jwt_header, _jwt_data):
+        return jsonify({"status": "error", "msg": "Utilisateur introuvable ou inactif."}), 401
@@ -0,0 +1,61 @@
+# services/fieldsets.py
+from datetime import date, datetime, time
+
+from flask import request
+from sqlalchemy.orm import lazyload, load_only
+
+
+class FieldsetError(ValueError):
+    """Champ demandé hors de la liste autorisée."""
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return value
+
+
+class Fieldset:
+    """
+    Champs d'une liste sélectionnables par ?fields=a,b,c (colonnes du modèle, liste autorisée).
+    Les colonnes non demandées ne sont ni lues en base (load_only) ni sérialisées ;
+    les relations chargées d'office par le modèle sont laissées de côté.
+    """
+
+    def __init__(self, model, allowed, always=("id",)):
+        self.model = model
+        self.allowed = tuple(allowed)
+        self.always = tuple(always)
+        unknown = [f for f in self.allowed + self.always if f not in model.__table__.columns]
+        if unknown:
+            raise ValueError(f"Colonnes inconnues pour {model.__name__} : {', '.join(unknown)}")
+
+    def requested(self):
+        """Champs demandés (ordre de la liste autorisée, id compris), ou None sans ?fields=."""
+        raw = request.args.get("fields")
+        if not raw:
+            return None
+        names = {f.strip() for f in raw.split(",") if f.strip()}
+        unknown = sorted(names - set(self.allowed) - set(self.always))
+        if unknown:
+            raise FieldsetError(f"Champs inconnus : {', '.join(unknown)}. "
+                                f"Champs disponibles : {', '.join(self.allowed)}")
+        return self.always + tuple(f for f in self.allowed if f in names and f not in self.always)
+
+    def apply(self, query, fields):
+        if fields is None:
+            return query
+        return query.options(load_only(*[getattr(self.model, f) for f in fields]), lazyload("*"))
+
+    @staticmethod
+    def serialize(obj, fields):
+        return {f: _json_value(getattr(obj, f)) for f in fields}
+
+    def columns(self, fields):
+        """Colonnes à projeter (select) pour ces champs."""
+        return [getattr(self.model, f) for f in fields]
+
+    @staticmethod
+    def serialize_row(row, fields):
+        """Sérialise une ligne projetée (select des colonnes de columns())."""
+        return {f: _json_value(v) for f, v in zip(fields, row)}
@@ -0,0 +1,175 @@
+# services/geocoding.py
+import hashlib
+import logging
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import GeocodeCache, GeocoderThrottle
+
+MAX_ENTRIES = 20_000          # adresses gardées en mémoire par worker
+MIN_INTERVAL_SECONDS = 1.0    # politique d'usage de Nominatim : une requête par seconde, tous workers confondus
+PROVIDER = "nominatim"
+BACKOFF_SECONDS = 60.0        # pause après une erreur du fournisseur (réseau, quota)
+KEY_LENGTH = 255
+
+
+def normalize_address(adresse, ville=None):
+    """Clé d'une adresse : minuscules, sans accents ni ponctuation, espaces réduits."""
+    parts = []
+    for value in (adresse, ville):
+        value = unicodedata.normalize("NFKD", value or "").encode("ascii", "ignore").decode().lower()
+        value = re.sub(r"[^a-z0-9]+", " ", value).strip()
+        parts.append(value)
+    if not any(parts):
+        return None
+    key = "|".join(parts)
+    if len(key) > KEY_LENGTH:
+        key = key[:KEY_LENGTH - 41] + "#" + hashlib.sha1(key.encode()).hexdigest()
+    return key
+
+
+class GeocoderBusy(Exception):
+    """Tous les créneaux d'appel au fournisseur sont pris par d'autres workers."""
+
+
+class Geocoder:
+    """
+    Géocodage des adresses de clients et d'interventions, chaque adresse n'étant résolue
+    qu'une fois : cache mémoire du worker, puis table geocode_cache partagée, puis le
+    fournisseur (Nominatim). Une adresse introuvable est mémorisée comme telle ; une
+    erreur du fournisseur (réseau, quota) ne l'est pas et sera retentée.
+    """
+
+    def __init__(self, max_size=MAX_ENTRIES):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._provider_lock = threading.Lock()
+        self._entries = OrderedDict()   # clé -> (lat, lng) ou None
+        self._failed_at = None
+        self._provider = None
+
+    def _remember(self, key, coords):
+        with self._lock:
+            self._entries[key] = coords
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _claim_slot(timeout):
+        """
+        Réserve le prochain créneau d'appel au fournisseur, partagé par tous les workers :
+        UPDATE conditionnel de la ligne geocoder_throttle (dans sa propre transaction),
+        qui ne réussit que si le dernier appel date d'au moins MIN_INTERVAL_SECONDS.
+        Retourne False si aucun créneau ne se libère avant timeout secondes.
+        """
+        table = GeocoderThrottle.__table__
+        deadline = time.time() + timeout
+        while True:
+            now = time.time()
+            with db.engine.begin() as conn:
+                claimed = conn.execute(
+                    update(table)
+                    .where(table.c.provider == PROVIDER, table.c.called_at <= now - MIN_INTERVAL_SECONDS)
+                    .values(called_at=now)
+                ).rowcount
+                last = None if claimed else conn.execute(
+                    select(table.c.called_at).where(table.c.provider == PROVIDER)).scalar()
+            if claimed:
+                return True
+            if last is None:
+                try:
+                    with db.engine.begin() as conn:
+                        conn.execute(insert(table).values(provider=PROVIDER, called_at=0))
+                except IntegrityError:
+                    pass   # créée entre-temps par un autre worker
+                continue
+            wait = max(last + MIN_INTERVAL_SECONDS - now, 0.05)
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def _lookup(self, query):
+        """
+        Appel au fournisseur : (lat, lng), None si introuvable ; lève GeopyError en cas d'échec
+        et GeocoderBusy si aucun créneau d'appel ne s'est libéré à temps.
+        """
+        from geopy.geocoders import Nominatim
+
+        with self._provider_lock:
+            if self._provider is None:
+                self._provider = Nominatim(user_agent=current_app.config["GEOCODER_USER_AGENT"],
+                                           timeout=current_app.config["GEOCODER_TIMEOUT"])
+            if not self._claim_slot(current_app.config["GEOCODER_TIMEOUT"]):
+                raise GeocoderBusy("Fournisseur de géocodage saturé")
+            location = self._provider.geocode(query, country_codes=current_app.config["GEOCODER_COUNTRY"] or None)
+        return (location.latitude, location.longitude) if location else None
+
+    def resolve_many(self, addresses, max_lookups=10):
+        """
+        Coordonnées de couples (adresse, ville) : dict couple -> (lat, lng) ou None.
+        Au plus max_lookups adresses inconnues sont envoyées au fournisseur par appel.
+        """
+        from geopy.exc import GeopyError
+
+        keys = {pair: normalize_address(*pair) for pair in addresses}
+        found, missing = {}, set()
+        with self._lock:
+            for key in set(keys.values()) - {None}:
+                if key in self._entries:
+                    found[key] = self._entries[key]
+                    self._entries.move_to_end(key)
+                else:
+                    missing.add(key)
+
+        if missing:
+            rows = GeocodeCache.query.filter(GeocodeCache.address_key.in_(missing)).with_entities(
+                GeocodeCache.address_key, GeocodeCache.latitude, GeocodeCache.longitude)
+            for key, lat, lng in rows:
+                found[key] = (lat, lng) if lat is not None else None
+                self._remember(key, found[key])
+            missing -= set(found)
+
+        enabled = current_app.config.get("GEOCODING_ENABLED", True)
+        for pair, key in keys.items():
+            if key not in missing or not enabled or max_lookups <= 0:
+                continue
+            if self._failed_at is not None and time.monotonic() - self._failed_at < BACKOFF_SECONDS:
+                break
+            missing.discard(key)
+            max_lookups -= 1
+            query = ", ".join(p.strip() for p in pair if p and p.strip())
+            try:
+                coords = self._lookup(query)
+            except GeocoderBusy:
+                break       # adresses restantes retentées à la prochaine demande
+            except GeopyError as e:
+                logging.warning("⚠️ Géocodage de « %s » impossible : %s", query, e)
+                self._failed_at = time.monotonic()
+                continue
+            found[key] = coords
+            self._remember(key, coords)
+            try:
+                db.session.add(GeocodeCache(address_key=key, adresse=query,
+                                            latitude=coords[0] if coords else None,
+                                            longitude=coords[1] if coords else None))
+                db.session.commit()
+            except IntegrityError:
+                db.session.rollback()   # déjà enregistrée par un autre worker
+
+        return {pair: found.get(key) for pair, key in keys.items()}
+
+    def resolve(self, adresse, ville=None):
+        return self.resolve_many([(adresse, ville)]).get((adresse, ville))
+
+
+# Adresses partagées par toutes les requêtes du worker
+geocoder = Geocoder()
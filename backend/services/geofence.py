@@ -0,0 +1,169 @@
+# services/geofence.py
+import math
+import threading
+import time
+
+import numpy as np
+from geopy.distance import geodesic
+from sqlalchemy import func
+
+from models import WorkLocation
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = 111320.0
+DEFAULT_RADIUS = 100       # mètres, rayon d'une zone créée automatiquement
+CELL_DEG = 0.01            # taille d'une case de la grille (~1,1 km)
+REFRESH_SECONDS = 2.0      # intervalle de vérification des zones créées ou modifiées par un autre worker
+HAVERSINE_TOLERANCE = 1.01  # marge haversine / géodésique avant le calcul exact
+
+
+def haversine_m(lat, lng, lats, lngs):
+    """Distance haversine vectorisée (mètres) entre un point et des tableaux de points."""
+    lat1 = np.radians(lat)
+    lat2 = np.radians(lats)
+    dlat = lat2 - lat1
+    dlng = np.radians(lngs) - np.radians(lng)
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeofenceIndex:
+    """
+    Index spatial en mémoire des zones de travail actives.
+    Les zones sont rangées dans une grille (cases de CELL_DEG degrés) ; une recherche
+    ne regarde que les cases voisines, filtre par haversine vectorisé puis confirme
+    les quelques candidats avec geodesic, en respectant le rayon propre à chaque zone.
+    """
+
+    def __init__(self, cell_deg=CELL_DEG):
+        self.cell_deg = cell_deg
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._signature = None
+        self._checked_at = 0.0
+        self.version = 0          # incrémenté à chaque rechargement depuis la base (cf. presence_board)
+        self._reset()
+
+    def _reset(self):
+        self._ids = np.empty(0, dtype=np.int64)
+        self._lats = np.empty(0, dtype=np.float64)
+        self._lngs = np.empty(0, dtype=np.float64)
+        self._radii = np.empty(0, dtype=np.float64)
+        self._buckets = {}
+        self._max_radius = float(DEFAULT_RADIUS)
+
+    def __len__(self):
+        return len(self._ids)
+
+    # --- Construction ---
+    def build(self, rows):
+        """Construit l'index à partir de tuples (id, latitude, longitude, radius)."""
+        rows = [r for r in rows if r[1] is not None and r[2] is not None]
+        self._reset()
+        if rows:
+            arr = np.array([(r[1], r[2], r[3] or DEFAULT_RADIUS) for r in rows], dtype=np.float64)
+            self._ids = np.array([r[0] for r in rows], dtype=np.int64)
+            self._lats, self._lngs, self._radii = arr[:, 0], arr[:, 1], arr[:, 2]
+            self._max_radius = max(float(self._radii.max()), float(DEFAULT_RADIUS))
+            for i, (lat, lng) in enumerate(zip(self._lats, self._lngs)):
+                self._buckets.setdefault(self._cell(lat, lng), []).append(i)
+        self._loaded = True
+
+    def add(self, location):
+        """Ajoute une zone fraîchement créée sans reconstruire l'index."""
+        if not self._loaded or location.latitude is None or location.longitude is None:
+            return
+        with self._lock:
+            i = len(self._ids)
+            radius = float(location.radius or DEFAULT_RADIUS)
+            self._ids = np.append(self._ids, location.id)
+            self._lats = np.append(self._lats, float(location.latitude))
+            self._lngs = np.append(self._lngs, float(location.longitude))
+            self._radii = np.append(self._radii, radius)
+            self._max_radius = max(self._max_radius, radius)
+            self._buckets.setdefault(self._cell(location.latitude, location.longitude), []).append(i)
+            if self._signature:
+                count, max_id, updated_at = self._signature
+                stamps = [t for t in (updated_at, location.updated_at) if t is not None]
+                self._signature = (count + 1, max(max_id or 0, location.id), max(stamps) if stamps else None)
+
+    def invalidate(self):
+        """Force la reconstruction de l'index à la prochaine recherche."""
+        self._loaded = False
+
+    def _load_from_db(self):
+        rows = (
+            WorkLocation.query.filter_by(is_active=True)
+            .with_entities(WorkLocation.id, WorkLocation.latitude, WorkLocation.longitude, WorkLocation.radius)
+            .all()
+        )
+        self.build(rows)
+        self._signature = self._db_signature()
+        self.version += 1
+
+    @staticmethod
+    def _db_signature():
+        """(nombre, id max, dernière modification) des zones actives : une zone déplacée ou
+        redimensionnée dans un autre worker change updated_at, donc la signature."""
+        return tuple(
+            WorkLocation.query.filter_by(is_active=True)
+            .with_entities(func.count(WorkLocation.id), func.max(WorkLocation.id), func.max(WorkLocation.updated_at))
+            .one()
+        )
+
+    def ensure_fresh(self):
+        """Recharge l'index s'il a été invalidé ou si la table a changé dans un autre worker."""
+        now = time.monotonic()
+        with self._lock:
+            if self._loaded and now - self._checked_at < REFRESH_SECONDS:
+                return
+            if not self._loaded or self._db_signature() != self._signature:
+                self._load_from_db()
+            self._checked_at = now
+
+    # --- Recherche ---
+    def _cell(self, lat, lng):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    def _candidates(self, lat, lng):
+        reach_lat = self._max_radius / METERS_PER_DEGREE
+        reach_lng = self._max_radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+        rings_lat = int(math.ceil(reach_lat / self.cell_deg))
+        rings_lng = int(math.ceil(reach_lng / self.cell_deg))
+        ci, cj = self._cell(lat, lng)
+        found = []
+        for di in range(-rings_lat, rings_lat + 1):
+            for dj in range(-rings_lng, rings_lng + 1):
+                found.extend(self._buckets.get((ci + di, cj + dj), ()))
+        return np.array(found, dtype=np.int64)
+
+    def match(self, latitude, longitude):
+        """Retourne l'id de la zone la plus proche contenant le point, ou None."""
+        lat, lng = float(latitude), float(longitude)
+        idx = self._candidates(lat, lng)
+        if not len(idx):
+            return None
+        distances = haversine_m(lat, lng, self._lats[idx], self._lngs[idx])
+        mask = distances <= self._radii[idx] * HAVERSINE_TOLERANCE
+        best_id, best_distance = None, None
+        for i in idx[mask]:
+            distance = geodesic((lat, lng), (self._lats[i], self._lngs[i])).meters
+            if distance <= self._radii[i] and (best_distance is None or distance < best_distance):
+                best_id, best_distance = int(self._ids[i]), distance
+        return best_id
+
+    def find_location(self, latitude, longitude):
+        """Retourne la WorkLocation active contenant le point, ou None."""
+        self.ensure_fresh()
+        location_id = self.match(latitude, longitude)
+        if location_id is None:
+            return None
+        location = WorkLocation.query.get(location_id)
+        if not location or not location.is_active:
+            self.invalidate()
+            return None
+        return location
+
+
+# Index partagé par toutes les requêtes du worker
+geofence_index = GeofenceIndex()
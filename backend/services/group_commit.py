@@ -0,0 +1,149 @@
+# services/group_commit.py
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from extensions import db
+from services.presence import presence_board
+from services.punches import upsert_check_in, upsert_check_ins
+
+DURABILITY_COMMIT = "commit"   # la requête attend le commit de son lot (réponse exacte)
+DURABILITY_BUFFER = "buffer"   # la requête est acquittée dès la mise en file (perte possible si crash)
+WAIT_TIMEOUT = 10.0
+
+
+class PendingCheckIn:
+    """Pointage en attente d'écriture ; result vaut True, False (déjà pointé) ou None (erreur)."""
+
+    def __init__(self, row):
+        self.row = row
+        self.result = None
+        self._done = threading.Event()
+
+    def resolve(self, result):
+        self.result = result
+        self._done.set()
+
+    def wait(self, timeout=WAIT_TIMEOUT):
+        if not self._done.wait(timeout):
+            return None
+        return self.result
+
+
+class CheckInBuffer:
+    """
+    Écriture groupée des pointages d'entrée (pic du matin).
+    Les pointages sont mis en file dans le worker, puis un fil d'écriture les envoie
+    par lots (max_batch lignes ou max_delay_ms) en un INSERT multi-lignes et un seul commit.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.max_batch = 100
+        self.max_delay = 0.005
+        self.durability = DURABILITY_COMMIT
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.max_batch = app.config["ATTENDANCE_GROUP_COMMIT_MAX_BATCH"]
+        self.max_delay = app.config["ATTENDANCE_GROUP_COMMIT_MAX_DELAY_MS"] / 1000
+        self.durability = app.config["ATTENDANCE_GROUP_COMMIT_DURABILITY"]
+
+    def enabled(self):
+        return self.app is not None and self.app.config.get("ATTENDANCE_GROUP_COMMIT", False)
+
+    def submit(self, row):
+        """Met un pointage en file et retourne son PendingCheckIn."""
+        self._ensure_started()
+        pending = PendingCheckIn(row)
+        self._queue.put(pending)
+        return pending
+
+    # --- Fil d'écriture (un par worker, démarré après le fork) ---
+    def _ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="checkin-group-commit", daemon=True)
+            self._thread.start()
+            atexit.register(self.drain)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def drain(self):
+        """Écrit ce qui reste en file (arrêt du worker)."""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        # Un seul pointage par (utilisateur, jour) dans le lot : les doublons sont refusés
+        unique, duplicates = {}, []
+        for pending in batch:
+            key = (pending.row["user_id"], pending.row["date"])
+            if key in unique:
+                duplicates.append(pending)
+            else:
+                unique[key] = pending
+
+        with self.app.app_context():
+            try:
+                applied = upsert_check_ins([p.row for p in unique.values()])
+                db.session.commit()
+                results = {key: key in applied for key in unique}
+            except Exception:
+                db.session.rollback()
+                logging.exception("Écriture groupée des pointages échouée, reprise ligne par ligne")
+                results = {key: self._write_one(p.row) for key, p in unique.items()}
+
+        for key, pending in unique.items():
+            if results[key] and self.durability == DURABILITY_COMMIT:
+                row = pending.row
+                presence_board.record_check_in(row["user_id"], row["check_in"], row["work_location_id"], row["date"])
+            pending.resolve(results[key])
+        for pending in duplicates:
+            pending.resolve(False)
+
+    @staticmethod
+    def _write_one(row):
+        try:
+            row = dict(row)
+            recorded = upsert_check_in(row.pop("user_id"), row.pop("date"), row.pop("check_in"), **row)
+            db.session.commit()
+            return recorded
+        except Exception:
+            db.session.rollback()
+            logging.exception("Pointage d'entrée non enregistré : %s", row)
+            return None
+
+
+# File partagée par toutes les requêtes du worker
+checkin_buffer = CheckInBuffer()
@@ -0,0 +1,125 @@
+# services/materials.py
+from collections import defaultdict
+
+from sqlalchemy import func, update
+
+from extensions import db
+from models import Intervention, InterventionMaterial, InventoryItem
+
+ACTIONS = ("add", "update", "remove")
+MAX_LINES = 200
+
+
+def _deducted(row):
+    """Quantité déjà sortie du stock pour une ligne (0 pour les lignes antérieures au suivi)."""
+    return row.quantite if row.stock_deduit else 0
+
+
+def apply_material_lines(intervention_id, lines):
+    """
+    Applique une liste de lignes {"action", "article_id", "quantite"} aux matériels d'une
+    intervention et répercute la consommation sur le stock, dans la transaction courante
+    (commit ou rollback par l'appelant).
+
+    Les matériels de l'intervention sont relus après verrouillage de sa ligne (SELECT ... FOR UPDATE),
+    ce qui sérialise les envois concurrents sur une même intervention.
+    Les articles sont lus en une requête IN ; le stock de chaque article est ensuite ajusté
+    par un UPDATE conditionnel (quantity >= n), dans l'ordre des identifiants pour que deux
+    workers verrouillent les lignes dans le même ordre. Un article dont le stock ne suffit
+    plus au moment de l'UPDATE est signalé sur chaque ligne qui le consomme.
+
+    Retourne {"errors": [...], "shortages": [...], "stock": {article_id: variation}}.
+    """
+    if not isinstance(lines, list) or not lines:
+        return {"errors": [{"line": 0, "msg": "Aucune ligne"}], "shortages": [], "stock": {}}
+    if len(lines) > MAX_LINES:
+        return {"errors": [{"line": 0, "msg": f"Au plus {MAX_LINES} lignes par envoi"}], "shortages": [], "stock": {}}
+
+    errors = []
+    for n, line in enumerate(lines, start=1):
+        if not isinstance(line, dict) or line.get("action") not in ACTIONS:
+            errors.append({"line": n, "msg": "Action invalide"})
+        elif not isinstance(line.get("article_id"), int):
+            errors.append({"line": n, "msg": "article_id manquant"})
+        elif line["action"] != "remove" and (not isinstance(line.get("quantite", 1), int) or line.get("quantite", 1) < 1):
+            errors.append({"line": n, "msg": "Quantité invalide"})
+    if errors:
+        return {"errors": errors, "shortages": [], "stock": {}}
+
+    article_ids = {line["article_id"] for line in lines}
+    items = {
+        item_id: name for item_id, name in
+        InventoryItem.query.filter(InventoryItem.id.in_(article_ids)).with_entities(InventoryItem.id, InventoryItem.name)
+    }
+    errors = [{"line": n, "msg": "Article introuvable"}
+              for n, line in enumerate(lines, start=1) if line["article_id"] not in items]
+    if errors:
+        return {"errors": errors, "shortages": [], "stock": {}}
+
+    # Verrou sur l'intervention : deux envois concurrents ne calculent pas leur variation de stock
+    # depuis la même lecture des matériels (sinon la même quantité serait sortie deux fois)
+    db.session.query(Intervention.id).filter_by(id=intervention_id).with_for_update().first()
+    rows = defaultdict(list)   # article_id -> lignes existantes (la première est modifiée, comme la route unitaire)
+    for row in (InterventionMaterial.query.filter_by(intervention_id=intervention_id)
+                .order_by(InterventionMaterial.id).populate_existing()):
+        rows[row.article_id].append(row)
+
+    delta = defaultdict(int)          # article_id -> quantité à sortir du stock (négative : retour en stock)
+    consumers = defaultdict(list)     # article_id -> numéros des lignes qui consomment
+    for n, line in enumerate(lines, start=1):
+        article_id, quantite = line["article_id"], line.get("quantite", 1)
+        existing = rows[article_id]
+        if line["action"] == "add":
+            if existing:
+                row = existing[0]
+                delta[article_id] += row.quantite + quantite - _deducted(row)
+                row.quantite += quantite
+            else:
+                row = InterventionMaterial(intervention_id=intervention_id, article_id=article_id, quantite=quantite)
+                db.session.add(row)
+                existing.append(row)
+                delta[article_id] += quantite
+            row.stock_deduit = True
+            consumers[article_id].append(n)
+        elif line["action"] == "update":
+            if not existing:
+                errors.append({"line": n, "msg": "Matériel non trouvé dans l'intervention"})
+                continue
+            row = existing[0]
+            delta[article_id] += quantite - _deducted(row)
+            row.quantite, row.stock_deduit = quantite, True
+            consumers[article_id].append(n)
+        elif existing:
+            row = existing.pop(0)
+            delta[article_id] -= _deducted(row)
+            db.session.delete(row)
+    if errors:
+        return {"errors": errors, "shortages": [], "stock": {}}
+
+    short = []
+    for article_id in sorted(delta):
+        quantity = delta[article_id]
+        if quantity > 0:
+            result = db.session.execute(
+                update(InventoryItem)
+                .where(InventoryItem.id == article_id, InventoryItem.quantity >= quantity)
+                .values(quantity=InventoryItem.quantity - quantity)
+            )
+            if result.rowcount == 0:
+                short.append(article_id)
+        elif quantity < 0:
+            db.session.execute(
+                update(InventoryItem).where(InventoryItem.id == article_id)
+                .values(quantity=func.coalesce(InventoryItem.quantity, 0) - quantity)
+            )
+
+    shortages = []
+    if short:
+        available = dict(InventoryItem.query.filter(InventoryItem.id.in_(short))
+                         .with_entities(InventoryItem.id, InventoryItem.quantity))
+        shortages = [{
+            "line": n, "article_id": article_id, "article_nom": items[article_id],
+            "demande": delta[article_id], "disponible": available.get(article_id) or 0,
+        } for article_id in short for n in consumers[article_id]]
+        shortages.sort(key=lambda s: s["line"])
+    return {"errors": [], "shortages": shortages, "stock": {a: -d for a, d in delta.items() if d}}
@@ -0,0 +1,177 @@
+# services/pagination.py
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+from sqlalchemy import event, func, select, text
+
+from extensions import db
+
+COUNT_MODES = ("exact", "cached", "estimate", "false")
+COUNT_TTL_SECONDS = 60.0    # écritures faites par un autre worker : total périmé au plus ce délai
+MAX_ENTRIES = 4096
+ESTIMATE_MIN_ROWS = 100_000  # en dessous, une table non filtrée est comptée (en cache) plutôt qu'estimée
+IGNORED_ARGS = {"page", "per_page", "count", "sort_by", "order"}
+
+
+class CountCache:
+    """
+    Totaux de pagination par (endpoint, filtres normalisés), tenus en mémoire par worker.
+    Chaque table a un numéro de génération incrémenté au commit d'une écriture (ORM ou Core)
+    qui la touche : un total compté avant l'écriture n'est plus servi. Les écritures des
+    autres workers ne sont pas vues, d'où la durée de vie limitée des entrées.
+    """
+
+    def __init__(self, max_size=MAX_ENTRIES, ttl=COUNT_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # clé -> (total, génération, compté à)
+        self._generations = {}          # table -> génération
+        self._tracked = set()
+
+    # --- Suivi des écritures -------------------------------------------------
+    def track(self, engine):
+        """Écoute les écritures d'un moteur (une fois par moteur)."""
+        if id(engine) in self._tracked:
+            return
+        self._tracked.add(id(engine))
+
+        @event.listens_for(engine, "after_execute")
+        def note_write(conn, clauseelement, multiparams, params, execution_options, result):
+            if getattr(clauseelement, "is_dml", False) and getattr(clauseelement, "table", None) is not None:
+                conn.info.setdefault("written_tables", set()).add(clauseelement.table.name)
+
+        @event.listens_for(engine, "commit")
+        def bump_on_commit(conn):
+            tables = conn.info.pop("written_tables", None)
+            if tables:
+                self.bump(*tables)
+
+        @event.listens_for(engine, "rollback")
+        def forget_on_rollback(conn):
+            conn.info.pop("written_tables", None)
+
+    def bump(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def generation(self, table):
+        return self._generations.get(table, 0)
+
+    # --- Cache ----------------------------------------------------------------
+    def get(self, key, table):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            total, generation, counted_at = entry
+            if generation != self.generation(table) or time.monotonic() - counted_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return total
+
+    def put(self, key, table, total, generation):
+        with self._lock:
+            self._entries[key] = (total, generation, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Totaux partagés par toutes les requêtes du worker
+count_cache = CountCache()
+
+
+def estimated_rows(table):
+    """Nombre de lignes approché sans balayage : statistiques InnoDB sous MySQL, plage d'id ailleurs."""
+    if db.engine.dialect.name in ("mysql", "mariadb"):
+        rows = db.session.execute(text(
+            "SELECT table_rows FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name = :name"
+        ), {"name": table.name}).scalar()
+        if rows is not None:
+            return int(rows)
+    low, high = db.session.execute(select(func.min(table.c.id), func.max(table.c.id))).one()
+    return 0 if low is None else high - low + 1
+
+
+class Page:
+    """Page de résultats (mêmes attributs que la pagination Flask-SQLAlchemy, total éventuellement absent)."""
+
+    def __init__(self, items, page, per_page, total, has_next, estimated=False):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        self.has_next = has_next
+        self.estimated = estimated
+
+    @property
+    def pages(self):
+        if self.total is None:
+            return None
+        return math.ceil(self.total / self.per_page) if self.total else 0
+
+
+def count_mode():
+    """Stratégie de comptage demandée (?count=), PAGINATION_COUNT par défaut."""
+    mode = request.args.get("count", current_app.config.get("PAGINATION_COUNT", "exact")).lower()
+    if mode in ("0", "no", "none"):
+        return "false"
+    return mode if mode in COUNT_MODES else "exact"
+
+
+def normalized_filters(extra=None):
+    """Filtres de la requête (arguments hors pagination/tri), complétés des filtres implicites (utilisateur...)."""
+    filters = {k: v.strip() for k, v in request.args.items() if k not in IGNORED_ARGS and v.strip()}
+    filters.update({k: str(v) for k, v in (extra or {}).items() if v is not None})
+    return tuple(sorted(filters.items()))
+
+
+def paginate(query, page, per_page, filters=None):
+    """
+    Pagine une requête selon ?count= :
+    - exact : COUNT(*) à chaque appel (comportement historique) ;
+    - cached : total mis en cache par (endpoint, filtres), invalidé par les écritures ;
+    - estimate : comme cached, mais une table volumineuse non filtrée est estimée ;
+    - false : aucun comptage (total et pages à None, has_next seul).
+    filters : filtres implicites qui ne figurent pas dans la query string (ex. l'utilisateur connecté).
+    """
+    page = max(page or 1, 1)
+    per_page = max(per_page or 1, 1)
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    items, has_next = rows[:per_page], len(rows) > per_page
+    mode = count_mode()
+
+    if not has_next and (items or page == 1):
+        # Dernière page : le total se déduit sans comptage
+        return Page(items, page, per_page, (page - 1) * per_page + len(items), has_next)
+    if mode == "false":
+        return Page(items, page, per_page, None, has_next)
+    if mode == "exact":
+        return Page(items, page, per_page, query.order_by(None).count(), has_next)
+
+    table = query.column_descriptions[0]["entity"].__table__
+    key = (request.endpoint, normalized_filters(filters))
+    total = count_cache.get(key, table.name)
+    if total is not None:
+        return Page(items, page, per_page, total, has_next)
+
+    if mode == "estimate" and not key[1]:
+        estimate = estimated_rows(table)
+        if estimate >= ESTIMATE_MIN_ROWS:
+            return Page(items, page, per_page, estimate, has_next, estimated=True)
+
+    generation = count_cache.generation(table.name)
+    total = query.order_by(None).count()
+    count_cache.put(key, table.name, total, generation)
+    return Page(items, page, per_page, total, has_next)
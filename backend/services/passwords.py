@@ -0,0 +1,90 @@
+# services/passwords.py
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Le hachage (scrypt/PBKDF2 via hashlib) relâche le GIL : de vrais threads suffisent
+HASH_THREADS = int(os.getenv("PASSWORD_HASH_THREADS", "4"))
+# Hachage en masse (import d'utilisateurs) : un processus par cœur
+HASH_PROCESSES = int(os.getenv("PASSWORD_HASH_PROCESSES", str(os.cpu_count() or 1)))
+BULK_MIN = 8                # en dessous, le coût de démarrage des processus ne vaut pas la peine
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_processes = None
+_processes_pid = None
+
+
+def _gevent_threadpool():
+    """Pool de threads natifs du hub gevent si le worker est patché (gunicorn -k gevent), sinon None."""
+    try:
+        from gevent import monkey, get_hub
+    except ImportError:
+        return None
+    if not monkey.is_module_patched("threading"):
+        return None
+    pool = get_hub().threadpool
+    if pool.maxsize < HASH_THREADS:
+        pool.maxsize = HASH_THREADS
+    return pool
+
+
+def run_blocking(fn, *args):
+    """
+    Exécute fn(*args) dans un vrai thread et attend le résultat.
+    Sous gevent, seul le greenlet appelant attend : la boucle d'événements continue
+    de servir les autres requêtes du worker pendant le calcul.
+    """
+    pool = _gevent_threadpool()
+    if pool is not None:
+        return pool.apply(fn, args)
+
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=HASH_THREADS, thread_name_prefix="password-hash")
+                _executor_pid = os.getpid()
+    return _executor.submit(fn, *args).result()
+
+
+def hash_password(password):
+    return run_blocking(generate_password_hash, password)
+
+
+def verify_password(password_hash, password):
+    if not password_hash or password is None:
+        return False
+    return run_blocking(check_password_hash, password_hash, password)
+
+
+def _process_pool():
+    global _processes, _processes_pid
+    if _processes is None or _processes_pid != os.getpid():
+        with _executor_lock:
+            if _processes is None or _processes_pid != os.getpid():
+                _processes = ProcessPoolExecutor(max_workers=HASH_PROCESSES)
+                _processes_pid = os.getpid()
+    return _processes
+
+
+def hash_passwords(passwords):
+    """
+    Hache une liste de mots de passe en parallèle (même ordre en sortie).
+    Hors gevent, les hachages sont répartis sur un pool de processus ; dans un worker
+    gevent (où un pool de processus cohabite mal avec le hub) ils passent par le pool
+    de threads natifs, que hashlib exploite aussi sur plusieurs cœurs.
+    """
+    passwords = list(passwords)
+    if len(passwords) < BULK_MIN:
+        return [hash_password(p) for p in passwords]
+
+    pool = _gevent_threadpool()
+    if pool is not None:
+        return list(pool.imap(generate_password_hash, passwords))
+
+    chunksize = max(1, len(passwords) // (HASH_PROCESSES * 4))
+    return list(_process_pool().map(generate_password_hash, passwords, chunksize=chunksize))
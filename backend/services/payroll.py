@@ -0,0 +1,129 @@
+# services/payroll.py
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import and_, func, or_, select
+
+from extensions import db
+from models import Attendance, SalaryAdvance, User
+from services.schedules import schedule_book
+
+TOTAL_COLUMNS = ("days_worked", "worked_hours", "regular_hours", "overtime_hours",
+                 "late_days", "late_minutes", "gross", "advances", "net")
+
+
+def _frame(query, columns):
+    """Résultat d'une requête Core -> DataFrame construit colonne par colonne."""
+    rows = db.session.connection().execute(query).all()
+    if not rows:
+        return pd.DataFrame(columns=columns)
+    return pd.DataFrame(dict(zip(columns, map(list, zip(*rows)))))
+
+
+def month_bounds(month):
+    """(premier jour du mois, premier jour du mois suivant)."""
+    start = month.replace(day=1)
+    end = date(start.year + 1, 1, 1) if start.month == 12 else date(start.year, start.month + 1, 1)
+    return start, end
+
+
+def _schedule_columns(frame):
+    """Colonnes d'horaire par pointage : zone, sinon rôle, sinon défaut (vectorisé)."""
+    book = schedule_book
+    columns = {}
+    for i, field in enumerate(("late_cutoff", "daily_hours", "hourly_rate", "overtime_rate")):
+        convert = (lambda t: t.hour * 3600 + t.minute * 60 + t.second) if field == "late_cutoff" else float
+        default = convert(book.default[i])
+        by_location = pd.Series({k: convert(s[i]) for k, s in book.by_location.items()}, dtype="float64")
+        by_role = pd.Series({k: convert(s[i]) for k, s in book.by_role.items()}, dtype="float64")
+        values = frame["work_location_id"].map(by_location)
+        values = values.fillna(frame["role_id"].map(by_role)).fillna(default)
+        columns[field] = values.to_numpy(dtype=np.float64)
+    return columns
+
+
+def compute_payroll(month, user_ids=None):
+    """
+    Paie du mois pour tous les utilisateurs actifs (ou user_ids) :
+    heures travaillées / normales / supplémentaires, retards, brut, avances approuvées et net.
+    Les pointages sont chargés en colonnes (une requête) et calculés en NumPy.
+    Retourne un DataFrame indexé par user_id.
+    """
+    start, end = month_bounds(month)
+    schedule_book.ensure_fresh()
+
+    users_query = select(User.id, User.nom, User.prenom, User.role_id).where(User.is_active.is_(True))
+    if user_ids is not None:
+        users_query = users_query.where(User.id.in_(user_ids))
+    users = _frame(users_query, ["user_id", "nom", "prenom", "role_id"]).set_index("user_id")
+
+    attendance_query = (
+        select(Attendance.user_id, Attendance.check_in, Attendance.check_out, Attendance.work_location_id)
+        .where(Attendance.date >= start, Attendance.date < end, Attendance.check_in.isnot(None))
+    )
+    if user_ids is not None:
+        attendance_query = attendance_query.where(Attendance.user_id.in_(user_ids))
+    frame = _frame(attendance_query, ["user_id", "check_in", "check_out", "work_location_id"])
+    frame = frame[frame["user_id"].isin(users.index)]
+    frame = frame.assign(role_id=frame["user_id"].map(users["role_id"]))
+
+    schedule = _schedule_columns(frame)
+    check_in = pd.to_datetime(frame["check_in"])
+    check_out = pd.to_datetime(frame["check_out"])
+    seconds_of_day = (check_in - check_in.dt.normalize()).dt.total_seconds().to_numpy()
+    late_minutes = np.maximum(np.floor((seconds_of_day - schedule["late_cutoff"]) / 60), 0)
+    worked = ((check_out - check_in).dt.total_seconds() / 3600).fillna(0).to_numpy()
+    worked = np.maximum(worked, 0)
+    overtime = np.maximum(worked - schedule["daily_hours"], 0)
+    regular = worked - overtime
+    gross = schedule["hourly_rate"] * (regular + overtime * schedule["overtime_rate"])
+
+    per_day = pd.DataFrame({
+        "user_id": frame["user_id"].to_numpy(),
+        "days_worked": 1,
+        "worked_hours": worked,
+        "regular_hours": regular,
+        "overtime_hours": overtime,
+        "late_days": (late_minutes > 0).astype(np.int64),
+        "late_minutes": late_minutes.astype(np.int64),
+        "gross": gross,
+    })
+    totals = per_day.groupby("user_id").sum()
+
+    # Avances approuvées dans le mois (date d'approbation, sinon date de demande)
+    advances_query = (
+        select(SalaryAdvance.user_id, func.sum(SalaryAdvance.montant))
+        .where(
+            SalaryAdvance.statut == "approuve",
+            or_(
+                and_(SalaryAdvance.approved_at >= datetime.combine(start, datetime.min.time()),
+                     SalaryAdvance.approved_at < datetime.combine(end, datetime.min.time())),
+                and_(SalaryAdvance.approved_at.is_(None),
+                     SalaryAdvance.date_demande >= start, SalaryAdvance.date_demande < end),
+            ),
+        )
+        .group_by(SalaryAdvance.user_id)
+    )
+    if user_ids is not None:
+        advances_query = advances_query.where(SalaryAdvance.user_id.in_(user_ids))
+    advances = pd.Series(dict(db.session.execute(advances_query).all()), dtype="float64")
+
+    result = users[["nom", "prenom"]].join(totals, how="left")
+    result["advances"] = advances.reindex(result.index).fillna(0.0)
+    result = result.fillna({column: 0 for column in TOTAL_COLUMNS if column not in ("advances", "net")})
+    result["net"] = result["gross"] - result["advances"]
+    for column in ("days_worked", "late_days", "late_minutes"):
+        result[column] = result[column].astype(np.int64)
+    return result
+
+
+def payroll_rows(result):
+    """DataFrame de compute_payroll -> liste de dicts JSON (montants et heures arrondis)."""
+    rounded = result.round({"worked_hours": 2, "regular_hours": 2, "overtime_hours": 2,
+                            "gross": 2, "advances": 2, "net": 2})
+    return [
+        {"user_id": user_id, "user_name": f"{row['nom']} {row['prenom']}",
+         **{column: row[column] for column in TOTAL_COLUMNS}}
+        for user_id, row in zip(rounded.index.tolist(), rounded.to_dict("records"))
+    ]
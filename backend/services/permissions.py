@@ -0,0 +1,148 @@
+# services/permissions.py
+import calendar
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import g
+from flask_jwt_extended import get_jwt
+from sqlalchemy import func
+
+from extensions import db
+from models import PermissionChange, User
+
+ACCESS_TOKEN_LIFETIME = timedelta(minutes=30)
+ADMIN_ROLE = "Administrateur"
+ALL = "all"
+REFRESH_SECONDS = 2.0       # intervalle de vérification des changements faits par un autre worker
+
+
+def _split(permissions):
+    return [p.strip() for p in (permissions or "").split(",") if p.strip()]
+
+
+def compile_permissions(user):
+    """Droits effectifs d'un utilisateur (mêmes règles que User.has_permission) : "all" ou liste triée."""
+    role_permissions = user.role.permissions if user.role else None
+    if user.permissions == ALL or role_permissions == ALL:
+        return ALL
+    return sorted(set(_split(user.permissions)) | set(_split(role_permissions)))
+
+
+def _is_admin_role(role):
+    return bool(role and role.name.lower() == ADMIN_ROLE.lower())
+
+
+def permission_claims(user):
+    """Claims ajoutés au jeton d'accès à la connexion."""
+    return {
+        "perms": compile_permissions(user),
+        "role_id": user.role_id,
+        "is_admin": _is_admin_role(user.role),
+    }
+
+
+class PermissionStamps:
+    """
+    Dernier changement de droits connu par utilisateur et par rôle (horodatage epoch),
+    lu depuis permission_change et tenu en mémoire par worker.
+    Un jeton émis avant un changement qui le concerne est considéré comme périmé.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature = None
+        self._checked_at = 0.0
+        self.by_user = {}
+        self.by_role = {}
+
+    @staticmethod
+    def _db_signature():
+        return tuple(PermissionChange.query.with_entities(func.count(PermissionChange.id),
+                                                          func.max(PermissionChange.id)).one())
+
+    def _load_from_db(self):
+        by_user, by_role = {}, {}
+        rows = (
+            PermissionChange.query
+            .with_entities(PermissionChange.user_id, PermissionChange.role_id, func.max(PermissionChange.changed_at))
+            .group_by(PermissionChange.user_id, PermissionChange.role_id)
+        )
+        for user_id, role_id, changed_at in rows:
+            stamp = calendar.timegm(changed_at.timetuple())
+            if user_id is not None:
+                by_user[user_id] = max(by_user.get(user_id, 0), stamp)
+            elif role_id is not None:
+                by_role[role_id] = max(by_role.get(role_id, 0), stamp)
+        self.by_user, self.by_role = by_user, by_role
+        self._signature = self._db_signature()
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._signature is not None and now - self._checked_at < REFRESH_SECONDS:
+                return
+            if self._signature is None or self._db_signature() != self._signature:
+                self._load_from_db()
+            self._checked_at = now
+
+    def note(self, user_id=None, role_id=None, stamp=None):
+        stamp = stamp or int(time.time())
+        with self._lock:
+            if user_id is not None:
+                self.by_user[user_id] = max(self.by_user.get(user_id, 0), stamp)
+            elif role_id is not None:
+                self.by_role[role_id] = max(self.by_role.get(role_id, 0), stamp)
+
+    def is_stale(self, claims):
+        self.ensure_fresh()
+        issued_at = claims.get("iat", 0)
+        return (self.by_user.get(int(claims["sub"]), 0) >= issued_at
+                or self.by_role.get(claims.get("role_id"), 0) >= issued_at)
+
+
+# Horodatages partagés par toutes les requêtes du worker
+permission_stamps = PermissionStamps()
+
+
+def record_permission_change(user_id=None, role_id=None):
+    """
+    À appeler quand les droits, le rôle ou l'activation d'un utilisateur (ou les droits
+    d'un rôle) changent. La ligne est ajoutée à la session courante : le commit reste à
+    la charge de l'appelant. Les lignes plus anciennes que la durée d'un jeton sont purgées.
+    """
+    now = datetime.utcnow()
+    db.session.add(PermissionChange(user_id=user_id, role_id=role_id, changed_at=now))
+    PermissionChange.query.filter(PermissionChange.changed_at < now - ACCESS_TOKEN_LIFETIME).delete(
+        synchronize_session=False)
+    permission_stamps.note(user_id, role_id, calendar.timegm(now.timetuple()))
+
+
+def current_permissions():
+    """
+    (droits, is_admin) de l'utilisateur du jeton courant, mémorisés sur g.
+    Lus dans les claims sans requête ; relus en base si le jeton est antérieur
+    à un changement de droits (ou n'a pas de claims, jetons émis avant cette version).
+    """
+    if "permissions" not in g:
+        claims = get_jwt()
+        if "perms" in claims and not permission_stamps.is_stale(claims):
+            perms = claims["perms"]
+            g.permissions = (perms if perms == ALL else frozenset(perms), claims.get("is_admin", False))
+        else:
+            user = User.query.get(int(claims["sub"]))
+            if not user or not user.is_active:
+                g.permissions = (frozenset(), False)
+            else:
+                perms = compile_permissions(user)
+                g.permissions = (perms if perms == ALL else frozenset(perms), _is_admin_role(user.role))
+    return g.permissions
+
+
+def has_permission(permission):
+    perms, _ = current_permissions()
+    return perms == ALL or permission in perms
+
+
+def is_admin():
+    return current_permissions()[1]
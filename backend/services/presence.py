@@ -0,0 +1,193 @@
+# services/presence.py
+import threading
+import time as clock
+from datetime import date
+
+from sqlalchemy import func
+
+from models import Attendance, User
+from services.geofence import geofence_index
+from services.schedules import schedule_book
+
+SYNC_SECONDS = 5.0          # intervalle de vérification des pointages faits par un autre worker
+REBUILD_SECONDS = 300.0     # reconstruction complète de sécurité (noms, activations...)
+
+
+class PresenceBoard:
+    """
+    Tableau de présence du jour tenu en mémoire.
+    check_in / check_out le mettent à jour au fil de l'eau ; il est reconstruit depuis
+    la base au démarrage, au changement de jour, ou si un autre worker a pointé.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.day = None
+        self._built_at = 0.0
+        self._checked_at = 0.0
+        self._reset()
+
+    def _reset(self):
+        self._users = {}          # user_id -> "nom prenom" (utilisateurs actifs)
+        self._roles = {}          # user_id -> role_id (horaire applicable)
+        self._present = set()
+        self._late = set()
+        self._location_of = {}    # user_id -> work_location_id (entré et pas encore sorti)
+        self._on_site = {}        # work_location_id -> {user_id}
+        self._checked_in = 0      # pointages d'entrée du jour, tous utilisateurs confondus
+        self._checked_out = 0
+        self._users_signature = None
+        self._schedules_version = None
+        self._zones_version = None
+        self._snapshot = None
+
+    # --- Synchronisation avec la base ---
+    @staticmethod
+    def _attendance_signature(day):
+        return tuple(
+            Attendance.query.filter_by(date=day)
+            .with_entities(func.count(Attendance.check_in), func.count(Attendance.check_out))
+            .one()
+        )
+
+    @staticmethod
+    def _users_db_signature():
+        return tuple(
+            User.query.filter_by(is_active=True)
+            .with_entities(func.count(User.id), func.max(User.id))
+            .one()
+        )
+
+    def rebuild(self, day=None):
+        """Recharge le tableau du jour depuis la base (utilisateurs actifs + pointages)."""
+        day = day or date.today()
+        schedule_book.ensure_fresh()
+        geofence_index.ensure_fresh()
+        users = (
+            User.query.filter_by(is_active=True)
+            .with_entities(User.id, User.nom, User.prenom, User.role_id)
+            .order_by(User.id)
+            .all()
+        )
+        attendances = (
+            Attendance.query.filter_by(date=day)
+            .with_entities(Attendance.user_id, Attendance.check_in, Attendance.check_out, Attendance.work_location_id)
+            .all()
+        )
+        self._reset()
+        self.day = day
+        self._users = {u.id: f"{u.nom} {u.prenom}" for u in users}
+        self._roles = {u.id: u.role_id for u in users}
+        self._schedules_version = schedule_book.version
+        self._zones_version = geofence_index.version
+        self._users_signature = (len(users), max(self._users) if self._users else None)
+        for a in attendances:
+            if a.check_in:
+                self._apply_check_in(a.user_id, a.check_in, a.work_location_id)
+            if a.check_out:
+                self._apply_check_out(a.user_id)
+        self._built_at = self._checked_at = clock.monotonic()
+
+    def ensure_fresh(self):
+        """Reconstruit le tableau si le jour a changé ou si la base a divergé."""
+        today = date.today()
+        now = clock.monotonic()
+        with self._lock:
+            if self.day != today or now - self._built_at > REBUILD_SECONDS:
+                self.rebuild(today)
+                return
+            if now - self._checked_at < SYNC_SECONDS:
+                return
+            schedule_book.ensure_fresh()
+            geofence_index.ensure_fresh()
+            if (schedule_book.version != self._schedules_version
+                    or geofence_index.version != self._zones_version
+                    or self._attendance_signature(today) != (self._checked_in, self._checked_out)
+                    or self._users_db_signature() != self._users_signature):
+                self.rebuild(today)
+            self._checked_at = now
+
+    def invalidate(self):
+        """Force une reconstruction au prochain accès (ex. utilisateur modifié)."""
+        self.day = None
+
+    # --- Mises à jour incrémentales ---
+    def _apply_check_in(self, user_id, check_in, location_id):
+        user_id = int(user_id)
+        self._checked_in += 1
+        self._snapshot = None
+        if user_id not in self._users:
+            return
+        self._present.add(user_id)
+        if check_in.time() > schedule_book.resolve(self._roles.get(user_id), location_id).late_cutoff:
+            self._late.add(user_id)
+        if location_id is not None:
+            self._location_of[user_id] = location_id
+            self._on_site.setdefault(location_id, set()).add(user_id)
+
+    def _apply_check_out(self, user_id):
+        user_id = int(user_id)
+        self._checked_out += 1
+        self._snapshot = None
+        location_id = self._location_of.pop(user_id, None)
+        if location_id is not None:
+            self._on_site.get(location_id, set()).discard(user_id)
+
+    def record_check_in(self, user_id, check_in, location_id, day=None):
+        with self._lock:
+            if self.day is not None and (day or check_in.date()) == self.day:
+                self._apply_check_in(user_id, check_in, location_id)
+
+    def record_check_out(self, user_id, day=None):
+        with self._lock:
+            if self.day is not None and (day or date.today()) == self.day:
+                self._apply_check_out(user_id)
+
+    # --- Lecture ---
+    def stats(self):
+        """Présents / absents / retards du jour, au format de /stats/today."""
+        self.ensure_fresh()
+        with self._lock:
+            if self._snapshot is None:
+                presents, absents, retards = [], [], []
+                for user_id, name in self._users.items():
+                    entry = {"id": user_id, "name": name}
+                    if user_id in self._present:
+                        presents.append(entry)
+                        if user_id in self._late:
+                            retards.append(entry)
+                    else:
+                        absents.append(entry)
+                self._snapshot = {
+                    "date": self.day.isoformat(),
+                    "presents": presents,
+                    "absents": absents,
+                    "retards": retards,
+                    "count": {
+                        "presents": len(presents),
+                        "absents": len(absents),
+                        "retards": len(retards),
+                        "total": len(self._users),
+                    },
+                    "occupancy": {str(loc): len(ids) for loc, ids in self._on_site.items() if ids},
+                }
+            return self._snapshot
+
+    def has_checked_in(self, user_id):
+        """Vrai si l'utilisateur a déjà pointé son entrée aujourd'hui."""
+        self.ensure_fresh()
+        with self._lock:
+            return int(user_id) in self._present
+
+    def on_site(self, location_id):
+        """Utilisateurs actuellement sur une zone (entrés et pas encore sortis)."""
+        self.ensure_fresh()
+        with self._lock:
+            return [
+                {"id": user_id, "name": self._users[user_id]}
+                for user_id in sorted(self._on_site.get(location_id, ()))
+            ]
+
+
+# Tableau partagé par toutes les requêtes du worker
+presence_board = PresenceBoard()
@@ -0,0 +1,160 @@
+# services/provisioning.py
+import csv
+import io
+import json
+
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import Role, User
+from services.passwords import hash_passwords
+from services.presence import presence_board
+
+MAX_ROWS = 2000
+REQUIRED = ("username", "email", "password", "nom", "prenom")
+DEFAULT_SITE = "Dakar"
+
+
+def read_rows(content, filename=""):
+    """
+    Lignes à importer depuis un contenu JSON (liste, ou {"users": [...]}) ou CSV
+    (en-têtes username,email,password,nom,prenom,telephone,site,role_id|role ; séparateur , ou ;).
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+    text = content.lstrip()
+    if filename.lower().endswith(".json") or text.startswith(("[", "{")):
+        data = json.loads(text)
+        rows = data.get("users") if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise ValueError("Liste d'utilisateurs attendue")
+        return rows
+
+    first_line = text.split("\n", 1)[0]
+    delimiter = ";" if first_line.count(";") > first_line.count(",") else ","
+    reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+    return [{(k or "").strip(): (v or "").strip() for k, v in row.items()} for row in reader]
+
+
+def _clean(row):
+    return {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items()}
+
+
+def provision_users(rows, dry_run=False):
+    """
+    Crée un lot d'utilisateurs : une requête pour les rôles, une requête IN pour l'unicité
+    username/email, hachage parallèle des mots de passe puis insertion en une transaction.
+    Les lignes invalides sont rapportées ({"row", "msg"}) sans bloquer les autres ;
+    "row" est le numéro de ligne (1 = première ligne de données).
+    """
+    if len(rows) > MAX_ROWS:
+        raise ValueError(f"{MAX_ROWS} utilisateurs maximum par import")
+
+    roles = Role.query.all()
+    roles_by_id = {r.id: r for r in roles}
+    roles_by_name = {r.name.lower(): r for r in roles}
+
+    errors, valid = [], []
+    seen_usernames, seen_emails = set(), set()
+    for index, raw in enumerate(rows, start=1):
+        if not isinstance(raw, dict):
+            errors.append({"row": index, "msg": "Ligne invalide"})
+            continue
+        row = _clean(raw)
+        missing = [f for f in REQUIRED if not row.get(f)]
+        if missing:
+            errors.append({"row": index, "msg": f"Champs manquants : {', '.join(missing)}"})
+            continue
+
+        role = None
+        if row.get("role_id") not in (None, ""):
+            try:
+                role = roles_by_id.get(int(row["role_id"]))
+            except (TypeError, ValueError):
+                role = None
+        elif row.get("role"):
+            role = roles_by_name.get(str(row["role"]).lower())
+        if not role:
+            errors.append({"row": index, "msg": "Rôle introuvable"})
+            continue
+
+        username, email = str(row["username"]), str(row["email"])
+        if username.lower() in seen_usernames or email.lower() in seen_emails:
+            errors.append({"row": index, "msg": "Nom d'utilisateur ou email en double dans le fichier"})
+            continue
+        seen_usernames.add(username.lower())
+        seen_emails.add(email.lower())
+        valid.append((index, row, role))
+
+    # Unicité contre la base : une seule requête pour tout le lot
+    if valid:
+        usernames = [str(row["username"]) for _, row, _ in valid]
+        emails = [str(row["email"]) for _, row, _ in valid]
+        taken = db.session.execute(
+            select(User.username, User.email).where(or_(User.username.in_(usernames), User.email.in_(emails)))
+        ).all()
+        taken_usernames = {u.lower() for u, _ in taken}
+        taken_emails = {e.lower() for _, e in taken}
+        kept = []
+        for index, row, role in valid:
+            if str(row["username"]).lower() in taken_usernames or str(row["email"]).lower() in taken_emails:
+                errors.append({"row": index, "msg": "Nom d'utilisateur ou email déjà utilisé"})
+            else:
+                kept.append((index, row, role))
+        valid = kept
+
+    errors.sort(key=lambda e: e["row"])
+    if dry_run or not valid:
+        return {"created": [], "valid": len(valid), "errors": errors}
+
+    hashes = list(hash_passwords(str(row["password"]) for _, row, _ in valid))
+
+    def build(row, role, password_hash):
+        return User(
+            username=str(row["username"]),
+            email=str(row["email"]),
+            password_hash=password_hash,
+            nom=str(row["nom"]),
+            prenom=str(row["prenom"]),
+            telephone=str(row.get("telephone") or ""),
+            site=str(row.get("site") or DEFAULT_SITE),
+            role=role,
+            permissions=role.permissions,
+            is_active=True,
+        )
+
+    users = [build(row, role, password_hash) for (_, row, role), password_hash in zip(valid, hashes)]
+    try:
+        db.session.add_all(users)
+        db.session.flush()
+        # Relevés avant le commit (qui expire les objets et forcerait une requête par ligne)
+        created = [{"row": index, "id": u.id, "username": u.username}
+                   for (index, _, _), u in zip(valid, users)]
+        db.session.commit()
+    except IntegrityError:
+        # Compte créé entre-temps (import ou ajout concurrent) : reprise ligne par ligne,
+        # chacune dans un SAVEPOINT, pour ne rejeter que les lignes en conflit
+        db.session.rollback()
+        created = []
+        for (index, row, role), password_hash in zip(valid, hashes):
+            user = build(row, role, password_hash)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(user)
+            except IntegrityError:
+                errors.append({"row": index, "msg": "Nom d'utilisateur ou email déjà utilisé"})
+                continue
+            created.append({"row": index, "id": user.id, "username": user.username})
+        errors.sort(key=lambda e: e["row"])
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    presence_board.invalidate()
+
+    return {
+        "created": created,
+        "valid": len(valid),
+        "errors": errors,
+    }
@@ -0,0 +1,168 @@
+# services/punches.py
+import logging
+
+from sqlalchemy import func, select, update
+
+from extensions import db
+from models import Attendance
+
+ATTENDANCE_UNIQUE_INDEX = "uq_attendance_user_date"
+UPSERT_DIALECTS = ("mysql", "mariadb", "sqlite", "postgresql")
+CHECK_IN_COLUMNS = ("check_in_location", "check_in_lat", "check_in_lng", "work_location_id")
+
+_upsert_ready = False
+
+
+def ensure_attendance_unique_index():
+    """
+    Crée l'index unique attendance(user_id, date) sur une base existante
+    (db.create_all() n'ajoute pas d'index aux tables déjà créées) et active le
+    chemin rapide. En cas d'échec (doublons existants), les routes restent sur
+    l'ancien chemin lecture + écriture.
+    """
+    global _upsert_ready
+    if db.engine.dialect.name not in UPSERT_DIALECTS:
+        return False
+    index = next(i for i in Attendance.__table__.indexes if i.name == ATTENDANCE_UNIQUE_INDEX)
+    try:
+        index.create(bind=db.engine, checkfirst=True)
+    except Exception as e:
+        logging.warning("⚠️ Index unique attendance(user_id, date) non créé, upsert désactivé : %s", e)
+        _upsert_ready = False
+        return False
+    _upsert_ready = True
+    return True
+
+
+def upsert_ready():
+    return _upsert_ready
+
+
+def upsert_check_in(user_id, day, check_in, **values):
+    """
+    Enregistre le pointage d'entrée en une seule instruction d'écriture.
+    Insère la ligne du jour, ou complète une ligne existante sans entrée.
+    Retourne False si l'utilisateur avait déjà pointé ce jour-là.
+    """
+    row = {"user_id": int(user_id), "date": day, "check_in": check_in, "status": "present", **values}
+    dialect = db.engine.dialect.name
+
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(Attendance).values(**row)
+        new = stmt.inserted
+        is_open = Attendance.check_in.is_(None)
+        # Les affectations sont évaluées dans l'ordre : check_in est posé en dernier et
+        # porte l'indicateur LAST_INSERT_ID (0 = déjà pointé) car avec CLIENT_FOUND_ROWS
+        # le rowcount ne distingue pas « inséré » de « inchangé ».
+        assignments = [(col, func.IF(is_open, new[col], getattr(Attendance, col))) for col in CHECK_IN_COLUMNS]
+        assignments.append(("check_in", func.IF(
+            func.LAST_INSERT_ID(func.IF(is_open, Attendance.id, 0)) > 0, new.check_in, Attendance.check_in
+        )))
+        result = db.session.execute(stmt.on_duplicate_key_update(assignments))
+        return bool(result.lastrowid)
+
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    stmt = insert(Attendance).values(**row)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "date"],
+        set_={col: stmt.excluded[col] for col in ("check_in",) + CHECK_IN_COLUMNS},
+        where=Attendance.check_in.is_(None),
+    )
+    return db.session.execute(stmt).rowcount == 1
+
+
+def close_check_out(user_id, day, location_name, check_out, **values):
+    """
+    Enregistre le pointage de sortie par un UPDATE conditionnel unique (atomique entre workers).
+    Retourne (None, Attendance détachée pour les cumuls) si la sortie est enregistrée,
+    sinon (message d'erreur, None) avec les mêmes messages que la route.
+    """
+    user_id = int(user_id)
+    stmt = (
+        update(Attendance)
+        .where(
+            Attendance.user_id == user_id,
+            Attendance.date == day,
+            Attendance.check_in.isnot(None),
+            Attendance.check_out.is_(None),
+            Attendance.check_in_location == location_name,
+        )
+        .values(check_out=check_out, check_out_location=location_name, **values)
+        .execution_options(synchronize_session=False)
+    )
+
+    if db.engine.dialect.update_returning:
+        closed = db.session.execute(stmt.returning(Attendance.check_in, Attendance.work_location_id)).first()
+    else:
+        closed = None
+        if db.session.execute(stmt).rowcount:
+            closed = db.session.execute(
+                select(Attendance.check_in, Attendance.work_location_id)
+                .where(Attendance.user_id == user_id, Attendance.date == day)
+            ).first()
+
+    if closed is not None:
+        return None, Attendance(user_id=user_id, date=day, check_in=closed.check_in, check_out=check_out,
+                                work_location_id=closed.work_location_id)
+
+    # Chemin d'erreur : on relit la ligne pour renvoyer le bon message
+    current = (
+        Attendance.query.filter_by(user_id=user_id, date=day)
+        .with_entities(Attendance.check_in, Attendance.check_out, Attendance.check_in_location)
+        .first()
+    )
+    if not current or not current.check_in:
+        return "Vous devez d'abord pointer votre entrée", None
+    if current.check_out:
+        return "Déjà pointé la sortie aujourd'hui", None
+    return "Zone de sortie différente de l'entrée.", None
+
+
+def upsert_check_ins(rows):
+    """
+    Version multi-lignes de upsert_check_in pour l'écriture groupée : une instruction
+    INSERT pour tout le lot. rows : dicts (user_id, date, check_in, colonnes d'entrée),
+    au plus un par (user_id, date). Retourne l'ensemble des (user_id, date) enregistrés.
+    """
+    if not rows:
+        return set()
+    rows = [{"status": "present", **row} for row in rows]
+    dialect = db.engine.dialect.name
+
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(Attendance).values(rows)
+        new = stmt.inserted
+        is_open = Attendance.check_in.is_(None)
+        assignments = [(col, func.IF(is_open, new[col], getattr(Attendance, col)))
+                       for col in CHECK_IN_COLUMNS + ("check_in",)]
+        db.session.execute(stmt.on_duplicate_key_update(assignments))
+        # Pas de RETURNING : on relit les heures d'entrée et on garde celles qui sont les nôtres
+        # (comparaison à la seconde, DATETIME sans fractions).
+        wanted = {(row["user_id"], row["date"]): row["check_in"].replace(microsecond=0) for row in rows}
+        stored = db.session.execute(
+            select(Attendance.user_id, Attendance.date, Attendance.check_in).where(
+                Attendance.user_id.in_({key[0] for key in wanted}),
+                Attendance.date.in_({key[1] for key in wanted}),
+            )
+        )
+        return {
+            (user_id, day) for user_id, day, check_in in stored
+            if check_in and wanted.get((user_id, day)) == check_in.replace(microsecond=0)
+        }
+
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    stmt = insert(Attendance).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "date"],
+        set_={col: stmt.excluded[col] for col in ("check_in",) + CHECK_IN_COLUMNS},
+        where=Attendance.check_in.is_(None),
+    ).returning(Attendance.user_id, Attendance.date)
+    return {(user_id, day) for user_id, day in db.session.execute(stmt)}
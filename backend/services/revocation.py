@@ -0,0 +1,97 @@
+# services/revocation.py
+import calendar
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from models import RevokedToken
+
+REFRESH_TOKEN_LIFETIME = timedelta(days=7)
+SYNC_SECONDS = 2.0          # intervalle de lecture des révocations faites par un autre worker
+SYNC_MARGIN = timedelta(minutes=2)   # recouvrement de la fenêtre : transactions lentes, horloges décalées
+FULL_SYNC_SECONDS = 300.0   # relecture complète (filet de sécurité), qui purge aussi les jetons expirés
+
+
+class RevocationStore:
+    """
+    Identifiants (jti) des jetons révoqués, tenus en mémoire par worker : la vérification
+    faite à chaque requête est une recherche dans un dict. La table revoked_token sert de
+    référence partagée ; chaque worker y relit les révocations récentes (revoked_at dans une
+    fenêtre qui recouvre la lecture précédente) et, périodiquement, toutes les révocations
+    non expirées. Les identifiants auto-incrémentés ne servent pas de curseur : sous MySQL
+    ils sont attribués avant le commit, dans un ordre qui n'est pas celui des commits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._expires = {}      # jti -> expiration (epoch)
+        self._since = None      # début de la dernière lecture (UTC)
+        self._synced_at = 0.0
+        self._full_synced_at = 0.0
+
+    @staticmethod
+    def _rows(query):
+        return {jti: calendar.timegm(expires_at.timetuple())
+                for jti, expires_at in query.with_entities(RevokedToken.jti, RevokedToken.expires_at)}
+
+    def _sync(self, full):
+        started = datetime.utcnow()
+        if full:
+            # Remplace le contenu : les jetons expirés disparaissent de la mémoire
+            self._expires = self._rows(RevokedToken.query.filter(RevokedToken.expires_at >= started))
+        else:
+            self._expires.update(self._rows(
+                RevokedToken.query.filter(RevokedToken.revoked_at >= self._since - SYNC_MARGIN)))
+        self._since = started
+
+    def ensure_fresh(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._since is not None and now - self._synced_at < SYNC_SECONDS:
+                return
+            full = self._since is None or now - self._full_synced_at > FULL_SYNC_SECONDS
+            self._sync(full)
+            self._synced_at = now
+            if full:
+                self._full_synced_at = now
+
+    def is_revoked(self, jwt_payload):
+        self.ensure_fresh()
+        return jwt_payload["jti"] in self._expires
+
+    def revoke(self, jwt_payload):
+        """
+        Révoque un jeton décodé ; la ligne est ajoutée à la session (commit par l'appelant).
+        Sans effet si le jeton est déjà révoqué, y compris par une requête concurrente
+        (insertion dans un SAVEPOINT : le doublon de jti est simplement annulé).
+        Retourne True si cet appel a révoqué le jeton, False s'il l'était déjà.
+        """
+        jti = jwt_payload["jti"]
+        if self.is_revoked(jwt_payload) or RevokedToken.query.filter_by(jti=jti).first() is not None:
+            return False
+        expires_at = datetime.utcfromtimestamp(jwt_payload["exp"])
+        try:
+            with db.session.begin_nested():
+                db.session.add(RevokedToken(jti=jti, user_id=int(jwt_payload["sub"]), expires_at=expires_at))
+        except IntegrityError:
+            return False
+        finally:
+            with self._lock:
+                self._expires[jti] = jwt_payload["exp"]
+        RevokedToken.query.filter(RevokedToken.expires_at < datetime.utcnow()).delete(synchronize_session=False)
+        return True
+
+
+# Révocations partagées par toutes les requêtes du worker
+revocation_store = RevocationStore()
+
+
+def register_blocklist(jwt):
+    """Branche le magasin de révocation sur flask-jwt-extended."""
+
+    @jwt.token_in_blocklist_loader
+    def token_is_revoked(_jwt_header, jwt_payload):
+        return revocation_store.is_revoked(jwt_payload)
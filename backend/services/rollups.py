@@ -0,0 +1,148 @@
+# services/rollups.py
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy import insert
+
+from extensions import db
+from models import Attendance, AttendanceDaily, AttendanceMonthly, User
+from services.schedules import schedule_book, LATE_CUTOFF
+
+
+def late_minutes_for(check_in, late_cutoff=LATE_CUTOFF):
+    """Minutes de retard par rapport à l'heure limite (0 si à l'heure)."""
+    if not check_in:
+        return 0
+    cutoff = datetime.combine(check_in.date(), late_cutoff)
+    return max(0, int((check_in - cutoff).total_seconds() // 60))
+
+
+def record_attendance(attendance):
+    """
+    Met à jour les cumuls jour/mois d'un pointage terminé.
+    Travaille dans la session courante : le commit reste à la charge de l'appelant.
+    """
+    record_attendances([attendance])
+
+
+def record_attendances(attendances):
+    """
+    Version par lot de record_attendance : une requête pour les jours, une pour les mois,
+    et les nouvelles lignes insérées en un seul INSERT multi-lignes par table.
+    """
+    if not attendances:
+        return
+    user_ids = {int(a.user_id) for a in attendances}
+    days = {a.date for a in attendances}
+    months = {d.replace(day=1) for d in days}
+    schedule_book.ensure_fresh()
+    roles = dict(User.query.filter(User.id.in_(user_ids)).with_entities(User.id, User.role_id))
+    dailies = {
+        (d.user_id, d.date): d for d in AttendanceDaily.query.filter(
+            AttendanceDaily.user_id.in_(user_ids), AttendanceDaily.date.in_(days))
+    }
+    monthlies = {
+        (m.user_id, m.month): m for m in AttendanceMonthly.query.filter(
+            AttendanceMonthly.user_id.in_(user_ids), AttendanceMonthly.month.in_(months))
+    }
+    new_dailies, new_monthlies = {}, {}
+
+    for attendance in attendances:
+        user_id = int(attendance.user_id)
+        hours = attendance.total_hours
+        schedule = schedule_book.resolve(roles.get(user_id), attendance.work_location_id)
+        late_minutes = late_minutes_for(attendance.check_in, schedule.late_cutoff)
+        month = attendance.date.replace(day=1)
+
+        monthly = monthlies.get((user_id, month))
+        if monthly is None:
+            monthly = SimpleNamespace(user_id=user_id, month=month, worked_hours=0.0,
+                                      days_worked=0, late_days=0, late_minutes=0)
+            monthlies[(user_id, month)] = new_monthlies[(user_id, month)] = monthly
+
+        daily = dailies.get((user_id, attendance.date))
+        if daily is not None:
+            # Recalcul d'un jour déjà cumulé : on retire l'ancienne contribution
+            monthly.worked_hours -= daily.worked_hours
+            monthly.late_days -= 1 if daily.is_late else 0
+            monthly.late_minutes -= daily.late_minutes
+        else:
+            daily = SimpleNamespace(user_id=user_id, date=attendance.date)
+            dailies[(user_id, attendance.date)] = new_dailies[(user_id, attendance.date)] = daily
+            monthly.days_worked += 1
+
+        daily.worked_hours = hours
+        daily.is_late = late_minutes > 0
+        daily.late_minutes = late_minutes
+        monthly.worked_hours += hours
+        monthly.late_days += 1 if late_minutes > 0 else 0
+        monthly.late_minutes += late_minutes
+
+    if new_dailies:
+        db.session.execute(insert(AttendanceDaily), [vars(d) for d in new_dailies.values()])
+    if new_monthlies:
+        db.session.execute(insert(AttendanceMonthly), [vars(m) for m in new_monthlies.values()])
+
+
+def rebuild_rollups(chunk_size=200, log=print):
+    """
+    Reconstruit attendance_daily / attendance_monthly depuis la table attendance.
+    Traite les utilisateurs par paquets de chunk_size pour borner la mémoire et la
+    taille des transactions : les cumuls d'un paquet sont supprimés puis réinsérés dans
+    une même transaction, si bien que /timesheet ne voit jamais de cumuls vides et qu'un
+    pointage enregistré pendant la reconstruction ne se heurte pas aux lignes du paquet.
+    Comme le suivi en direct, seuls les pointages terminés (avec sortie) sont comptés ;
+    un jour en double est cumulé dans une seule ligne.
+    """
+    # Utilisateurs pointés ou déjà cumulés (les cumuls orphelins sont ainsi supprimés)
+    user_ids = sorted(
+        {row.user_id for row in Attendance.query.with_entities(Attendance.user_id).distinct()}
+        | {row.user_id for row in AttendanceDaily.query.with_entities(AttendanceDaily.user_id).distinct()}
+        | {row.user_id for row in AttendanceMonthly.query.with_entities(AttendanceMonthly.user_id).distinct()}
+    )
+    schedule_book.ensure_fresh()
+    total_days = 0
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        AttendanceDaily.query.filter(AttendanceDaily.user_id.in_(chunk)).delete(synchronize_session=False)
+        AttendanceMonthly.query.filter(AttendanceMonthly.user_id.in_(chunk)).delete(synchronize_session=False)
+        rows = (
+            Attendance.query.filter(Attendance.user_id.in_(chunk), Attendance.check_in.isnot(None),
+                                    Attendance.check_out.isnot(None))
+            .with_entities(Attendance.user_id, Attendance.date, Attendance.check_in, Attendance.check_out,
+                           Attendance.work_location_id)
+            .all()
+        )
+        roles = dict(User.query.filter(User.id.in_(chunk)).with_entities(User.id, User.role_id))
+
+        days = {}
+        for user_id, day, check_in, check_out, location_id in rows:
+            entry = days.setdefault((user_id, day), {"worked_hours": 0.0, "check_in": check_in,
+                                                     "location_id": location_id})
+            entry["worked_hours"] += (check_out - check_in).total_seconds() / 3600
+            if check_in < entry["check_in"]:
+                entry["check_in"], entry["location_id"] = check_in, location_id
+
+        daily_rows, months = [], {}
+        for (user_id, day), entry in days.items():
+            schedule = schedule_book.resolve(roles.get(user_id), entry["location_id"])
+            late = late_minutes_for(entry["check_in"], schedule.late_cutoff)
+            daily_rows.append({"user_id": user_id, "date": day, "worked_hours": entry["worked_hours"],
+                               "is_late": late > 0, "late_minutes": late})
+            month = months.setdefault((user_id, day.replace(day=1)), {
+                "worked_hours": 0.0, "days_worked": 0, "late_days": 0, "late_minutes": 0})
+            month["worked_hours"] += entry["worked_hours"]
+            month["days_worked"] += 1
+            month["late_days"] += 1 if late > 0 else 0
+            month["late_minutes"] += late
+
+        if daily_rows:
+            db.session.execute(insert(AttendanceDaily), daily_rows)
+            db.session.execute(insert(AttendanceMonthly), [
+                {"user_id": user_id, "month": month, **values}
+                for (user_id, month), values in months.items()
+            ])
+        db.session.commit()
+        total_days += len(daily_rows)
+        log(f"{min(start + chunk_size, len(user_ids))}/{len(user_ids)} utilisateurs, {total_days} jours cumulés")
+    return total_days
@@ -0,0 +1,113 @@
+# services/routing.py
+from datetime import timedelta
+
+import numpy as np
+
+from services.geofence import haversine_m
+
+PRIORITY_RANK = {"urgente": 0, "haute": 1, "normale": 2, "basse": 3}
+TIME_SLACK = timedelta(hours=2)   # rendez-vous espacés d'au moins ce délai : l'ordre prévu est gardé
+MAX_PASSES = 50
+
+
+def distance_matrix(lats, lngs):
+    """Matrice n×n des distances haversine (mètres), calculée d'un bloc."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    return haversine_m(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
+
+
+def precedence(times, priorities, slack=TIME_SLACK):
+    """
+    before[i, j] : l'arrêt i doit précéder l'arrêt j. Deux rendez-vous espacés d'au moins
+    slack gardent leur ordre prévu ; entre rendez-vous proches, la priorité décide.
+    """
+    t = np.array([d.timestamp() for d in times], dtype=np.float64)
+    r = np.array([PRIORITY_RANK.get(p, PRIORITY_RANK["normale"]) for p in priorities], dtype=np.int64)
+    gap = t[None, :] - t[:, None]
+    close = np.abs(gap) < slack.total_seconds()
+    return (gap >= slack.total_seconds()) | (close & (r[:, None] < r[None, :]))
+
+
+def nearest_neighbour(dist, before, start=None):
+    """
+    Tournée gloutonne : depuis start (ou le premier arrêt libre), l'arrêt le plus proche
+    parmi ceux dont les prédécesseurs sont visités. Si les contraintes bouclent,
+    le premier arrêt restant est pris.
+    """
+    n = len(before)
+    waiting = before.sum(axis=0)           # prédécesseurs non visités
+    visited = np.zeros(n, dtype=bool)
+    route, current = [], start
+    for _ in range(n):
+        candidates = np.flatnonzero(~visited & (waiting == 0))
+        if len(candidates) == 0:
+            candidates = np.flatnonzero(~visited)[:1]
+        if current is None:
+            nxt = int(candidates[0])
+        else:
+            nxt = int(candidates[np.argmin(dist[current, candidates])])
+        route.append(nxt)
+        visited[nxt] = True
+        waiting -= before[nxt]
+        current = nxt
+    return route
+
+
+def path_length(dist, route, start=None):
+    points = ([start] if start is not None else []) + list(route)
+    return float(sum(dist[a, b] for a, b in zip(points, points[1:])))
+
+
+def two_opt(dist, route, before, start=None):
+    """
+    Améliore un chemin ouvert en inversant des segments tant que la distance baisse ;
+    un segment n'est inversé que s'il ne contient aucun couple ordonné par before.
+    """
+    route = list(route)
+    n = len(route)
+    for _ in range(MAX_PASSES):
+        improved = False
+        for i in range(n - 1):
+            a = route[i - 1] if i > 0 else start
+            for j in range(i + 1, n):
+                b, c = route[i], route[j]
+                d = route[j + 1] if j + 1 < n else None
+                old = (dist[a, b] if a is not None else 0.0) + (dist[c, d] if d is not None else 0.0)
+                new = (dist[a, c] if a is not None else 0.0) + (dist[b, d] if d is not None else 0.0)
+                if new < old - 1e-6:
+                    segment = route[i:j + 1]
+                    if before[np.ix_(segment, segment)].any():
+                        continue
+                    route[i:j + 1] = segment[::-1]
+                    improved = True
+        if not improved:
+            break
+    return route
+
+
+def plan_route(stops, start=None):
+    """
+    Ordonne des arrêts (dicts avec latitude, longitude, date_prevue, priorite).
+    start : (latitude, longitude) du point de départ, facultatif.
+    Retourne (ordre des indices, longueurs des trajets en mètres, distance totale,
+    distance dans l'ordre prévu).
+    """
+    if not stops:
+        return [], [], 0.0, 0.0
+    # Indices dans l'ordre prévu : sans point de départ, la tournée commence au premier rendez-vous
+    planned = sorted(range(len(stops)), key=lambda i: (stops[i]["date_prevue"], i))
+    stops = [stops[i] for i in planned]
+    lats = [s["latitude"] for s in stops]
+    lngs = [s["longitude"] for s in stops]
+    origin = None
+    if start is not None:
+        lats, lngs, origin = lats + [start[0]], lngs + [start[1]], len(stops)
+    dist = distance_matrix(lats, lngs)
+    before = precedence([s["date_prevue"] for s in stops], [s.get("priorite") for s in stops])
+
+    route = two_opt(dist, nearest_neighbour(dist, before, origin), before, origin)
+
+    points = ([origin] if origin is not None else []) + route
+    legs = [float(dist[a, b]) for a, b in zip(points, points[1:])]
+    return [planned[i] for i in route], legs, sum(legs), path_length(dist, range(len(stops)), origin)
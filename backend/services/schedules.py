@@ -0,0 +1,86 @@
+# services/schedules.py
+import threading
+import time as clock
+from collections import namedtuple
+from datetime import time
+
+from sqlalchemy import func
+
+from models import WorkSchedule
+
+LATE_CUTOFF = time(9, 15)   # heure limite par défaut, sans horaire configuré
+REFRESH_SECONDS = 5.0       # intervalle de vérification des horaires modifiés par un autre worker
+
+Schedule = namedtuple("Schedule", "late_cutoff daily_hours hourly_rate overtime_rate")
+DEFAULT_SCHEDULE = Schedule(LATE_CUTOFF, 8.0, 0.0, 1.25)
+
+
+class ScheduleBook:
+    """
+    Horaires actifs tenus en mémoire par worker.
+    Un pointage prend l'horaire de sa zone, sinon celui du rôle de l'utilisateur,
+    sinon l'horaire par défaut (ligne sans zone ni rôle, ou DEFAULT_SCHEDULE).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._signature = None
+        self._checked_at = 0.0
+        self.version = 0          # incrémenté à chaque rechargement (cf. presence_board)
+        self.by_location = {}
+        self.by_role = {}
+        self.default = DEFAULT_SCHEDULE
+
+    @staticmethod
+    def _db_signature():
+        return tuple(
+            WorkSchedule.query.filter_by(is_active=True)
+            .with_entities(func.count(WorkSchedule.id), func.max(WorkSchedule.id), func.max(WorkSchedule.updated_at))
+            .one()
+        )
+
+    def _load_from_db(self):
+        by_location, by_role, default = {}, {}, DEFAULT_SCHEDULE
+        for s in WorkSchedule.query.filter_by(is_active=True).order_by(WorkSchedule.id):
+            schedule = Schedule(
+                s.late_cutoff,
+                float(s.daily_hours if s.daily_hours is not None else DEFAULT_SCHEDULE.daily_hours),
+                float(s.hourly_rate or 0),
+                float(s.overtime_rate if s.overtime_rate is not None else DEFAULT_SCHEDULE.overtime_rate),
+            )
+            if s.work_location_id is not None:
+                by_location[s.work_location_id] = schedule
+            elif s.role_id is not None:
+                by_role[s.role_id] = schedule
+            else:
+                default = schedule
+        self.by_location, self.by_role, self.default = by_location, by_role, default
+        self._signature = self._db_signature()
+        self._loaded = True
+        self.version += 1
+
+    def ensure_fresh(self):
+        """Recharge les horaires s'ils ont été invalidés ou modifiés dans un autre worker."""
+        now = clock.monotonic()
+        with self._lock:
+            if self._loaded and now - self._checked_at < REFRESH_SECONDS:
+                return
+            if not self._loaded or self._db_signature() != self._signature:
+                self._load_from_db()
+            self._checked_at = now
+
+    def invalidate(self):
+        """Force le rechargement au prochain accès (horaire créé, modifié ou supprimé)."""
+        self._loaded = False
+
+    def resolve(self, role_id=None, location_id=None):
+        """Horaire applicable à un pointage (données en cache, sans requête)."""
+        schedule = self.by_location.get(location_id) if location_id is not None else None
+        if schedule is None and role_id is not None:
+            schedule = self.by_role.get(role_id)
+        return schedule or self.default
+
+
+# Horaires partagés par toutes les requêtes du worker
+schedule_book = ScheduleBook()
@@ -0,0 +1,43 @@
+# services/schema.py
+import logging
+
+from sqlalchemy import inspect, text
+
+from extensions import db
+
+
+def ensure_indexes(*indexes):
+    """
+    Crée sur une base existante les index déclarés dans les modèles
+    (db.create_all() n'ajoute pas d'index aux tables déjà créées).
+    Un échec est journalisé sans bloquer le démarrage ; retourne les noms des index en place.
+    """
+    created = []
+    for index in indexes:
+        try:
+            index.create(bind=db.engine, checkfirst=True)
+            created.append(index.name)
+        except Exception as e:
+            logging.warning("⚠️ Index %s non créé : %s", index.name, e)
+    return created
+
+
+def ensure_columns(*columns):
+    """
+    Ajoute sur une base existante les colonnes (nullables) déclarées après coup dans les modèles
+    (db.create_all() ne modifie pas les tables déjà créées). Retourne les colonnes ajoutées.
+    """
+    inspector = inspect(db.engine)
+    added = []
+    for column in columns:
+        table = column.table.name
+        if column.name in {c["name"] for c in inspector.get_columns(table)}:
+            continue
+        ddl = f"ALTER TABLE {table} ADD COLUMN {column.name} {column.type.compile(dialect=db.engine.dialect)}"
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text(ddl))
+            added.append(f"{table}.{column.name}")
+        except Exception as e:
+            logging.warning("⚠️ Colonne %s.%s non ajoutée : %s", table, column.name, e)
+    return added
@@ -0,0 +1,219 @@
+# services/technician_schedule.py
+import threading
+import time as clock
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from extensions import db
+from models import Intervention, autres_intervenants_assoc
+
+DEFAULT_DURATION = timedelta(minutes=60)   # intervention sans durée estimée
+REFRESH_SECONDS = 5.0                      # intervalle de vérification des modifications d'un autre worker
+CHUNK = 500                                # taille des IN lors d'un rechargement partiel
+LOOKBACK = timedelta(seconds=30)           # marge pour une transaction validée après une plus récente
+FREE_STATUTS = ("annulee",)                # statuts qui ne bloquent pas le créneau
+
+
+def intervention_span(date_prevue, duree_estimee):
+    """Créneau (début, fin) occupé par une intervention."""
+    duration = timedelta(minutes=duree_estimee) if duree_estimee else DEFAULT_DURATION
+    return date_prevue, date_prevue + duration
+
+
+class Timeline:
+    """
+    Créneaux d'un technicien triés par début. Les créneaux qui chevauchent [a, b) ont un
+    début < b et > a - plus_long_créneau : deux recherches dichotomiques bornent le parcours,
+    soit O(log n + k) pour k créneaux renvoyés.
+    """
+
+    __slots__ = ("slots", "max_span")
+
+    def __init__(self):
+        self.slots = []                # (début, fin, intervention_id)
+        self.max_span = timedelta(0)
+
+    def add(self, start, end, intervention_id):
+        insort(self.slots, (start, end, intervention_id))
+        if end - start > self.max_span:
+            self.max_span = end - start
+
+    def remove(self, start, end, intervention_id):
+        i = bisect_left(self.slots, (start, end, intervention_id))
+        if i < len(self.slots) and self.slots[i] == (start, end, intervention_id):
+            del self.slots[i]
+
+    def overlapping(self, start, end):
+        lo = bisect_left(self.slots, (start - self.max_span,))
+        hi = bisect_left(self.slots, (end,))
+        return [s for s in self.slots[lo:hi] if s[1] > start]
+
+    def free(self, start, end, min_duration):
+        """Intervalles libres de [start, end) d'au moins min_duration."""
+        free, cursor = [], start
+        for slot_start, slot_end, _ in self.overlapping(start, end):
+            if slot_start - cursor >= min_duration:
+                free.append((cursor, slot_start))
+            cursor = max(cursor, slot_end)
+        if end - cursor >= min_duration:
+            free.append((cursor, end))
+        return free
+
+
+class TechnicianCalendar:
+    """
+    Planning des techniciens (technicien principal et autres intervenants) tenu en mémoire
+    par worker. Les routes d'intervention le mettent à jour après chaque commit ; les
+    modifications faites par un autre worker sont relues par updated_at, et une suppression
+    (nombre de lignes différent) provoque un rechargement complet.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._checked_at = 0.0
+        self._last_updated = None
+        self._rows = {}              # intervention_id -> (début, fin, techniciens)
+        self._timelines = {}         # technicien_id -> Timeline
+
+    # --- Chargement -----------------------------------------------------------
+    @staticmethod
+    def _db_signature():
+        return tuple(db.session.execute(
+            select(func.count(Intervention.id), func.max(Intervention.updated_at))
+        ).one())
+
+    def _fetch(self, ids=None):
+        """Lignes (id, début, fin, techniciens) des interventions, toutes ou celles de ids."""
+        stmt = select(Intervention.id, Intervention.technicien_id, Intervention.date_prevue,
+                      Intervention.duree_estimee, Intervention.statut)
+        assoc = select(autres_intervenants_assoc.c.intervention_id, autres_intervenants_assoc.c.user_id)
+        batches = [None] if ids is None else [ids[i:i + CHUNK] for i in range(0, len(ids), CHUNK)]
+        for batch in batches:
+            rows, others = stmt, assoc
+            if batch is not None:
+                rows = rows.where(Intervention.id.in_(batch))
+                others = others.where(autres_intervenants_assoc.c.intervention_id.in_(batch))
+            participants = {}
+            for intervention_id, user_id in db.session.execute(others):
+                participants.setdefault(intervention_id, set()).add(user_id)
+            for intervention_id, technicien_id, date_prevue, duree, statut in db.session.execute(rows):
+                techs = participants.get(intervention_id, set())
+                if technicien_id:
+                    techs.add(technicien_id)
+                if statut in FREE_STATUTS or date_prevue is None:
+                    techs = set()
+                start, end = intervention_span(date_prevue, duree) if date_prevue else (None, None)
+                yield intervention_id, start, end, frozenset(techs)
+
+    def _place(self, intervention_id, start, end, techs):
+        self._unplace(intervention_id)
+        self._rows[intervention_id] = (start, end, techs)
+        for tech in techs:
+            self._timelines.setdefault(tech, Timeline()).add(start, end, intervention_id)
+
+    def _unplace(self, intervention_id):
+        previous = self._rows.pop(intervention_id, None)
+        if previous:
+            start, end, techs = previous
+            for tech in techs:
+                self._timelines[tech].remove(start, end, intervention_id)
+
+    def _load_from_db(self):
+        signature = self._db_signature()
+        rows, slots = {}, {}
+        for intervention_id, start, end, techs in self._fetch():
+            rows[intervention_id] = (start, end, techs)
+            for tech in techs:
+                slots.setdefault(tech, []).append((start, end, intervention_id))
+        timelines = {}
+        for tech, tech_slots in slots.items():
+            timeline = timelines[tech] = Timeline()
+            timeline.slots = sorted(tech_slots)
+            timeline.max_span = max(end - start for start, end, _ in tech_slots)
+        self._rows, self._timelines = rows, timelines
+        self._last_updated = signature[1]
+        self._loaded = True
+
+    def _catch_up(self, signature):
+        """Relit les interventions modifiées depuis le dernier passage."""
+        count, last_updated = signature
+        if self._last_updated is None:
+            self._load_from_db()
+            return
+        if last_updated is not None:
+            changed = db.session.execute(
+                select(Intervention.id).where(Intervention.updated_at >= self._last_updated - LOOKBACK)
+            ).scalars().all()
+            for row in self._fetch(changed):
+                self._place(*row)
+            self._last_updated = last_updated
+        if count != len(self._rows):
+            self._load_from_db()
+
+    def ensure_fresh(self):
+        now = clock.monotonic()
+        with self._lock, db.session.no_autoflush:   # une modification en cours n'est pas encore au planning
+            if self._loaded and now - self._checked_at < REFRESH_SECONDS:
+                return
+            if not self._loaded:
+                self._load_from_db()
+            else:
+                signature = self._db_signature()
+                if signature != (len(self._rows), self._last_updated):
+                    self._catch_up(signature)
+            self._checked_at = now
+
+    # --- Mises à jour locales (après commit) ---------------------------------
+    def refresh(self, intervention_id):
+        """Recharge une intervention créée ou modifiée dans ce worker."""
+        if not self._loaded:
+            return
+        with self._lock:
+            for row in self._fetch([intervention_id]):
+                self._place(*row)
+
+    def discard(self, intervention_id):
+        """Retire une intervention supprimée dans ce worker."""
+        with self._lock:
+            self._unplace(intervention_id)
+
+    # --- Requêtes -------------------------------------------------------------
+    def conflicts(self, technician_ids, start, end, exclude_id=None):
+        """Interventions des techniciens qui chevauchent [start, end)."""
+        self.ensure_fresh()
+        found = []
+        with self._lock:
+            for tech in sorted(set(t for t in technician_ids if t)):
+                timeline = self._timelines.get(tech)
+                if timeline is None:
+                    continue
+                for slot_start, slot_end, intervention_id in timeline.overlapping(start, end):
+                    if intervention_id != exclude_id:
+                        found.append({"technicien_id": tech, "intervention_id": intervention_id,
+                                      "debut": slot_start.isoformat(), "fin": slot_end.isoformat()})
+        return found
+
+    def free_slots(self, technician_id, start, end, min_duration=timedelta(0), day_start=None, day_end=None):
+        """
+        Créneaux libres d'un technicien sur [start, end), limités chaque jour à
+        [day_start, day_end) si ces heures sont données.
+        """
+        self.ensure_fresh()
+        windows = [(start, end)]
+        if day_start is not None and day_end is not None:
+            windows, day = [], start.date()
+            while day <= end.date():
+                window = (max(start, datetime.combine(day, day_start)), min(end, datetime.combine(day, day_end)))
+                if window[0] < window[1]:
+                    windows.append(window)
+                day += timedelta(days=1)
+        with self._lock:
+            timeline = self._timelines.get(technician_id) or Timeline()
+            return [slot for a, b in windows for slot in timeline.free(a, b, min_duration)]
+
+
+# Planning partagé par toutes les requêtes du worker
+technician_calendar = TechnicianCalendar()
@@ -0,0 +1,53 @@
+# services/throttle.py
+import math
+import threading
+import time
+
+MAX_KEYS = 10_000           # au-delà, les seaux pleins (inactifs) sont purgés
+
+
+class TokenBucket:
+    """
+    Limiteur par seau à jetons, en mémoire du worker, une entrée par clé (email, IP...).
+    capacity : rafale autorisée ; rate : jetons rendus par seconde.
+    """
+
+    def __init__(self, capacity, rate, max_keys=MAX_KEYS):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = {}      # clé -> [jetons, dernier remplissage]
+
+    def consume(self, key, tokens=1.0):
+        """Retourne (autorisé, secondes avant nouvel essai)."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                bucket = self._buckets[key] = [self.capacity, now]
+            else:
+                bucket[0] = min(self.capacity, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= tokens:
+                bucket[0] -= tokens
+                return True, 0
+            return False, math.ceil((tokens - bucket[0]) / self.rate)
+
+    def _prune(self, now):
+        full = [key for key, (level, at) in self._buckets.items()
+                if level + (now - at) * self.rate >= self.capacity]
+        for key in full:
+            del self._buckets[key]
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+# Connexion : 5 essais d'affilée par email puis 1 toutes les 12 s ;
+# 30 par IP puis 1 par seconde (les bureaux sortent souvent par une même IP)
+login_by_email = TokenBucket(capacity=5, rate=1 / 12)
+login_by_ip = TokenBucket(capacity=30, rate=1.0)
@@ -0,0 +1,197 @@
+# services/zone_clustering.py
+import math
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import func, update
+
+from extensions import db
+from models import Attendance, WorkLocation, WorkSchedule
+from services.geofence import geofence_index, haversine_m, METERS_PER_DEGREE, DEFAULT_RADIUS
+from services.presence import presence_board
+from services.schedules import schedule_book
+
+MAX_SPREAD_FACTOR = 2   # une zone fusionnée est à moins de 2 × eps de la zone conservée
+
+
+def dbscan(lats, lngs, eps, min_samples=2):
+    """
+    DBSCAN sur coordonnées GPS (eps en mètres), sans matrice n×n complète :
+    les points sont rangés dans une grille de cases de taille eps et les distances
+    sont calculées par blocs vectorisés entre une case et ses 8 voisines.
+    Retourne un tableau de labels (-1 = bruit), comme sklearn.
+    """
+    n = len(lats)
+    labels = np.full(n, -1, dtype=np.int64)
+    if n == 0:
+        return labels
+
+    cell_lat = eps / METERS_PER_DEGREE
+    max_abs_lat = min(float(np.max(np.abs(lats))), 89.0)
+    cell_lng = eps / (METERS_PER_DEGREE * math.cos(math.radians(max_abs_lat)))
+    ci = np.floor(lats / cell_lat).astype(np.int64)
+    cj = np.floor(lngs / cell_lng).astype(np.int64)
+    cells = {}
+    for idx, key in enumerate(zip(ci.tolist(), cj.tolist())):
+        cells.setdefault(key, []).append(idx)
+    cells = {key: np.array(members, dtype=np.int64) for key, members in cells.items()}
+
+    # Voisinage : comptes par point et arêtes i < j à moins de eps
+    counts = np.zeros(n, dtype=np.int64)
+    edges_i, edges_j = [], []
+    for (a, b), members in cells.items():
+        neighbours = [cells[k] for k in ((a + da, b + db) for da in (-1, 0, 1) for db in (-1, 0, 1)) if k in cells]
+        others = np.concatenate(neighbours)
+        distances = haversine_m(lats[members][:, None], lngs[members][:, None], lats[others][None, :], lngs[others][None, :])
+        close = distances <= eps
+        counts[members] += close.sum(axis=1)
+        rows, cols = np.nonzero(close)
+        src, dst = members[rows], others[cols]
+        keep = src < dst
+        edges_i.append(src[keep])
+        edges_j.append(dst[keep])
+    edges_i = np.concatenate(edges_i)
+    edges_j = np.concatenate(edges_j)
+
+    # Union-find sur les arêtes entre points « cœur »
+    core = counts >= min_samples
+    parent = np.arange(n)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    both_core = core[edges_i] & core[edges_j]
+    for i, j in zip(edges_i[both_core].tolist(), edges_j[both_core].tolist()):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    roots = {}
+    for i in np.nonzero(core)[0].tolist():
+        labels[i] = roots.setdefault(find(i), len(roots))
+    # Points de bordure : rattachés au premier cœur voisin
+    for i, j in zip(edges_i.tolist(), edges_j.tolist()):
+        if core[i] and not core[j] and labels[j] == -1:
+            labels[j] = labels[i]
+        elif core[j] and not core[i] and labels[i] == -1:
+            labels[i] = labels[j]
+    return labels
+
+
+def propose_merges(eps=DEFAULT_RADIUS, min_samples=2, max_spread=MAX_SPREAD_FACTOR):
+    """
+    Propose des fusions de zones actives proches ; retourne (propositions, groupes écartés).
+    Zone conservée : un bureau en priorité, puis la plus utilisée, puis la plus ancienne.
+    DBSCAN enchaîne les voisins de proche en proche : une file de zones espacées de moins
+    de eps forme un seul groupe, même si ses extrémités sont à des kilomètres. Chaque zone
+    fusionnée doit donc être à moins de max_spread × eps de la zone conservée ; un groupe
+    plus étendu est découpé autour de zones conservées successives, et les zones qui ne
+    rejoignent aucun sous-groupe restent telles quelles (signalées dans les groupes écartés).
+    """
+    zones = (
+        WorkLocation.query.filter(
+            WorkLocation.is_active.is_(True),
+            WorkLocation.latitude.isnot(None),
+            WorkLocation.longitude.isnot(None),
+        )
+        .with_entities(WorkLocation.id, WorkLocation.name, WorkLocation.type,
+                       WorkLocation.latitude, WorkLocation.longitude)
+        .order_by(WorkLocation.id)
+        .all()
+    )
+    if not zones:
+        return [], []
+    lats = np.array([z.latitude for z in zones], dtype=np.float64)
+    lngs = np.array([z.longitude for z in zones], dtype=np.float64)
+    labels = dbscan(lats, lngs, eps, min_samples)
+
+    clusters = {}
+    for idx, label in enumerate(labels.tolist()):
+        if label >= 0:
+            clusters.setdefault(label, []).append(idx)
+    clusters = [members for members in clusters.values() if len(members) > 1]
+    if not clusters:
+        return [], []
+
+    ids = [zones[i].id for members in clusters for i in members]
+    usage = dict(
+        Attendance.query.filter(Attendance.work_location_id.in_(ids))
+        .with_entities(Attendance.work_location_id, func.count(Attendance.id))
+        .group_by(Attendance.work_location_id)
+        .all()
+    )
+
+    def zone_json(i, **extra):
+        return {"id": zones[i].id, "name": zones[i].name, "type": zones[i].type,
+                "attendances": usage.get(zones[i].id, 0), **extra}
+
+    limit = max_spread * eps
+    proposals, rejected = [], []
+    for members in clusters:
+        members.sort(key=lambda i: (zones[i].type != "bureau", -usage.get(zones[i].id, 0), zones[i].id))
+        spread = haversine_m(lats[members[0]], lngs[members[0]], lats[members], lngs[members])
+        unmerged, remaining = [], members
+        while len(remaining) > 1:
+            keeper = remaining[0]
+            distance = haversine_m(lats[keeper], lngs[keeper], lats[remaining], lngs[remaining])
+            group = [(i, float(d)) for i, d in zip(remaining, distance) if d <= limit]
+            remaining = [i for i, d in zip(remaining, distance) if d > limit]
+            if len(group) == 1:
+                unmerged.append(keeper)
+                continue
+            indices = [i for i, _ in group]
+            proposals.append({
+                "keep": zone_json(keeper),
+                "merge": [zone_json(i, distance=round(d, 1)) for i, d in group[1:]],
+                "centroid": {"latitude": float(lats[indices].mean()), "longitude": float(lngs[indices].mean())},
+            })
+        unmerged += remaining
+        if float(spread.max()) > limit:
+            rejected.append({
+                "zones": [zone_json(i, distance=round(float(d), 1)) for i, d in zip(members, spread)],
+                "spread": round(float(spread.max()), 1),
+                "unmerged": [zone_json(i) for i in unmerged],
+            })
+    proposals.sort(key=lambda p: -len(p["merge"]))
+    return proposals, rejected
+
+
+def apply_merges(proposals):
+    """
+    Applique les fusions : pointages et horaires de zone remappés en masse (un UPDATE par
+    zone conservée) puis zones fusionnées supprimées, le tout dans une transaction.
+    """
+    remapped, removed = 0, 0
+    for proposal in proposals:
+        keep = proposal["keep"]
+        merged_ids = [z["id"] for z in proposal["merge"]]
+        merged_names = [z["name"] for z in proposal["merge"]]
+        # La sortie doit rester sur la même zone que l'entrée (cf. check_out)
+        db.session.execute(
+            update(Attendance)
+            .where(Attendance.work_location_id.in_(merged_ids), Attendance.check_out_location.in_(merged_names))
+            .values(check_out_location=keep["name"])
+            .execution_options(synchronize_session=False)
+        )
+        result = db.session.execute(
+            update(Attendance)
+            .where(Attendance.work_location_id.in_(merged_ids))
+            .values(work_location_id=keep["id"], check_in_location=keep["name"])
+            .execution_options(synchronize_session=False)
+        )
+        remapped += result.rowcount
+        db.session.execute(
+            update(WorkSchedule)
+            .where(WorkSchedule.work_location_id.in_(merged_ids))
+            .values(work_location_id=keep["id"], updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        removed += WorkLocation.query.filter(WorkLocation.id.in_(merged_ids)).delete(synchronize_session=False)
+    db.session.commit()
+    geofence_index.invalidate()
+    schedule_book.invalidate()
+    presence_board.invalidate()
+    return {"zones_removed": removed, "attendances_remapped": remapped}
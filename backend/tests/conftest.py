@@ -0,0 +1,61 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Base SQLite et dossier de médias jetables, définis avant le chargement de .env (qui ne les écrase pas)
+WORKDIR = tempfile.mkdtemp(prefix="tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORKDIR, 'tests.sqlite3')}"
+os.environ["MEDIA_FOLDER"] = os.path.join(WORKDIR, "media")
+os.environ["GEOCODING_ENABLED"] = "false"
+os.environ["ATTENDANCE_GROUP_COMMIT"] = "false"
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Une application pour toute la session : les caches par worker (services/) restent cohérents avec la base."""
+    from app import create_app
+    application = create_app()
+    application.config["TESTING"] = True
+    return application
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def login(client, email, password):
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+@pytest.fixture
+def admin_headers(client):
+    return {"Authorization": "Bearer " + login(client, "admin@entreprise.fr", "admin123")["access_token"]}
+
+
+@pytest.fixture
+def make_user(app, client):
+    """Crée un utilisateur du rôle donné ; retourne (id, en-têtes d'authentification)."""
+    def factory(role_name="Technicien"):
+        from extensions import db
+        from models import Role, User
+        suffix = uuid.uuid4().hex[:8]
+        with app.app_context():
+            role = Role.query.filter_by(name=role_name).one()
+            user = User(username=f"user-{suffix}", email=f"{suffix}@example.com", nom="Test", prenom=suffix,
+                        role=role, permissions=role.permissions, is_active=True)
+            user.set_password("secret123")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+        token = login(client, f"{suffix}@example.com", "secret123")["access_token"]
+        return user_id, {"Authorization": f"Bearer {token}"}
+    return factory
@@ -0,0 +1,26 @@
+# tests/test_geofence.py
+from services.geofence import GeofenceIndex
+
+
+def test_zone_moved_by_another_worker_is_picked_up(app):
+    from extensions import db
+    from models import WorkLocation
+
+    index = GeofenceIndex()          # index d'un autre worker
+    with app.app_context():
+        zone = WorkLocation(name="Dépôt mobile", latitude=13.0, longitude=-15.0, radius=100,
+                            type="chantier", is_active=True)
+        db.session.add(zone)
+        db.session.commit()
+        index.ensure_fresh()
+        assert index.match(13.0, -15.0) == zone.id
+
+        zone.latitude = 13.5      # déplacée sur place, sans nouvelle ligne
+        db.session.commit()
+        index._checked_at = 0.0      # intervalle de vérification écoulé
+        index.ensure_fresh()
+        assert index.match(13.0, -15.0) is None
+        assert index.match(13.5, -15.0) == zone.id
+
+        db.session.delete(zone)
+        db.session.commit()
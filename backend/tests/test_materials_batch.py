@@ -0,0 +1,67 @@
+# tests/test_materials_batch.py
+from datetime import datetime
+
+import pytest
+
+
+@pytest.fixture
+def stock(app):
+    """Une intervention et deux articles (stocks 10 et 2) ; retourne (intervention_id, article_a, article_b)."""
+    from extensions import db
+    from models import Intervention, InventoryItem
+    with app.app_context():
+        intervention = Intervention(description="Pose", created_by_id=1, date_prevue=datetime(2025, 6, 2, 9))
+        a = InventoryItem(name="Câble", quantity=10)
+        b = InventoryItem(name="Disjoncteur", quantity=2)
+        db.session.add_all([intervention, a, b])
+        db.session.commit()
+        return intervention.id, a.id, b.id
+
+
+def quantities(app, *ids):
+    from models import InventoryItem
+    with app.app_context():
+        return [InventoryItem.query.get(i).quantity for i in ids]
+
+
+def test_batch_decrements_stock(app, client, admin_headers, stock):
+    intervention_id, a, b = stock
+    response = client.post(f"/api/interventions/{intervention_id}/materiels/batch", headers=admin_headers,
+                           json={"lignes": [{"action": "add", "article_id": a, "quantite": 4},
+                                            {"action": "add", "article_id": b, "quantite": 2}]})
+    assert response.status_code == 200
+    assert {(m["article_id"], m["quantite"]) for m in response.get_json()["materiels"]} == {(a, 4), (b, 2)}
+    assert quantities(app, a, b) == [6, 0]
+
+    # Ligne existante réduite puis retirée : le stock est rendu
+    response = client.post(f"/api/interventions/{intervention_id}/materiels/batch", headers=admin_headers,
+                           json={"lignes": [{"action": "update", "article_id": a, "quantite": 1},
+                                            {"action": "remove", "article_id": b}]})
+    assert response.status_code == 200
+    assert quantities(app, a, b) == [9, 2]
+
+
+def test_shortage_returns_409_and_rolls_back(app, client, admin_headers, stock):
+    from models import InterventionMaterial
+    intervention_id, a, b = stock
+    response = client.post(f"/api/interventions/{intervention_id}/materiels/batch", headers=admin_headers,
+                           json={"lignes": [{"action": "add", "article_id": a, "quantite": 3},
+                                            {"action": "add", "article_id": b, "quantite": 5}]})
+    assert response.status_code == 409
+    assert response.get_json()["ruptures"] == [
+        {"line": 2, "article_id": b, "article_nom": "Disjoncteur", "demande": 5, "disponible": 2}]
+
+    # Tout ou rien : ni stock sorti pour la ligne valide, ni matériel enregistré
+    assert quantities(app, a, b) == [10, 2]
+    with app.app_context():
+        assert InterventionMaterial.query.filter_by(intervention_id=intervention_id).count() == 0
+
+
+def test_invalid_lines_return_400(client, admin_headers, stock):
+    intervention_id, a, _ = stock
+    response = client.post(f"/api/interventions/{intervention_id}/materiels/batch", headers=admin_headers,
+                           json={"lignes": [{"action": "add", "article_id": a, "quantite": 0},
+                                            {"action": "vendre", "article_id": a},
+                                            {"action": "add", "article_id": 987654}]})
+    assert response.status_code == 400
+    assert [e["line"] for e in response.get_json()["erreurs"]] == [1, 2]
@@ -0,0 +1,62 @@
+# tests/test_revocation.py
+from datetime import datetime, timedelta
+
+from conftest import login
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_logged_out_tokens_are_rejected(client):
+    tokens = login(client, "admin@entreprise.fr", "admin123")
+    assert client.get("/api/auth/verify", headers=bearer(tokens["access_token"])).status_code == 200
+
+    response = client.post("/api/auth/logout", json={"refresh_token": tokens["refresh_token"]},
+                           headers=bearer(tokens["access_token"]))
+    assert response.status_code == 200
+    assert client.get("/api/auth/verify", headers=bearer(tokens["access_token"])).status_code == 401
+    assert client.post("/api/auth/refresh", headers=bearer(tokens["refresh_token"])).status_code == 401
+
+
+def test_logout_twice_with_same_refresh_token(client):
+    refresh_token = login(client, "admin@entreprise.fr", "admin123")["refresh_token"]
+    for _ in range(2):
+        access_token = login(client, "admin@entreprise.fr", "admin123")["access_token"]
+        response = client.post("/api/auth/logout", json={"refresh_token": refresh_token},
+                               headers=bearer(access_token))
+        assert response.status_code == 200
+
+
+def test_refresh_token_is_rotated(client):
+    tokens = login(client, "admin@entreprise.fr", "admin123")
+    response = client.post("/api/auth/refresh", headers=bearer(tokens["refresh_token"]))
+    assert response.status_code == 200
+    rotated = response.get_json()
+    assert client.get("/api/auth/verify", headers=bearer(rotated["access_token"])).status_code == 200
+
+    # L'ancien jeton de rafraîchissement ne sert qu'une fois ; le nouveau fonctionne
+    assert client.post("/api/auth/refresh", headers=bearer(tokens["refresh_token"])).status_code == 401
+    assert client.post("/api/auth/refresh", headers=bearer(rotated["refresh_token"])).status_code == 200
+
+
+def test_revocation_committed_out_of_id_order_is_seen(app):
+    """Une révocation d'id plus petit, visible après une d'id plus grand, est quand même lue."""
+    from extensions import db
+    from models import RevokedToken
+    from services.revocation import RevocationStore
+
+    store = RevocationStore()
+    expires = datetime.utcnow() + timedelta(hours=1)
+    with app.app_context():
+        late = RevokedToken(id=900_010, jti="jti-committed-late", user_id=1, expires_at=expires)
+        early = RevokedToken(id=900_011, jti="jti-committed-early", user_id=1, expires_at=expires)
+        db.session.add(early)
+        db.session.commit()
+        store.ensure_fresh()
+        assert store.is_revoked({"jti": "jti-committed-early"})
+
+        db.session.add(late)
+        db.session.commit()
+        store._synced_at = 0.0      # intervalle de synchronisation écoulé
+        assert store.is_revoked({"jti": "jti-committed-late"})
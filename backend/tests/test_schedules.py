@@ -0,0 +1,43 @@
+# tests/test_schedules.py
+
+
+def test_schedule_list_is_admin_only(client, admin_headers, make_user):
+    _, headers = make_user("Technicien")
+    assert client.get("/api/attendance/schedules", headers=headers).status_code == 403
+
+    response = client.get("/api/attendance/schedules", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.get_json()["success"] is True
+
+
+def test_schedule_writes_are_admin_only(client, make_user):
+    _, headers = make_user("Technicien")
+    response = client.post("/api/attendance/schedules", json={"name": "Matin", "late_cutoff": "08:00"},
+                           headers=headers)
+    assert response.status_code == 403
+
+
+def test_create_schedule_for_role(client, admin_headers, app):
+    from models import Role
+    with app.app_context():
+        role_id = Role.query.filter_by(name="Technicien").one().id
+    response = client.post("/api/attendance/schedules", headers=admin_headers, json={
+        "name": "Techniciens", "late_cutoff": "08:30", "role_id": role_id, "hourly_rate": 2500,
+    })
+    assert response.status_code == 201
+    schedule = response.get_json()["schedule"]
+    assert schedule["role_id"] == role_id and schedule["late_cutoff"] == "08:30"
+
+
+def test_schedule_with_unknown_zone_or_role_is_rejected(client, admin_headers):
+    for field, message in (("work_location_id", "Zone introuvable"), ("role_id", "Rôle introuvable")):
+        response = client.post("/api/attendance/schedules", headers=admin_headers,
+                               json={"name": "Fantôme", "late_cutoff": "08:00", field: 987654})
+        assert response.status_code == 400
+        assert response.get_json()["message"] == message
+
+
+def test_schedule_with_malformed_values_is_rejected(client, admin_headers):
+    response = client.post("/api/attendance/schedules", headers=admin_headers,
+                           json={"name": "Mauvais", "late_cutoff": "8h", "role_id": "1"})
+    assert response.status_code == 400
@@ -0,0 +1,96 @@
+# tests/test_signatures.py
+import base64
+import os
+from datetime import datetime
+
+import pytest
+
+PNG = b"\x89PNG\r\n\x1a\n" + os.urandom(64)
+
+
+def data_url(data):
+    return "data:image/png;base64," + base64.b64encode(data).decode()
+
+
+@pytest.fixture
+def legacy_signatures(app):
+    """Deux interventions dont la signature est encore en base64 dans la ligne."""
+    from sqlalchemy import insert
+    from extensions import db
+    from models import Intervention
+    with app.app_context():
+        ids = []
+        for _ in range(2):
+            result = db.session.execute(insert(Intervention).values(
+                description="Signée", created_by_id=1, date_prevue=datetime(2025, 6, 2, 9),
+                statut="terminee", signature_data=data_url(PNG + os.urandom(8))))
+            ids.append(result.inserted_primary_key[0])
+        db.session.commit()
+        return ids
+
+
+def blob_of(app, intervention_id):
+    from extensions import db
+    from models import Intervention
+    with app.app_context():
+        return db.session.query(Intervention.signature_blob, Intervention.signature_data) \
+            .filter_by(id=intervention_id).one()
+
+
+def test_upload_then_serve_with_etag(client, admin_headers, legacy_signatures):
+    intervention_id = legacy_signatures[0]
+    response = client.put(f"/api/interventions/{intervention_id}/signature", headers=admin_headers,
+                          json={"signature_data": data_url(PNG)})
+    assert response.status_code == 200
+    url = response.get_json()["signature_url"]
+
+    response = client.get(url, headers=admin_headers)
+    assert response.status_code == 200 and response.data == PNG
+    assert response.mimetype == "image/png"
+    etag = response.headers["ETag"]
+    response = client.get(url, headers={**admin_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_upload_rejects_non_images(client, admin_headers, legacy_signatures):
+    response = client.put(f"/api/interventions/{legacy_signatures[0]}/signature", headers=admin_headers,
+                          json={"signature_data": "pas du base64 !"})
+    assert response.status_code == 400
+
+
+def test_migration_moves_legacy_signatures(app, legacy_signatures):
+    from services.blob_store import blob_store, migrate_signatures
+    with app.app_context():
+        stats = migrate_signatures(batch_size=1)
+        assert stats["migrated"] >= 2
+        for intervention_id in legacy_signatures:
+            digest, legacy = blob_of(app, intervention_id)
+            assert legacy is None and blob_store.exists(digest)
+
+
+def test_migration_keeps_signature_uploaded_meanwhile(app, legacy_signatures, monkeypatch):
+    """Une signature envoyée entre la lecture d'un lot et sa mise à jour n'est pas écrasée."""
+    from sqlalchemy import update
+    from extensions import db
+    from models import Intervention
+    import services.blob_store as blob_module
+
+    target = legacy_signatures[0]
+    put = blob_module.blob_store.put
+    with app.app_context():
+        fresh, _ = put(PNG + b"fresh")
+
+    def put_during_upload(data):
+        # PUT /signature concurrent, dans sa propre transaction
+        with db.engine.begin() as conn:
+            conn.execute(update(Intervention).where(Intervention.id == target)
+                         .values(signature_blob=fresh, signature_data=None))
+        return put(data)
+
+    with app.app_context():
+        monkeypatch.setattr(blob_module.blob_store, "put", put_during_upload)
+        blob_module.migrate_signatures(batch_size=10)
+
+    assert blob_of(app, target) == (fresh, None)
+    digest, legacy = blob_of(app, legacy_signatures[1])
+    assert digest and legacy is None
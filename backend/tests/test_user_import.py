@@ -0,0 +1,61 @@
+# tests/test_user_import.py
+import uuid
+
+import services.provisioning as provisioning
+
+
+def rows(count, prefix=None):
+    prefix = prefix or uuid.uuid4().hex[:6]
+    return [{"username": f"{prefix}-{k}", "email": f"{prefix}-{k}@example.com", "password": "secret123",
+             "nom": "Import", "prenom": str(k), "role": "Technicien"} for k in range(count)]
+
+
+def test_import_reports_errors_per_row(client, admin_headers):
+    batch = rows(3)
+    batch[1]["role"] = "Inconnu"
+    batch.append(dict(batch[0]))                         # doublon dans le fichier
+    batch.append({"username": "sans-email"})
+    response = client.post("/api/users/bulk", json=batch, headers=admin_headers)
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert [c["row"] for c in body["created"]] == [1, 3]
+    assert [(e["row"], e["msg"]) for e in body["errors"]] == [
+        (2, "Rôle introuvable"),
+        (4, "Nom d'utilisateur ou email en double dans le fichier"),
+        (5, "Champs manquants : email, password, nom, prenom"),
+    ]
+
+
+def test_import_rejects_existing_accounts(client, admin_headers):
+    batch = rows(2)
+    assert client.post("/api/users/bulk", json=batch[:1], headers=admin_headers).status_code == 201
+    body = client.post("/api/users/bulk", json=batch, headers=admin_headers).get_json()
+    assert [c["row"] for c in body["created"]] == [2]
+    assert body["errors"] == [{"row": 1, "msg": "Nom d'utilisateur ou email déjà utilisé"}]
+
+
+def test_concurrent_insert_is_reported_on_its_row(app, client, admin_headers, monkeypatch):
+    """Un compte créé entre la vérification d'unicité et l'insertion ne fait pas échouer tout l'import."""
+    from sqlalchemy import insert
+    from extensions import db
+    from models import User
+
+    batch = rows(3)
+    hash_passwords = provisioning.hash_passwords
+
+    def racing_hash_passwords(passwords):
+        with db.engine.begin() as conn:
+            conn.execute(insert(User).values(username=batch[1]["username"], email="autre@example.com",
+                                             password_hash="x", nom="Concurrent", prenom="", role_id=1, is_active=True))
+        return hash_passwords(passwords)
+
+    monkeypatch.setattr(provisioning, "hash_passwords", racing_hash_passwords)
+    response = client.post("/api/users/bulk", json=batch, headers=admin_headers)
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert [c["row"] for c in body["created"]] == [1, 3]
+    assert body["errors"] == [{"row": 2, "msg": "Nom d'utilisateur ou email déjà utilisé"}]
+    with app.app_context():
+        assert User.query.filter(User.username.in_([r["username"] for r in batch])).count() == 3
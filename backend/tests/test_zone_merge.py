@@ -0,0 +1,48 @@
+# tests/test_zone_merge.py
+import pytest
+
+
+@pytest.fixture
+def chain(app):
+    """Six zones espacées de 80 m sur une ligne (400 m d'un bout à l'autre), loin de toute autre."""
+    from extensions import db
+    from models import WorkLocation
+    with app.app_context():
+        zones = [WorkLocation(name=f"Chaîne {k}", latitude=12.5, longitude=-16.0 + k * 0.000736,
+                              radius=100, type="chantier", is_active=True) for k in range(6)]
+        db.session.add_all(zones)
+        db.session.commit()
+        ids = [z.id for z in zones]
+    yield ids
+    with app.app_context():
+        WorkLocation.query.filter(WorkLocation.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def chain_proposals(proposals, ids):
+    return [p for p in proposals if p["keep"]["id"] in ids]
+
+
+def test_chained_zones_are_split_by_spread(app, chain):
+    from services.zone_clustering import propose_merges
+    with app.app_context():
+        proposals, rejected = propose_merges(eps=100, min_samples=2)
+
+    proposals = chain_proposals(proposals, chain)
+    assert len(proposals) == 2
+    for p in proposals:
+        assert all(z["distance"] <= 200 for z in p["merge"])
+    assert [r for r in rejected if {z["id"] for z in r["zones"]} == set(chain)]
+
+
+@pytest.mark.parametrize("value", ["false", "0", 0, "False"])
+def test_merge_applies_for_false_like_values(client, admin_headers, chain, value):
+    response = client.post("/api/work_locations/merge", json={"eps": 100, "dry_run": value}, headers=admin_headers)
+    assert response.status_code == 200
+    assert response.get_json()["dry_run"] is False
+    assert response.get_json()["zones_removed"] >= 4
+
+
+def test_merge_rejects_non_boolean_dry_run(client, admin_headers):
+    response = client.post("/api/work_locations/merge", json={"dry_run": "peut-être"}, headers=admin_headers)
+    assert response.status_code == 400